@@ -0,0 +1,10 @@
+"""Let Python know that the `benchmarks/` folder is a package.
+
+Each benchmark is a small script that measures one hot path of the project
+against the full data set in `data/`. Run them from the project root, e.g.:
+
+    $ python3 -m benchmarks.bench_lookup
+
+Every benchmark accepts `--neofile` and `--cadfile` to point at other data
+files, such as the 2020 test fixtures in `tests/`.
+"""
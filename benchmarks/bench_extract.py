@@ -0,0 +1,63 @@
+"""Benchmark extracting data from the data files, in time and in peak memory.
+
+Peak memory is measured with `tracemalloc`, which slows everything down, so the
+timings and the memory measurements come from separate runs.
+
+    $ python3 -m benchmarks.bench_extract
+"""
+import collections
+import csv
+import json
+import tracemalloc
+
+from benchmarks.common import make_parser, report, timed
+from extract import iter_cad_rows, load_approaches, load_neos
+
+
+def dict_reader_rows(neo_csv_path):
+    """Load every row of an NEO file as a full dictionary, as a baseline."""
+    with open(neo_csv_path, newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def json_load_rows(cad_json_path):
+    """Load every row of a close approach file at once, as a baseline."""
+    with open(cad_json_path) as f:
+        return json.load(f)['data']
+
+
+def drain(iterator):
+    """Consume an iterator, discarding its values."""
+    collections.deque(iterator, maxlen=0)
+
+
+def peak_memory(func, *args):
+    """Call `func(*args)` and return the peak traced memory in bytes."""
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    """Run the benchmark."""
+    parser = make_parser("Benchmark extracting the data files.")
+    args = parser.parse_args()
+
+    cases = {
+        'csv.DictReader NEO rows': (dict_reader_rows, args.neofile),
+        'load_neos': (load_neos, args.neofile),
+        'json.load close approach rows': (json_load_rows, args.cadfile),
+        'stream close approach rows': (lambda path: drain(iter_cad_rows(path)), args.cadfile),
+        'load_approaches': (load_approaches, args.cadfile),
+    }
+    for label, (func, path) in cases.items():
+        _, seconds = timed(func, path)
+        report(label, seconds)
+        print(f"{'  peak memory':<48} {peak_memory(func, path) / 2 ** 20:12.3f} MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Benchmark evaluating filters per close approach, compiled versus one `get` at a time.
+
+Every combination of 1 to 5 filters from a pool of criteria is evaluated over
+every close approach, both with the compiled predicate from `compile_filters`
+and with a call to each filter's `get`, and the totals are reported per
+number of filters.
+
+    $ python3 -m benchmarks.bench_filters --neofile tests/test-neos-2020.csv --cadfile tests/test-cad-2020.json
+"""
+import datetime
+import itertools
+
+from benchmarks.common import make_parser, report, timed
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters, compile_filters
+
+
+CRITERIA = {
+    'date': datetime.date(2020, 3, 2),
+    'start_date': datetime.date(2020, 3, 1),
+    'end_date': datetime.date(2020, 5, 31),
+    'distance_max': 0.1,
+    'velocity_min': 15,
+    'diameter_min': 0.2,
+    'hazardous': True,
+}
+
+
+def count_with_get(filters, approaches):
+    """Count the approaches that pass every filter, calling each filter's `get`."""
+    count = 0
+    for approach in approaches:
+        success = True
+        for f in filters.values():
+            if not f.get(approach):
+                success = False
+        if success:
+            count += 1
+    return count
+
+
+def count_compiled(filters, approaches):
+    """Count the approaches that pass every filter, with a compiled predicate."""
+    predicate = compile_filters(filters)
+    return sum(1 for approach in approaches if predicate(approach))
+
+
+def main():
+    """Run the benchmark."""
+    parser = make_parser("Benchmark compiled filter predicates.")
+    args = parser.parse_args()
+
+    approaches = load_approaches(args.cadfile)
+    NEODatabase(load_neos(args.neofile), approaches)
+
+    for k in range(1, 6):
+        combinations = [create_filters(**dict(criteria))
+                        for criteria in itertools.combinations(CRITERIA.items(), k)]
+        evaluations = len(combinations) * len(approaches)
+        _, seconds = timed(lambda: [count_with_get(f, approaches) for f in combinations])
+        report(f"{k} filter(s), {len(combinations)} combinations: get", seconds, evaluations)
+        _, seconds = timed(lambda: [count_compiled(f, approaches) for f in combinations])
+        report(f"{k} filter(s), {len(combinations)} combinations: compiled", seconds, evaluations)
+
+
+if __name__ == '__main__':
+    main()
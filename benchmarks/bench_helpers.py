@@ -0,0 +1,41 @@
+"""Benchmark converting the `cd` field of close approach data into times.
+
+Compares `strptime` with `cd_to_datetime`, `cd_to_minutes`, and the column-wise
+`cd_column_to_minutes`, over every `cd` value of the close approach file.
+
+    $ python3 -m benchmarks.bench_helpers
+"""
+import datetime
+
+from benchmarks.common import make_parser, report, timed
+from extract import iter_cad_rows
+from helpers import cd_to_datetime, cd_to_minutes, cd_column_to_minutes
+
+
+def strptime(calendar_date):
+    """Parse a calendar date with `strptime`, as a baseline."""
+    return datetime.datetime.strptime(calendar_date, "%Y-%b-%d %H:%M")
+
+
+def main():
+    """Run the benchmark."""
+    parser = make_parser("Benchmark parsing close approach calendar dates.")
+    parser.add_argument('--repeat', type=int, default=1,
+                        help="The number of times to repeat the column of calendar dates.")
+    args = parser.parse_args()
+
+    dates = [row[fields.index('cd')] for fields, row in iter_cad_rows(args.cadfile)] * args.repeat
+    n = len(dates)
+
+    _, seconds = timed(list, map(strptime, dates))
+    report("datetime.strptime", seconds, n)
+    _, seconds = timed(list, map(cd_to_datetime, dates))
+    report("cd_to_datetime", seconds, n)
+    _, seconds = timed(list, map(cd_to_minutes, dates))
+    report("cd_to_minutes", seconds, n)
+    _, seconds = timed(cd_column_to_minutes, dates)
+    report("cd_column_to_minutes", seconds, n)
+
+
+if __name__ == '__main__':
+    main()
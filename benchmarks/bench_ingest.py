@@ -0,0 +1,60 @@
+"""Benchmark adding daily batches of close approaches to a loaded database.
+
+A batch of `--batch` approaches, spread evenly over the whole time range (as
+the new and revised predictions of a daily CAD delta are), is held out of the
+data set. The database is built from the rest, and the batch is then added
+with `add_approaches`, one day's worth at a time for `--days` days. Parsing
+the data file and a full build from all the approaches are timed for
+comparison, as together they make up a reload.
+
+`add_approaches` neither sorts nor links the existing approaches again, but it
+still shifts every index and bitmap past the new rows, so each batch costs
+time in proportion to the size of the whole database, just with a far smaller
+constant than a rebuild.
+
+    $ python3 -m benchmarks.bench_ingest
+    $ python3 -m benchmarks.bench_ingest --batch 300 --days 5 --engine numpy
+"""
+from benchmarks.common import make_parser, report, timed
+from columnar import ColumnarNEODatabase
+from database import NEODatabase
+from extract import load_neos, load_approaches
+
+
+ENGINES = {
+    'python': NEODatabase,
+    'numpy': ColumnarNEODatabase,
+}
+
+
+def main():
+    """Run the benchmark."""
+    parser = make_parser("Benchmark incremental ingestion of daily close approach batches.")
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='python',
+                        help="The database class to load.")
+    parser.add_argument('--batch', type=int, default=300,
+                        help="The number of close approaches added each day.")
+    parser.add_argument('--days', type=int, default=3,
+                        help="The number of daily batches to add.")
+    args = parser.parse_args()
+    database_class = ENGINES[args.engine]
+
+    approaches, seconds = timed(load_approaches, args.cadfile)
+    report("parse close approach data file", seconds)
+    held = approaches[::max(len(approaches) // (args.batch * args.days), 1)][:args.batch * args.days]
+    batches = [held[day::args.days] for day in range(args.days)]
+    batched = {id(approach) for batch in batches for approach in batch}
+
+    _, seconds = timed(database_class, load_neos(args.neofile), load_approaches(args.cadfile))
+    report(f"full build ({len(approaches)} approaches)", seconds)
+
+    db, seconds = timed(database_class, load_neos(args.neofile),
+                        [approach for approach in approaches if id(approach) not in batched])
+    report(f"build without the batches ({len(approaches) - len(batched)} approaches)", seconds)
+    for day, batch in enumerate(batches, start=1):
+        added, seconds = timed(db.add_approaches, batch)
+        report(f"add_approaches, day {day}", seconds, added)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark `NEODatabase.get_neo_by_designation` and `get_neo_by_name`.
+
+Performs 100,000 lookups of each kind against the loaded data set, and compares
+them with the linear scan the database used before it kept hash indexes.
+
+    $ python3 -m benchmarks.bench_lookup
+    $ python3 -m benchmarks.bench_lookup --lookups 10000
+"""
+import random
+
+from benchmarks.common import make_parser, report, timed
+from database import NEODatabase
+from extract import load_neos, load_approaches
+
+
+def scan_by_designation(neos, designation):
+    """Find an NEO by designation with a linear scan, as a baseline."""
+    for neo in neos:
+        if designation == neo.designation:
+            return neo
+    return None
+
+
+def scan_by_name(neos, name):
+    """Find an NEO by name with a linear scan, as a baseline."""
+    for neo in neos:
+        if name == neo.name:
+            return neo
+    return None
+
+
+def run_lookups(lookup, keys):
+    """Look up every key in turn with `lookup`."""
+    for key in keys:
+        lookup(key)
+
+
+def main():
+    """Run the benchmark."""
+    parser = make_parser("Benchmark NEO lookups by designation and by name.")
+    parser.add_argument('--lookups', type=int, default=100_000,
+                        help="The number of lookups to perform of each kind.")
+    parser.add_argument('--baseline-lookups', type=int, default=1_000,
+                        help="The number of linear-scan lookups to perform for comparison.")
+    args = parser.parse_args()
+
+    neos = load_neos(args.neofile)
+    database, seconds = timed(NEODatabase, neos, load_approaches(args.cadfile))
+    report(f"build database ({len(neos)} NEOs)", seconds)
+
+    rng = random.Random(0)
+    designations = [neo.designation for neo in neos]
+    names = [neo.name for neo in neos if neo.name]
+    designation_keys = [rng.choice(designations) for _ in range(args.lookups)]
+    name_keys = [rng.choice(names) for _ in range(args.lookups)]
+
+    _, seconds = timed(run_lookups, database.get_neo_by_designation, designation_keys)
+    report(f"indexed get_neo_by_designation x{args.lookups}", seconds, args.lookups)
+    _, seconds = timed(run_lookups, database.get_neo_by_name, name_keys)
+    report(f"indexed get_neo_by_name x{args.lookups}", seconds, args.lookups)
+
+    n = args.baseline_lookups
+    _, seconds = timed(run_lookups, lambda key: scan_by_designation(neos, key), designation_keys[:n])
+    report(f"linear scan by designation x{n}", seconds, n)
+    _, seconds = timed(run_lookups, lambda key: scan_by_name(neos, key), name_keys[:n])
+    report(f"linear scan by name x{n}", seconds, n)
+
+
+if __name__ == '__main__':
+    main()
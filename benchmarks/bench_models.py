@@ -0,0 +1,51 @@
+"""Benchmark the memory footprint of the model classes, in bytes per object.
+
+Each collection is loaded under `tracemalloc`, and the memory still allocated
+afterwards is divided by the number of objects. This includes each object's
+attribute values (such as its floats and strings) and its slot in the list.
+
+    $ python3 -m benchmarks.bench_models
+"""
+import gc
+import tracemalloc
+
+from benchmarks.common import make_parser
+from extract import load_neos, load_approaches
+from models import NearEarthObject, CompactNearEarthObject, CloseApproach, CompactCloseApproach
+
+
+def bytes_per_object(load, *args, **kwargs):
+    """Load a collection of objects and measure the memory it retains per object.
+
+    :return: A tuple of the number of objects and the bytes retained per object.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        objects = load(*args, **kwargs)
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return len(objects), (after - before) / len(objects)
+
+
+def main():
+    """Run the benchmark."""
+    parser = make_parser("Benchmark the memory footprint of NEOs and close approaches.")
+    args = parser.parse_args()
+
+    cases = {
+        'NearEarthObject': (load_neos, args.neofile, {'neo_class': NearEarthObject}),
+        'CompactNearEarthObject': (load_neos, args.neofile, {'neo_class': CompactNearEarthObject}),
+        'CloseApproach': (load_approaches, args.cadfile, {'approach_class': CloseApproach}),
+        'CompactCloseApproach': (load_approaches, args.cadfile, {'approach_class': CompactCloseApproach}),
+    }
+    for label, (load, path, kwargs) in cases.items():
+        count, size = bytes_per_object(load, path, **kwargs)
+        print(f"{label:<48} {size:12.1f} bytes/object  ({count} objects)")
+
+
+if __name__ == '__main__':
+    main()
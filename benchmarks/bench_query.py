@@ -0,0 +1,62 @@
+"""Benchmark `NEODatabase.query` on a handful of representative queries.
+
+For each query, reports the time to the first result, the time to take the
+first `--limit` results, and the time to drain the full result stream.
+
+    $ python3 -m benchmarks.bench_query
+    $ python3 -m benchmarks.bench_query --limit 100
+    $ python3 -m benchmarks.bench_query --engine numpy
+"""
+import datetime
+
+from benchmarks.common import make_parser, report, timed
+from columnar import ColumnarNEODatabase
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters, limit
+
+
+ENGINES = {
+    'python': NEODatabase,
+    'numpy': ColumnarNEODatabase,
+}
+
+QUERIES = {
+    'all': {},
+    'one week': {'start_date': datetime.date(2020, 3, 1), 'end_date': datetime.date(2020, 3, 7)},
+    'one day, max distance': {'date': datetime.date(2020, 3, 2), 'distance_max': 0.1},
+    'max distance 0.001': {'distance_max': 0.001},
+    'hazardous, min velocity': {'hazardous': True, 'velocity_min': 20},
+    'diameter bounds': {'diameter_min': 0.5, 'diameter_max': 1.5},
+}
+
+
+def first(results):
+    """Take the first result of a stream, if any."""
+    return next(iter(results), None)
+
+
+def main():
+    """Run the benchmark."""
+    parser = make_parser("Benchmark representative close approach queries.")
+    parser.add_argument('--limit', type=int, default=10,
+                        help="The number of results to take in the limited run.")
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='python',
+                        help="The query engine to benchmark.")
+    args = parser.parse_args()
+
+    database, seconds = timed(ENGINES[args.engine], load_neos(args.neofile), load_approaches(args.cadfile))
+    report("build database", seconds)
+
+    for label, criteria in QUERIES.items():
+        filters = create_filters(**criteria)
+        _, seconds = timed(first, database.query(filters))
+        report(f"{label}: first result", seconds)
+        _, seconds = timed(list, limit(database.query(filters), args.limit))
+        report(f"{label}: limit {args.limit}", seconds)
+        matches, seconds = timed(list, database.query(filters))
+        report(f"{label}: all {len(matches)} results", seconds)
+
+
+if __name__ == '__main__':
+    main()
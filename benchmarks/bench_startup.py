@@ -0,0 +1,48 @@
+"""Benchmark loading the database from the data files versus from a snapshot.
+
+The data files are copied to a temporary directory first, so that no snapshot
+is left behind next to the originals.
+
+    $ python3 -m benchmarks.bench_startup
+    $ python3 -m benchmarks.bench_startup --engine numpy
+"""
+import pathlib
+import shutil
+import tempfile
+
+from benchmarks.common import make_parser, report, timed
+from columnar import ColumnarNEODatabase
+from database import NEODatabase
+from snapshot import load_database
+
+
+ENGINES = {
+    'python': NEODatabase,
+    'numpy': ColumnarNEODatabase,
+}
+
+
+def main():
+    """Run the benchmark."""
+    parser = make_parser("Benchmark cold start with and without a snapshot.")
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='python',
+                        help="The database class to load.")
+    args = parser.parse_args()
+    database_class = ENGINES[args.engine]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        neo_path = pathlib.Path(tmp) / args.neofile.name
+        cad_path = pathlib.Path(tmp) / args.cadfile.name
+        shutil.copy(args.neofile, neo_path)
+        shutil.copy(args.cadfile, cad_path)
+
+        _, seconds = timed(load_database, neo_path, cad_path, database_class, use_snapshot=False)
+        report("parse data files", seconds)
+        _, seconds = timed(load_database, neo_path, cad_path, database_class)
+        report("parse data files and write snapshot", seconds)
+        _, seconds = timed(load_database, neo_path, cad_path, database_class)
+        report("reopen snapshot", seconds)
+
+
+if __name__ == '__main__':
+    main()
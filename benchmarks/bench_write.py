@@ -0,0 +1,50 @@
+"""Benchmark exporting every close approach to CSV, JSON and JSON Lines.
+
+Each export streams the full result of an unfiltered query to a file in a
+temporary directory. It's timed once as is, and then run again under
+`tracemalloc` to report the peak memory it allocated on top of the database.
+
+    $ python3 -m benchmarks.bench_write
+"""
+import pathlib
+import tempfile
+import tracemalloc
+
+from benchmarks.common import make_parser, report, timed
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from write import write_to_csv, write_to_json, write_to_jsonl
+
+
+WRITERS = {
+    'csv': write_to_csv,
+    'json': write_to_json,
+    'jsonl': write_to_jsonl,
+}
+
+
+def main():
+    """Run the benchmark."""
+    parser = make_parser("Benchmark full exports of the close approaches.")
+    args = parser.parse_args()
+
+    database = NEODatabase(load_neos(args.neofile), load_approaches(args.cadfile))
+    count = len(database._approaches)
+    with tempfile.TemporaryDirectory() as directory:
+        for suffix, writer in WRITERS.items():
+            path = pathlib.Path(directory) / f'results.{suffix}'
+            _, seconds = timed(writer, database.query(create_filters()), path)
+            report(f"export {count} approaches to {suffix}", seconds, count)
+
+            tracemalloc.start()
+            try:
+                writer(database.query(create_filters()), path)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            print(f"{'':<48} {peak / 1024:12.1f} KiB peak, {path.stat().st_size / 1024:.1f} KiB written")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Shared scaffolding for the benchmark scripts.
+
+The `make_parser` function builds an `ArgumentParser` with the same data file
+options as the main module, and `report` prints a timing in a uniform format.
+"""
+import argparse
+import pathlib
+import time
+
+
+# Paths to the root of the project and the `data` subfolder.
+PROJECT_ROOT = pathlib.Path(__file__).parent.parent.resolve()
+DATA_ROOT = PROJECT_ROOT / 'data'
+
+
+def make_parser(description):
+    """Create an ArgumentParser accepting the `--neofile` and `--cadfile` options.
+
+    :param description: A description of the benchmark.
+    :return: An `argparse.ArgumentParser`.
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--neofile', default=(DATA_ROOT / 'neos.csv'),
+                        type=pathlib.Path,
+                        help="Path to CSV file of near-Earth objects.")
+    parser.add_argument('--cadfile', default=(DATA_ROOT / 'cad.json'),
+                        type=pathlib.Path,
+                        help="Path to JSON file of close approach data.")
+    return parser
+
+
+def timed(func, *args, **kwargs):
+    """Call `func(*args, **kwargs)` and measure how long it takes.
+
+    :return: A tuple of the return value and the elapsed wall time in seconds.
+    """
+    start = time.perf_counter()
+    value = func(*args, **kwargs)
+    return value, time.perf_counter() - start
+
+
+def report(label, seconds, count=None):
+    """Print a single benchmark measurement.
+
+    :param label: What was measured.
+    :param seconds: The elapsed wall time in seconds.
+    :param count: The number of operations performed, to also report a per-operation cost.
+    """
+    if count:
+        print(f"{label:<48} {seconds * 1e3:12.3f} ms  {seconds / count * 1e6:10.3f} us/op")
+    else:
+        print(f"{label:<48} {seconds * 1e3:12.3f} ms")
@@ -0,0 +1,86 @@
+"""Represent sets of row numbers as bitmaps, packed into Python integers.
+
+Bit `i` of a bitmap is set if row `i` is in the set, so the intersection of two
+sets is a bitwise AND of their bitmaps, which Python evaluates a machine word at
+a time.
+
+The `bitmap_from_rows` function packs an iterable of row numbers into a bitmap,
+and `bitmap_from_range` builds the bitmap of a contiguous run of rows. The
+`iter_bitmap` function unpacks a bitmap into its row numbers, in ascending order,
+skipping over empty words, and `popcount` counts them. The `insert_gaps`
+function makes room in a bitmap for rows inserted among the ones it covers.
+"""
+import array
+import sys
+
+
+# The number of rows covered by each word that `iter_bitmap` unpacks at once.
+WORD_BITS = 64
+
+
+def bitmap_from_rows(rows, size):
+    """Pack row numbers into a bitmap.
+
+    :param rows: An iterable of row numbers, each less than `size`.
+    :param size: The total number of rows.
+    :return: A bitmap with the bit of each row set.
+    """
+    packed = bytearray((size + 7) // 8)
+    for row in rows:
+        packed[row >> 3] |= 1 << (row & 7)
+    return int.from_bytes(packed, 'little')
+
+
+def bitmap_from_range(start, stop):
+    """Build the bitmap of the rows from `start` (inclusive) to `stop` (exclusive)."""
+    if stop <= start:
+        return 0
+    return ((1 << (stop - start)) - 1) << start
+
+
+def iter_bitmap(bitmap, size):
+    """Generate the row numbers whose bits are set in a bitmap, in ascending order.
+
+    :param bitmap: A bitmap of rows.
+    :param size: The total number of rows.
+    :return: A stream of row numbers.
+    """
+    words = array.array('Q', bitmap.to_bytes(-(-size // WORD_BITS) * 8, 'little'))
+    if sys.byteorder != 'little':
+        words.byteswap()
+    for index, word in enumerate(words):
+        if not word:
+            continue
+        base = index * WORD_BITS
+        while word:
+            lowest = word & -word
+            yield base + lowest.bit_length() - 1
+            word ^= lowest
+
+
+def popcount(bitmap):
+    """Count the rows in a bitmap."""
+    return bin(bitmap).count('1')
+
+
+def insert_gaps(bitmap, points):
+    """Shift the rows of a bitmap up to make room for new rows, whose bits are left clear.
+
+    A new row inserted at point `p` comes just before the existing row `p`, so
+    each existing row moves up by the number of points at or below it. The
+    bitmap is split in half around the middle point, recursively, so each level
+    of the recursion shifts every word once, rather than every point doing so.
+
+    :param bitmap: A bitmap of rows.
+    :param points: The insertion points of the new rows among the existing rows, in ascending order.
+    :return: The bitmap of the same rows, at their positions after the insertions.
+    """
+    if not points or not bitmap:
+        return bitmap
+    middle = len(points) // 2
+    point = points[middle]
+    low = bitmap & ((1 << point) - 1)
+    high = bitmap >> point
+    # Every point below the middle one is at or below each row of the high half.
+    return (insert_gaps(low, points[:middle])
+            | insert_gaps(high, [other - point for other in points[middle + 1:]]) << (point + middle + 1))
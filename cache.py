@@ -0,0 +1,176 @@
+"""Cache the results of repeated queries against an `NEODatabase`.
+
+A `QueryCache` remembers, for each distinct collection of filters, the sorted
+positions of the close approaches that matched it (as indexed by the database's
+`query_positions`) - not the approaches themselves. A repeated query is served
+from those positions, and a query for more results than were cached resumes the
+database query just past the last cached position, so a new `--limit` on the
+same filters never repeats work.
+
+The least recently used entries are evicted once the cache holds more than a
+maximum number of entries or a maximum (approximate) number of bytes.
+
+The database may be a `VersionedDatabase`. Positions only index the version
+they were found in, so the cache is cleared whenever a new version is current,
+or whenever `add_neos` or `add_approaches` changes the current one.
+"""
+import array
+import collections
+import itertools
+import logging
+import sys
+
+from versions import current_version
+
+logging.basicConfig()
+
+# Create logger and set the log level
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.ERROR)
+
+# The default bounds on the number of entries and their total size, in bytes.
+MAX_ENTRIES = 128
+MAX_BYTES = 64 * 1024 * 1024
+
+
+def canonical_filters(filters):
+    """Build a hashable key that identifies a collection of filters, regardless of its order.
+
+    :param filters: A collection of filters, as produced by `create_filters`.
+    :return: A tuple of each filter's key, class, comparator and reference value, sorted by key.
+    """
+    return tuple(sorted((key, type(f).__name__, f.op.__name__, f.value) for key, f in filters.items()))
+
+
+class QueryCache:
+    """A bounded, least-recently-used cache of the positions that match each query.
+
+    Each entry maps the canonical form of a collection of filters to the
+    positions that have matched it so far, as an `array('q')`, and whether
+    those are all of its matches.
+    """
+    def __init__(self, database, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        """Create a new, empty `QueryCache`.
+
+        :param database: The `NEODatabase` whose queries to cache.
+        :param max_entries: The maximum number of entries to keep.
+        :param max_bytes: The maximum approximate total size of the entries, in bytes.
+        """
+        self.database = database
+        self._version = None
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = collections.OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def entry_size(positions):
+        """Approximate the size of an entry's positions, in bytes."""
+        return sys.getsizeof(positions)
+
+    def get(self, key):
+        """Fetch the entry for a canonical collection of filters, marking it recently used.
+
+        :param key: The canonical form of a collection of filters.
+        :return: A tuple of the cached positions and whether they're complete, or None.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, positions, complete):
+        """Store the positions that match a canonical collection of filters, evicting as needed.
+
+        :param key: The canonical form of a collection of filters.
+        :param positions: The matching positions found so far, as an `array('q')`.
+        :param complete: Whether those are all of the matching positions.
+        """
+        self.discard(key)
+        size = self.entry_size(positions)
+        if size > self.max_bytes:
+            logger.info(f'Not caching {len(positions)} positions for {key}.')
+            return
+        self._entries[key] = (positions, complete)
+        self.size += size
+        while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self.size -= self.entry_size(evicted)
+
+    def discard(self, key):
+        """Remove the entry for a canonical collection of filters, if there is one."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= self.entry_size(entry[0])
+
+    def clear(self):
+        """Remove every entry."""
+        self._entries.clear()
+        self.size = 0
+
+    def query(self, filters, n=None):
+        """Generate at most `n` close approaches that match a collection of filters, through the cache.
+
+        Cached positions are served first. If they run out before `n` results
+        and the cached query didn't run to completion, the database query
+        resumes just past the last cached position, and the new positions are
+        cached as they're found.
+
+        :param filters: A collection of filters, as produced by `create_filters`.
+        :param n: The maximum number of results, or None (or 0) for all of them.
+        :return: A stream of matching `CloseApproach` objects, in order of approach time.
+        :raises ValueError: If the limit is negative.
+        """
+        if n is not None and n < 0:
+            raise ValueError(f"The limit must not be negative, not {n}.")
+        return self.serve_query(filters, n)
+
+    def serve_query(self, filters, n):
+        """Generate the results of `query`, once its limit is known to be valid."""
+        database = current_version(self.database)
+        version = (database, database.revision)
+        if version != self._version:
+            self.clear()
+            self._version = version
+        key = canonical_filters(filters)
+        entry = self.get(key)
+        if entry is None:
+            self.misses += 1
+            positions, complete = array.array('q'), False
+        else:
+            positions, complete = entry
+            if complete or (n and len(positions) >= n):
+                self.hits += 1
+                yield from database.get_approaches(positions[:n] if n else positions)
+                return
+            self.misses += 1
+            # Take the positions out of the cache while they grow, and put them back after.
+            self.discard(key)
+
+        cached = len(positions)
+        remaining = n - cached if n else None
+        complete = False
+        try:
+            yield from database.get_approaches(positions)
+            stream = database.query_positions(filters, positions[-1] + 1 if positions else 0)
+            yield from database.get_approaches(record(itertools.islice(stream, remaining), positions))
+            # Fewer than `remaining` new matches means there are no more. Exactly
+            # `remaining` leaves it unknown until the next query that needs more.
+            complete = remaining is None or len(positions) - cached < remaining
+        finally:
+            # Cache whatever positions were found, even if the consumer stopped early,
+            # unless they index a version that's no longer current.
+            if version == self._version:
+                self.put(key, positions, complete)
+
+
+def record(positions, into):
+    """Generate positions, appending each one to an array as it passes through."""
+    for position in positions:
+        into.append(position)
+        yield position
@@ -0,0 +1,240 @@
+"""A columnar variant of the NEO database, with queries evaluated by NumPy.
+
+A `ColumnarNEODatabase` behaves exactly like an `NEODatabase`, but additionally
+stores its time-sorted close approaches as a table of NumPy columns:
+
+    time        int64 minutes since the Unix epoch
+    distance    float64 nominal approach distance, in au
+    velocity    float64 relative approach velocity, in km/s
+    diameter    float64 diameter of the approaching NEO, in km (NaN if unknown)
+    hazardous   bool, whether the approaching NEO is potentially hazardous
+
+Queries evaluate the output of `create_filters` as boolean masks over these
+columns, one chunk of rows at a time, and only materialize the `CloseApproach`
+objects for the rows that match.
+
+NumPy is an optional dependency of this project - constructing a
+`ColumnarNEODatabase` without it installed raises an `ImportError`.
+"""
+import logging
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from bitmaps import WORD_BITS
+from database import NEODatabase, DATE_FILTER_KEYS
+from filters import compile_filters
+
+logging.basicConfig()
+
+# Create logger and set the log level
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.ERROR)
+
+# The column that each filter from `create_filters` compares against.
+FILTER_COLUMNS = {
+    'distance_min': 'distance',
+    'distance_max': 'distance',
+    'velocity_min': 'velocity',
+    'velocity_max': 'velocity',
+    'diameter_min': 'diameter',
+    'diameter_max': 'diameter',
+    'hazardous': 'hazardous',
+}
+
+
+class ColumnarNEODatabase(NEODatabase):
+    """A database of near-Earth objects whose close approaches are also stored as columns.
+
+    Lookups by designation or name are inherited from `NEODatabase`; only the
+    evaluation of `query_positions` (and so of `query`) and of the scan stage of
+    `explain` differs.
+    """
+    # The number of rows to evaluate at once, so that a limited query stops early.
+    chunk_size = 65536
+
+    def __init__(self, neos, approaches):
+        """Create a new `ColumnarNEODatabase`.
+
+        :param neos: A collection of `NearEarthObject`s.
+        :param approaches: A collection of `CloseApproach`es.
+        """
+        if np is None:
+            raise ImportError("ColumnarNEODatabase requires NumPy; install it with `pip install numpy`.")
+        super().__init__(neos, approaches)
+        self._columns = self.build_columns(self._approaches)
+
+    @staticmethod
+    def build_columns(approaches):
+        """Build the column table for a sequence of linked close approaches.
+
+        :param approaches: A sequence of `CloseApproach`es, each linked to its NEO.
+        :return: A dictionary mapping column names to NumPy arrays.
+        """
+        count = len(approaches)
+        neos = [approach.neo for approach in approaches]
+        return {
+            'time': np.fromiter((approach.epoch_minutes for approach in approaches),
+                                dtype=np.int64, count=count),
+            'distance': np.fromiter((approach.distance for approach in approaches),
+                                    dtype=np.float64, count=count),
+            'velocity': np.fromiter((approach.velocity for approach in approaches),
+                                    dtype=np.float64, count=count),
+            'diameter': np.fromiter((neo.diameter if neo else float('nan') for neo in neos),
+                                    dtype=np.float64, count=count),
+            'hazardous': np.fromiter((bool(neo and neo.hazardous) for neo in neos),
+                                     dtype=np.bool_, count=count),
+        }
+
+    def insert_rows(self, points, approaches):
+        """Insert linked close approaches, as by `NEODatabase.insert_rows`, and into the columns too."""
+        super().insert_rows(points, approaches)
+        columns = self.build_columns(approaches)
+        self._columns = {name: np.insert(column, points, columns[name])
+                         for name, column in self._columns.items()}
+
+    def link_rows(self, rows):
+        """Update the indexes, bitmaps and NEO columns for rows newly linked to their NEOs."""
+        super().link_rows(rows)
+        columns = self.build_columns([self._approaches[row] for row in rows])
+        for name in ('diameter', 'hazardous'):
+            # Columns reopened from a snapshot are read-only views, so update a copy.
+            column = self._columns[name].copy()
+            column[rows] = columns[name]
+            self._columns[name] = column
+
+    def get_mask(self, filters, start, stop, counts=None):
+        """Evaluate the column filters over rows `start:stop` as a boolean mask.
+
+        Date filters are resolved by the caller, and filters without a known
+        column are left for the caller to apply per object.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :param start: The first row to evaluate.
+        :param stop: One past the last row to evaluate.
+        :param counts: A list to add the number of rows that survive each column
+            filter to, in the order they're applied, or None not to count them.
+        :return: A boolean NumPy array with one element per row.
+        """
+        mask = np.ones(stop - start, dtype=np.bool_)
+        applied = 0
+        for key, f in filters.items():
+            column = FILTER_COLUMNS.get(key)
+            if column is None:
+                continue
+            values = self._columns[column][start:stop]
+            if column == 'hazardous':
+                # `HazardousFilter` compares with `is`, which doesn't broadcast.
+                mask &= values == bool(f.value)
+            else:
+                mask &= f.op(values, f.value)
+            if counts is not None:
+                counts[applied] += int(np.count_nonzero(mask))
+            applied += 1
+        return mask
+
+    def get_scan_cost(self, rows, fraction):
+        """Estimate the cost of scanning rows of the time range, in rows examined one at a time.
+
+        The column filters are evaluated as masks, which cost about as much per
+        row as intersecting bitmaps does, so only the rows that pass them are
+        examined one at a time.
+
+        :param rows: The number of rows in the unpruned partitions of the time range.
+        :param fraction: The estimated fraction of them that the column filters pass.
+        :return: The estimated cost.
+        """
+        return rows / WORD_BITS + rows * fraction
+
+    def query_positions(self, filters, first_position=0):
+        """Generate the positions of the close approaches that match a collection of filters.
+
+        This generates the same stream as `NEODatabase.query_positions`, but
+        evaluates the filters over the columns, unless the query plan walks a
+        selective range of a sorted index or an intersection of bitmaps instead.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :param first_position: The lowest position to generate, to resume an earlier query.
+        :return: A stream of positions of matching `CloseApproach` objects.
+        """
+        logger.debug(f'Query columns using {filters}.')
+        rows, answered = self.get_rows(filters, first_position)
+        approaches = self._approaches
+        if not isinstance(rows, range):
+            # A selective set of rows is short enough to check one row at a time.
+            residual = {key: f for key, f in filters.items() if key not in answered}
+            predicate = compile_filters(residual, self.get_selectivity(residual))
+            for index in rows:
+                if predicate(approaches[index]):
+                    yield index
+            return
+
+        predicate = compile_filters({key: f for key, f in filters.items()
+                                     if key not in DATE_FILTER_KEYS and key not in FILTER_COLUMNS})
+        for chunk_start, chunk_stop in self.get_chunks(self.get_partition_ranges(filters, rows)):
+            mask = self.get_mask(filters, chunk_start, chunk_stop)
+            for index in np.flatnonzero(mask).tolist():
+                if predicate(approaches[chunk_start + index]):
+                    yield chunk_start + index
+
+    def get_chunks(self, ranges):
+        """Split ranges of rows into chunks of at most `chunk_size` rows.
+
+        :param ranges: An iterable of `range`s of rows, as from `get_partition_ranges`.
+        :return: A stream of the start and stop rows of each chunk, in order.
+        """
+        for part in ranges:
+            for chunk_start in range(part.start, part.stop, self.chunk_size):
+                yield chunk_start, min(chunk_start + self.chunk_size, part.stop)
+
+    def explain_scan(self, filters, rows, answered):
+        """Prepare the scan stage of `explain`, evaluating a time range over the columns as `query_positions` does.
+
+        The unpruned partitions of the time range are scanned a chunk at a time:
+        the column filters are evaluated as a mask over the chunk, in the `mask`
+        stage, and then the rows that pass it are checked against any remaining
+        filters, one at a time. `matched` counts the rows of the chunks that
+        survive each column filter, in the order the mask applies them, and
+        then each remaining filter. Any other access path is scanned one object
+        at a time, as by `NEODatabase.explain_scan`.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :param rows: The positions to examine, as from `get_rows`.
+        :param answered: The keys of the filters that every approach at those positions satisfies.
+        :return: A tuple of a generator of the matching approaches, and a
+            dictionary describing the scan, as from `NEODatabase.explain_scan`.
+        """
+        if not isinstance(rows, range):
+            return super().explain_scan(filters, rows, answered)
+
+        columns = tuple(key for key in filters if key in FILTER_COLUMNS)
+        residual = {key: f for key, f in filters.items() if key not in DATE_FILTER_KEYS and key not in FILTER_COLUMNS}
+        order = compile_filters(residual).order
+        checks = [compile_filters({key: residual[key]}) for key in order]
+        ranges = self.get_partition_ranges(filters, rows)
+        details = {'engine': 'numpy', 'partitions': (len(ranges), len(self._partitions)),
+                   'order': columns + order, 'examined': 0, 'matched': [0] * (len(columns) + len(order)),
+                   'seconds': {'mask': 0.0}}
+
+        def scan():
+            approaches = self._approaches
+            matched = details['matched']
+            for chunk_start, chunk_stop in self.get_chunks(ranges):
+                start_time = time.perf_counter()
+                mask = self.get_mask(filters, chunk_start, chunk_stop, matched)
+                indices = np.flatnonzero(mask).tolist()
+                details['seconds']['mask'] += time.perf_counter() - start_time
+                details['examined'] += chunk_stop - chunk_start
+                for index in indices:
+                    approach = approaches[chunk_start + index]
+                    for position, check in enumerate(checks, len(columns)):
+                        if not check(approach):
+                            break
+                        matched[position] += 1
+                    else:
+                        yield approach
+
+        return scan(), details
@@ -0,0 +1,88 @@
+"""Open data and output files as text streams, compressed or not.
+
+A path that ends in `.gz` is read and written through `gzip`, and one that ends
+in `.zst` through Zstandard - with `compression.zstd` from Python 3.14, or with
+the optional `zstandard` module otherwise. Either way, the file is decompressed
+or compressed incrementally as the returned text stream is read or written, and
+never inflated to a temporary copy. Any other path is opened as usual.
+
+The `compression_of` function names the compression of a path, if any, and
+`strip_compression` removes its compression suffix, so that the format of the
+data within (such as `.csv` in `results.csv.gz`) can be found. `check_support`
+raises the `ImportError` that `open_text` would, before anything is read or
+written, if a path's compression can't be handled here.
+"""
+import gzip
+import pathlib
+
+try:
+    from compression import zstd
+except ImportError:
+    zstd = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# The compression of each file suffix that `open_text` understands.
+COMPRESSION_SUFFIXES = {
+    '.gz': 'gzip',
+    '.zst': 'zstd',
+}
+
+# The level at which gzip output is compressed, trading some size for speed.
+GZIP_LEVEL = 6
+
+
+def compression_of(path):
+    """Name the compression of a file by the suffix of its path.
+
+    :param path: A Path-like object.
+    :return: 'gzip', 'zstd' or None.
+    """
+    return COMPRESSION_SUFFIXES.get(pathlib.PurePath(str(path)).suffix.lower())
+
+
+def strip_compression(path):
+    """Remove any compression suffix from a path.
+
+    :param path: A Path-like object, such as `results.csv.gz`.
+    :return: A `pathlib.Path` without the compression suffix, such as `results.csv`.
+    """
+    path = pathlib.Path(path)
+    return path.with_suffix('') if compression_of(path) else path
+
+
+def check_support(path):
+    """Check that the compression of a file, if any, can be read and written here.
+
+    :param path: A Path-like object.
+    :raises ImportError: If the file is compressed with Zstandard, and neither
+        `compression.zstd` nor `zstandard` is available.
+    """
+    if compression_of(path) == 'zstd' and zstd is None and zstandard is None:
+        raise ImportError(f"Opening {path} requires Python 3.14 or the zstandard module; "
+                          "install it with `pip install zstandard`.")
+
+
+def open_text(path, mode='r', newline=None):
+    """Open a file as a text stream, compressing or decompressing it by its suffix.
+
+    :param path: A Path-like object.
+    :param mode: 'r' to read, or 'w' to write.
+    :param newline: How to translate line endings, as for the built-in `open`.
+    :return: A text file object.
+    """
+    check_support(path)
+    compression = compression_of(path)
+    if compression == 'gzip':
+        if 'w' in mode:
+            return gzip.open(path, mode + 't', compresslevel=GZIP_LEVEL, newline=newline)
+        return gzip.open(path, mode + 't', newline=newline)
+    if compression == 'zstd':
+        if zstd is not None:
+            return zstd.open(path, mode + 't', newline=newline)
+        return zstandard.open(path, mode + 't', newline=newline)
+    return open(path, mode, newline=newline)
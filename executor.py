@@ -0,0 +1,250 @@
+"""Run concurrent queries against an `NEODatabase`, coalescing identical ones and bounding the rest.
+
+A `QueryExecutor` stands between many concurrent clients and one database. Its
+`query` method starts a scan for a collection of filters (and a limit) in one of
+a fixed number of worker threads, and returns a stream of the matching close
+approaches that follows the scan as it goes. A query for the same filters and
+limit as a scan still in flight doesn't start another - it joins that scan, and
+is served the same positions, from the first, as the scan finds them.
+
+At most `max_scans` scans run at once. Up to `max_queue` more wait for a worker,
+in order of arrival, and a query that would start a scan beyond that is refused
+with `Overloaded` straight away, rather than waiting behind a queue that only
+grows - so that under load, the latency of the queries that are accepted stays
+bounded. A scan that every one of its clients has abandoned stops early.
+
+Code running in an event loop follows a scan with `query_batches` instead, an
+asynchronous stream of batches of results. The scan wakes its waiting clients
+through their event loops, so a client never ties up a thread while it waits for
+more results - however many clients are waiting, on however many scans.
+
+The database may be a `VersionedDatabase`, in which case each scan reads the
+version that was current when it started, and only queries of the same version
+are coalesced.
+"""
+import array
+import asyncio
+import concurrent.futures
+import itertools
+import logging
+import threading
+
+from cache import canonical_filters
+from versions import current_version
+
+logging.basicConfig()
+
+# Create logger and set the log level
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.ERROR)
+
+# The default bounds on the number of running scans, and scans waiting to run.
+MAX_SCANS = 4
+MAX_QUEUE = 64
+
+# The number of positions a scan finds between waking its clients.
+BATCH_SIZE = 256
+
+
+class Overloaded(Exception):
+    """A query was refused because the executor's queue is full."""
+
+
+class Flight:
+    """A scan in progress, and the positions it has found so far, shared by every client that joined it."""
+    def __init__(self, key, database):
+        self.key = key
+        self.database = database
+        self.positions = array.array('q')
+        self.done = False
+        self.error = None
+        self.clients = 0
+        self.wakers = set()
+        self.condition = threading.Condition()
+
+    def wake(self):
+        """Wake every client waiting for the flight to find more positions or finish; hold the condition to call it."""
+        self.condition.notify_all()
+        for waker in self.wakers:
+            waker()
+
+    def run(self, filters, n=None):
+        """Scan the flight's database into the flight, a batch at a time, until the scan ends or is abandoned.
+
+        Any error, including one in starting the scan, is kept for the flight's
+        clients to raise. The flight isn't marked done here, but by the executor
+        once it's retired the scan.
+
+        :param filters: A collection of filters, as produced by `create_filters`.
+        :param n: The maximum number of positions to find, or None (or 0) for all of them.
+        """
+        try:
+            stream = itertools.islice(self.database.query_positions(filters), n or None)
+            while True:
+                batch = list(itertools.islice(stream, BATCH_SIZE))
+                with self.condition:
+                    self.positions.extend(batch)
+                    if not batch or not self.clients:
+                        break
+                    self.wake()
+        except Exception as err:
+            logger.error(f'Query {self.key} failed: {err}')
+            self.error = err
+
+    def follow(self):
+        """Generate the flight's positions from the first, waiting for the scan to find more as needed."""
+        index = 0
+        while True:
+            with self.condition:
+                while index == len(self.positions) and not self.done:
+                    self.condition.wait()
+                found = self.positions[index:]
+                done = self.done
+            if found:
+                index += len(found)
+                yield from found
+            elif done:
+                if self.error is not None:
+                    raise self.error
+                return
+
+
+class QueryExecutor:
+    """A bounded pool of scans over an `NEODatabase`, shared by identical concurrent queries."""
+    def __init__(self, database, max_scans=MAX_SCANS, max_queue=MAX_QUEUE):
+        """Create a new `QueryExecutor`.
+
+        :param database: The `NEODatabase` to query.
+        :param max_scans: The maximum number of scans to run at once.
+        :param max_queue: The maximum number of scans to keep waiting for a worker.
+        """
+        self.database = database
+        self.max_scans = max_scans
+        self.max_queue = max_queue
+        self._workers = concurrent.futures.ThreadPoolExecutor(max_workers=max_scans,
+                                                              thread_name_prefix='query')
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.scans = 0
+        self.coalesced = 0
+        self.rejected = 0
+
+    def query(self, filters, n=None):
+        """Start (or join) the scan for a collection of filters, and follow its results.
+
+        :param filters: A collection of filters, as produced by `create_filters`.
+        :param n: The maximum number of results, or None (or 0) for all of them.
+        :return: A stream of matching `CloseApproach` objects, in order of approach time.
+        :raises ValueError: If the limit is negative.
+        :raises Overloaded: If the query would start a scan, and too many are already waiting.
+        """
+        return self.follow(self.admit(filters, n))
+
+    def query_batches(self, filters, n=None):
+        """Start (or join) the scan for a collection of filters, and follow its results from an event loop.
+
+        :param filters: A collection of filters, as produced by `create_filters`.
+        :param n: The maximum number of results, or None (or 0) for all of them.
+        :return: An asynchronous stream of lists of matching `CloseApproach`
+            objects, in order of approach time, which must be closed (with
+            `aclose`) if it isn't exhausted.
+        :raises ValueError: If the limit is negative.
+        :raises Overloaded: If the query would start a scan, and too many are already waiting.
+        """
+        return self.follow_batches(self.admit(filters, n))
+
+    def admit(self, filters, n):
+        """Find the flight of a query's scan, starting one if there's room, and join it as a client."""
+        if n is not None and n < 0:
+            raise ValueError(f"The limit must not be negative, not {n}.")
+        database = current_version(self.database)
+        key = (canonical_filters(filters), n or None, id(database))
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                with flight.condition:
+                    flight.clients += 1
+            elif self.admitted >= self.max_scans + self.max_queue:
+                self.rejected += 1
+                raise Overloaded(f"{self.admitted} queries are already running or waiting; try again later.")
+            else:
+                self.scans += 1
+                self.admitted += 1
+                flight = self._flights[key] = Flight(key, database)
+                flight.clients = 1
+                self._workers.submit(self.scan, flight, filters, n)
+        return flight
+
+    def scan(self, flight, filters, n):
+        """Run a flight's scan in a worker thread, and retire it before its clients see that it's done."""
+        try:
+            if flight.clients:
+                flight.run(filters, n)
+        finally:
+            with self._lock:
+                self.admitted -= 1
+                if self._flights.get(flight.key) is flight:
+                    del self._flights[flight.key]
+            with flight.condition:
+                flight.done = True
+                flight.wake()
+
+    def follow(self, flight):
+        """Follow a flight as one of its clients, leaving it once the stream is exhausted or closed."""
+        try:
+            yield from flight.database.get_approaches(flight.follow())
+        finally:
+            self.leave(flight)
+
+    async def follow_batches(self, flight):
+        """Follow a flight as one of its clients from an event loop, a batch of close approaches at a time.
+
+        Between batches, the client waits on an `asyncio.Event` that the scan
+        sets through the event loop, rather than blocking a thread.
+        """
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+
+        def waker():
+            try:
+                loop.call_soon_threadsafe(ready.set)
+            except RuntimeError:
+                # The event loop has closed, so there's nobody left to wake.
+                pass
+
+        with flight.condition:
+            flight.wakers.add(waker)
+        index = 0
+        try:
+            while True:
+                ready.clear()
+                with flight.condition:
+                    found = flight.positions[index:index + BATCH_SIZE]
+                    done = flight.done
+                if found:
+                    index += len(found)
+                    yield list(flight.database.get_approaches(found))
+                elif done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                else:
+                    await ready.wait()
+        finally:
+            with flight.condition:
+                flight.wakers.discard(waker)
+            self.leave(flight)
+
+    def leave(self, flight):
+        """Remove a client from a flight, and stop its scan if that was the last one."""
+        with self._lock, flight.condition:
+            flight.clients -= 1
+            if not flight.clients and not flight.done and self._flights.get(flight.key) is flight:
+                # Nobody can join a scan that's about to stop.
+                del self._flights[flight.key]
+
+    def shutdown(self):
+        """Stop the workers, once every admitted scan has finished."""
+        self._workers.shutdown(wait=True)
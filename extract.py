@@ -2,10 +2,24 @@
 
 The `load_neos` function extracts NEO data from a CSV file, formatted as
 described in the project instructions, into a collection of `NearEarthObject`s.
+Only the columns that a `NearEarthObject` needs, plus any that the caller asks
+for, are extracted from each row.
 
 The `load_approaches` function extracts close approach data from a JSON file,
 formatted as described in the project instructions, into a collection of
-`CloseApproach` objects.
+`CloseApproach` objects. It's built on `iter_approaches`, which streams the
+`CloseApproach` objects out of the file one row at a time, so that a file of any
+size can be processed in bounded memory.
+
+Close approach data may also be split across several JSON files, such as one
+export per year. The `load_merged_approaches` function combines them with a
+k-way merge on approach time, so the combined collection comes out in time order
+without being sorted as a whole, and drops any approach that an overlapping
+export repeats. The `expand_paths` function expands glob patterns into the paths
+of such a set of files.
+
+Either file may be compressed with gzip (`.gz`) or Zstandard (`.zst`), in which
+case it's decompressed as a stream while it's read.
 
 The main module calls these functions with the arguments provided at the command
 line, and uses the resulting collections to build an `NEODatabase`.
@@ -13,8 +27,14 @@ line, and uses the resulting collections to build an `NEODatabase`.
 You'll edit this file in Task 2.
 """
 import csv
+import glob
+import heapq
 import json
+import operator
+import pathlib
+import re
 
+from compressed import compression_of, open_text
 from models import NearEarthObject, CloseApproach
 
 import logging
@@ -24,36 +44,321 @@ logging.basicConfig()
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.ERROR)
 
+# The number of characters to read from a JSON file at once.
+CHUNK_SIZE = 1 << 16
+
+# The number of characters at the end of a JSON file to search for a trailing `fields` header.
+FIELDS_TAIL_SIZE = 1 << 16
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
 
-def load_neos(neo_csv_path=r'C:\Users\alex.jacobs\PycharmProjects\neo\data\neos.csv'):
+
+def load_neos(neo_csv_path=r'C:\Users\alex.jacobs\PycharmProjects\neo\data\neos.csv', columns=(),
+              neo_class=NearEarthObject):
     """Read near-Earth object information from a CSV file.
 
+    Only the `pdes`, `name`, `diameter` and `pha` columns are extracted, along
+    with any additional `columns`, which are kept in each NEO's `info`.
+
     :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+    :param columns: The names of additional columns to extract.
+    :param neo_class: The class of NEO to construct, such as `CompactNearEarthObject`.
     :return: A collection of `NearEarthObject`s.
     """
     logger.debug(f'Loading NEOs from {neo_csv_path}')
+    names = neo_class.fields + tuple(name for name in columns if name not in neo_class.fields)
     neos = []
-    data_dict = {}
-    with open(neo_csv_path) as csvfile:
-        reader = csv.DictReader(csvfile)
-        for data in reader:
-            for d, value in data.items():
-                data_dict[d] = value
-            neos.append(NearEarthObject(data))
+    with open_text(neo_csv_path, newline='') as csvfile:
+        reader = csv.reader(csvfile)
+        header = next(reader, [])
+        missing = [name for name in names if name not in header]
+        if missing:
+            raise ValueError(f"{neo_csv_path} has no column(s) named {', '.join(missing)}.")
+
+        # Project each row onto just the columns of interest.
+        project = operator.itemgetter(*(header.index(name) for name in names))
+        for row in reader:
+            if not row:
+                # Skip blank lines, as `csv.DictReader` does.
+                continue
+            neos.append(neo_class(dict(zip(names, project(row)))))
     return neos
 
 
-def load_approaches(cad_json_path=r'C:\Users\alex.jacobs\PycharmProjects\neo\data\cad.json'):
+class _JSONStream:
+    """An incremental reader of the tokens of a JSON document.
+
+    The document is read in chunks of `CHUNK_SIZE` characters, and only the
+    unconsumed remainder of the current chunk is kept in memory. Each value is
+    decoded with `json.JSONDecoder.raw_decode` once the buffer holds all of it.
+    """
+    def __init__(self, f):
+        """Create a new `_JSONStream` over a text file object."""
+        self.f = f
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def fill(self):
+        """Read another chunk into the buffer, discarding what's been consumed."""
+        chunk = self.f.read(CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+
+    def peek(self):
+        """Skip whitespace and return the next character, or '' at the end of the document."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or self.eof:
+                return self.buffer[self.pos:self.pos + 1]
+            self.fill()
+
+    def expect(self, char):
+        """Consume the next character, which must be `char`."""
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at {self.buffer[self.pos:self.pos + 20]!r}.")
+        self.pos += 1
+
+    def value(self):
+        """Decode and consume the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            else:
+                # A number that runs to the end of the buffer might continue in the next chunk.
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            self.fill()
+
+
+def _iter_cad_members(f):
+    """Generate the top-level members of a close approach JSON document, streaming `data`.
+
+    Each top-level member is generated as a `(key, value)` pair, except that
+    each element of the `data` array is generated as its own `('data', row)`
+    pair instead of decoding the whole array.
+
+    :param f: A text file object positioned at the start of the document.
+    :yield: `(key, value)` pairs.
+    """
+    stream = _JSONStream(f)
+    stream.expect('{')
+    if stream.peek() == '}':
+        return
+    while True:
+        key = stream.value()
+        stream.expect(':')
+        if key == 'data':
+            stream.expect('[')
+            if stream.peek() != ']':
+                while True:
+                    yield key, stream.value()
+                    if stream.peek() != ',':
+                        break
+                    stream.pos += 1
+            stream.expect(']')
+        else:
+            yield key, stream.value()
+        if stream.peek() != ',':
+            break
+        stream.pos += 1
+    stream.expect('}')
+
+
+def _find_trailing_fields(f):
+    """Look for the `fields` header within the tail of a seekable JSON file.
+
+    NASA's API emits the top-level keys in sorted order, so the `fields` header
+    follows the (large) `data` array. Rather than buffer the rows until the
+    header arrives, decode it directly from the end of the file.
+
+    :param f: A text file object, which is left positioned at the start.
+    :return: The list of field names, or None if it isn't found (or if the file
+        can't seek to its end).
+    """
+    # Text files can only seek to positions returned by `tell`, so use a binary view.
+    raw = f.buffer
+    try:
+        size = raw.seek(0, 2)
+    except (OSError, ValueError):
+        return None
+    raw.seek(max(0, size - FIELDS_TAIL_SIZE))
+    tail = raw.read().decode(f.encoding, errors='replace')
+    f.seek(0)
+
+    match = re.search(r'"fields"\s*:\s*', tail)
+    if not match:
+        return None
+    try:
+        fields, _ = json.JSONDecoder().raw_decode(tail, match.end())
+    except json.JSONDecodeError:
+        return None
+    return fields if isinstance(fields, list) else None
+
+
+def _scan_for_fields(cad_json_path):
+    """Stream through a close approach JSON file, discarding rows, to find its `fields` header."""
+    logger.info(f'Scanning {cad_json_path} for its `fields` header.')
+    with open_text(cad_json_path) as f:
+        for key, value in _iter_cad_members(f):
+            if key == 'fields':
+                return value
+    raise ValueError(f"{cad_json_path} has no `fields` header.")
+
+
+def iter_cad_rows(cad_json_path):
+    """Stream the rows of the `data` array of a close approach JSON file.
+
+    Only one row is decoded at a time, so memory use is bounded by the size of
+    a row rather than of the file.
+
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :yield: `(fields, row)` pairs, where `fields` is the (shared) list of field
+        names and `row` is the list of values of one close approach.
+    """
+    with open_text(cad_json_path) as f:
+        # Seeking to the end of a compressed file means decompressing all of it,
+        # so a compressed file is only scanned for a trailing header if need be.
+        fields = None if compression_of(cad_json_path) else _find_trailing_fields(f)
+        for key, value in _iter_cad_members(f):
+            if key == 'fields':
+                fields = value
+            elif key == 'data':
+                if fields is None:
+                    fields = _scan_for_fields(cad_json_path)
+                yield fields, value
+
+
+def _approach_columns(cad_json_path, fields, approach_class):
+    """Find the positions of the fields that `approach_class.from_row` reads.
+
+    Only one of the `jd` and `cd` time fields is required.
+    """
+    columns = tuple(fields.index(name) if name in fields else None
+                    for name in approach_class.row_fields)
+    des, jd, cd, dist, v_rel = columns
+    if None in (des, dist, v_rel) or (jd is None and cd is None):
+        raise ValueError(f"{cad_json_path} is missing fields required of a close approach.")
+    return columns
+
+
+def iter_approaches(cad_json_path, approach_class=CloseApproach):
+    """Stream close approaches out of a JSON file, one at a time.
+
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :param approach_class: The class of close approach to construct, such as `CompactCloseApproach`.
+    :yield: `CloseApproach` objects, in file order.
+    """
+    columns = None
+    for fields, row in iter_cad_rows(cad_json_path):
+        if columns is None:
+            columns = _approach_columns(cad_json_path, fields, approach_class)
+        yield approach_class.from_row(row, columns)
+
+
+def load_approaches(cad_json_path=r'C:\Users\alex.jacobs\PycharmProjects\neo\data\cad.json',
+                     approach_class=CloseApproach):
     """Read close approach data from a JSON file.
 
     :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :param approach_class: The class of close approach to construct, such as `CompactCloseApproach`.
     :return: A collection of `CloseApproach`es.
     """
     logger.debug(f'Loading Close Approaches from {cad_json_path}')
-    approaches = []
-    with open(cad_json_path) as f:
-        json_data = json.load(f)
-        json_data = [dict(zip(json_data["fields"], data)) for data in json_data["data"]]
-    for data in json_data:
-        approaches.append((CloseApproach(data)))
-    return approaches
+    return list(iter_approaches(cad_json_path, approach_class))
+
+
+def expand_paths(patterns):
+    """Expand glob patterns into the paths of the files they match.
+
+    A pattern without any glob characters is taken as a path, whether or not
+    the file exists. The matches of each pattern are sorted by name.
+
+    :param patterns: An iterable of paths or glob patterns, such as `data/cad-*.json`.
+    :return: A list of `pathlib.Path`s.
+    :raises ValueError: If a pattern matches no files.
+    """
+    paths = []
+    for pattern in patterns:
+        if not any(char in str(pattern) for char in '*?['):
+            paths.append(pathlib.Path(pattern))
+            continue
+        matches = sorted(glob.glob(str(pattern)))
+        if not matches:
+            raise ValueError(f"No files match {pattern}.")
+        paths.extend(pathlib.Path(match) for match in matches)
+    return paths
+
+
+class _OutOfOrder(ValueError):
+    """A close approach JSON file doesn't list its approaches in time order."""
+
+
+def _in_time_order(cad_json_path, approaches):
+    """Pass through a stream of close approaches, checking that their times never decrease."""
+    last = None
+    for approach in approaches:
+        if last is not None and approach.epoch_minutes < last:
+            raise _OutOfOrder(f"{cad_json_path} doesn't list its close approaches in time order.")
+        last = approach.epoch_minutes
+        yield approach
+
+
+def _drop_repeats(approaches):
+    """Drop any close approach with the same designation and time as an earlier one in a time-sorted stream."""
+    minute = None
+    seen = set()
+    for approach in approaches:
+        if approach.epoch_minutes != minute:
+            minute = approach.epoch_minutes
+            seen.clear()
+        designation = approach.get_designation()
+        if designation not in seen:
+            seen.add(designation)
+            yield approach
+
+
+def iter_merged_approaches(cad_json_paths, approach_class=CloseApproach):
+    """Stream the close approaches of several JSON files, merged into time order, without repeats.
+
+    Each file is streamed as by `iter_approaches`, and a heap holds the next
+    approach of each one, so the merge never holds more than one approach per
+    file. Approaches of the same NEO at the same time, such as from exports
+    that overlap, are generated once.
+
+    :param cad_json_paths: Paths to JSON files of close approach data, each in time order.
+    :param approach_class: The class of close approach to construct, such as `CompactCloseApproach`.
+    :yield: `CloseApproach` objects, in time order.
+    :raises ValueError: If a file doesn't list its approaches in time order.
+    """
+    streams = [_in_time_order(path, iter_approaches(path, approach_class)) for path in cad_json_paths]
+    yield from _drop_repeats(heapq.merge(*streams, key=operator.attrgetter('epoch_minutes')))
+
+
+def load_merged_approaches(cad_json_paths, approach_class=CloseApproach):
+    """Read close approach data from several JSON files, merged into time order, without repeats.
+
+    The CAD API exports approaches in time order, so the files are merged as
+    by `iter_merged_approaches`. If a file turns out not to be in time order,
+    all of the files are read and sorted together instead.
+
+    :param cad_json_paths: Paths to JSON files containing data about close approaches.
+    :param approach_class: The class of close approach to construct, such as `CompactCloseApproach`.
+    :return: A collection of `CloseApproach`es, in time order.
+    """
+    logger.debug(f'Loading Close Approaches from {len(cad_json_paths)} files')
+    try:
+        return list(iter_merged_approaches(cad_json_paths, approach_class))
+    except _OutOfOrder as err:
+        logger.info(f'{err} Sorting all of the close approaches instead.')
+    approaches = [approach for path in cad_json_paths for approach in iter_approaches(path, approach_class)]
+    approaches.sort(key=operator.attrgetter('epoch_minutes'))
+    return list(_drop_repeats(approaches))
@@ -11,13 +11,21 @@ from a comparator (from the `operator` module), a reference value, and a class
 method `get` that subclasses can override to fetch an attribute of interest from
 the supplied `CloseApproach`.
 
+The `compile_filters` function turns such a collection into a single predicate
+function, specialized to the given filters, which evaluates the cheapest and
+most selective checks first and stops at the first one that fails.
+
 The `limit` function simply limits the maximum number of values produced by an
 iterator.
 
 You'll edit this file in Tasks 3a and 3c.
 """
+import itertools
 import operator
 import logging
+
+from helpers import EPOCH_ORDINAL
+
 logging.basicConfig()
 
 # Create logger and set the log level
@@ -244,25 +252,165 @@ def create_filters(
     return filters
 
 
+# The source of each operator that `compile_filters` can inline.
+OPERATOR_SOURCE = {
+    operator.eq: '==', operator.ne: '!=',
+    operator.lt: '<', operator.le: '<=',
+    operator.gt: '>', operator.ge: '>=',
+    operator.is_: 'is', operator.is_not: 'is not',
+}
+
+# The local variables of a compiled predicate: the statement that binds each
+# one, the variables that statement depends on, and the relative cost of
+# evaluating it.
+COMPILED_LOCALS = {
+    'day': ('day = approach.epoch_minutes // 1440', (), 1.5),
+    'distance': ('distance = approach.distance', (), 1.0),
+    'velocity': ('velocity = approach.velocity', (), 1.0),
+    'neo': ('neo = approach.neo', (), 1.0),
+    'diameter': ('diameter = neo.diameter', ('neo',), 1.0),
+    'hazardous': ('hazardous = neo.hazardous', ('neo',), 1.0),
+}
+
+# For each filter class: the local variable it compares, whether the reference
+# value goes on the left of the operator, and whether the attribute must also
+# be truthy (as it must for the diameter filters, to exclude unknown diameters).
+COMPILED_FILTERS = {
+    DateFilter: ('day', False, False),
+    StartDateFilter: ('day', True, False),
+    EndDateFilter: ('day', False, False),
+    DistanceMinFilter: ('distance', False, False),
+    DistanceMaxFilter: ('distance', False, False),
+    VelocityMinFilter: ('velocity', False, False),
+    VelocityMaxFilter: ('velocity', False, False),
+    DiameterMinFilter: ('diameter', False, True),
+    DiameterMaxFilter: ('diameter', False, True),
+    HazardousFilter: ('hazardous', False, False),
+}
+
+# The estimated fraction of close approaches that pass each kind of filter, by
+# its key in the output of `create_filters`.
+SELECTIVITY = {
+    'date': 0.001,
+    'start_date': 0.5,
+    'end_date': 0.5,
+    'distance_min': 0.5,
+    'distance_max': 0.5,
+    'velocity_min': 0.5,
+    'velocity_max': 0.5,
+    'diameter_min': 0.05,
+    'diameter_max': 0.1,
+    'hazardous': 0.5,
+}
+
+
+def _local_cost(name, bound):
+    """Compute the cost of binding a local variable, and any it depends on, that isn't yet bound."""
+    if name in bound:
+        return 0.0
+    _, depends, cost = COMPILED_LOCALS[name]
+    return cost + sum(_local_cost(dependency, bound) for dependency in depends)
+
+
+def _bind_local(name, bound, lines):
+    """Emit the statements binding a local variable and its dependencies, if they aren't yet bound."""
+    if name in bound:
+        return
+    statement, depends, _ = COMPILED_LOCALS[name]
+    for dependency in depends:
+        _bind_local(dependency, bound, lines)
+    lines.append(f'    {statement}')
+    bound.add(name)
+
+
+def compile_filters(filters, selectivity=None):
+    """Compile a collection of filters into a single short-circuiting predicate.
+
+    Each filter from `create_filters` is inlined as one comparison against a
+    local variable, so every attribute (such as `approach.neo.diameter`) is
+    fetched at most once per call. The checks are ordered so that those which
+    are cheap and reject many approaches come first: by the cost of the
+    attribute lookups they add, divided by the estimated fraction of
+    approaches that they reject. Filters of any other class are called
+    through their `get` method, last.
+
+    :param filters: A collection of filters, as produced by `create_filters`.
+    :param selectivity: A mapping from filter keys to the estimated fraction of
+        approaches that pass that filter, to override `SELECTIVITY`.
+    :return: A 1-argument function of a `CloseApproach`, returning whether it
+        matches every filter. Its `order` attribute lists the filter keys in
+        the order that they're checked.
+    """
+    estimates = dict(SELECTIVITY, **(selectivity or {}))
+    namespace = {}
+    pending = []
+    others = []
+    for index, (key, f) in enumerate(filters.items()):
+        spec = next((COMPILED_FILTERS[cls] for cls in type(f).__mro__ if cls in COMPILED_FILTERS), None)
+        if spec is None or f.op not in OPERATOR_SOURCE:
+            namespace[f'f{index}'] = f
+            others.append((key, f'f{index}.get(approach)'))
+            continue
+
+        name, reverse, truthy = spec
+        value = f.value
+        if name == 'day':
+            value = value.toordinal() - EPOCH_ORDINAL
+        namespace[f'v{index}'] = value
+        if reverse:
+            condition = f'v{index} {OPERATOR_SOURCE[f.op]} {name}'
+        else:
+            condition = f'{name} {OPERATOR_SOURCE[f.op]} v{index}'
+        if truthy:
+            # Match `get`, which rejects a falsy attribute or reference value.
+            condition = f'{name} and {condition}' if value else 'False'
+        pending.append((key, name, condition))
+
+    lines = ['def predicate(approach):']
+    bound = set()
+    order = []
+
+    def rank(check):
+        key, name, _ = check
+        rejected = 1.0 - estimates.get(key, 0.5)
+        return _local_cost(name, bound) / max(rejected, 1e-9)
+
+    while pending:
+        check = min(pending, key=rank)
+        pending.remove(check)
+        key, name, condition = check
+        _bind_local(name, bound, lines)
+        lines.append(f'    if not ({condition}):')
+        lines.append('        return False')
+        order.append(key)
+    for key, call in others:
+        lines.append(f'    if not {call}:')
+        lines.append('        return False')
+        order.append(key)
+    lines.append('    return True')
+
+    source = '\n'.join(lines)
+    exec(compile(source, '<compiled filters>', 'exec'), namespace)
+    predicate = namespace['predicate']
+    predicate.order = tuple(order)
+    predicate.source = source
+    return predicate
+
+
 def limit(iterator, n=None):
     """Produce a limited stream of values from an iterator.
 
-    If `n` is 0 or None, don't limit the iterator at all.
+    If `n` is 0 or None, don't limit the iterator at all. If `n` is negative,
+    produce nothing.
 
     :param iterator: An iterator of values.
     :param n: The maximum number of values to produce.
     :yield: The first (at most) `n` values from the iterator.
     """
-    # Produce at most `n` values from the given iterator.
+    # Produce at most `n` values from the given iterator, without reading past
+    # the nth value - a lazy source (such as `NEODatabase.query`) stops there.
     iterator = iter(iterator)
     if n:
-        for i in range(n):
-            try:
-                yield next(iterator)
-            except StopIteration:
-                logger.warning(f'{n} was longer than the range of {iterator}.')
-                break
-
+        yield from itertools.islice(iterator, max(n, 0))
     else:
-        for i in iterator:
-            yield i
+        yield from iterator
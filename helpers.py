@@ -3,15 +3,72 @@
 NASA's dataset provides timestamps as naive datetimes (corresponding to UTC).
 
 The `cd_to_datetime` function converts a string, formatted as the `cd` field of
-NASA's close approach data, into a Python `datetime`
+NASA's close approach data, into a Python `datetime`. It slices the fixed
+`YYYY-Mon-DD hh:mm` layout apart rather than going through `strptime`.
+
+The `cd_to_minutes` function converts such a string into a whole number of
+minutes since the Unix epoch, and `cd_column_to_minutes` converts an entire
+column of them at once - with NumPy, if it's installed. The `jd_to_minutes`
+function does the same for the `jd` field (a Julian date), and
+`minutes_to_datetime` converts epoch minutes back into a Python `datetime`.
 
 The `datetime_to_str` function converts a Python `datetime` into a string.
 Although `datetime`s already have human-readable string representations, those
 representations display seconds, but NASA's data (and our datetimes!) don't
 provide that level of resolution, so the output format also will not.
 """
+import array
 import datetime
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# The English month abbreviations of NASA's calendar dates, mapped to month numbers.
+MONTHS = {name: number for number, name in enumerate(
+    ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'), start=1)}
+
+# The origin of epoch minutes, its ordinal day, and its Julian date.
+EPOCH = datetime.datetime(1970, 1, 1)
+EPOCH_ORDINAL = EPOCH.toordinal()
+EPOCH_JD = 2440587.5
+
+
+if np is not None:
+    # Lookup tables for `cd_column_to_minutes`: each month abbreviation packed into
+    # an integer (sorted, for binary search), its month number, and month lengths.
+    _MONTH_CODES = np.array(sorted((ord(a) << 16) | (ord(b) << 8) | ord(c) for a, b, c in MONTHS),
+                            dtype=np.int64)
+    _MONTH_NUMBERS = np.array([MONTHS[''.join(chr((code >> shift) & 0xFF) for shift in (16, 8, 0))]
+                               for code in _MONTH_CODES.tolist()], dtype=np.int64)
+    _MONTH_LENGTHS = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=np.int64)
+
+# The positions of the digits within the `YYYY-Mon-DD hh:mm` layout.
+_DIGIT_COLUMNS = [0, 1, 2, 3, 9, 10, 12, 13, 15, 16]
+
+
+def _split_cd(calendar_date):
+    """Split a calendar date in the exact `YYYY-Mon-DD hh:mm` layout into integers.
+
+    :param calendar_date: A calendar date in YYYY-bb-DD hh:mm format.
+    :return: A tuple of the year, month, day, hour and minute, or None if the
+        string doesn't have exactly that layout.
+    """
+    if (len(calendar_date) != 17 or calendar_date[4] != '-' or calendar_date[8] != '-'
+            or calendar_date[11] != ' ' or calendar_date[14] != ':'):
+        return None
+    month = MONTHS.get(calendar_date[5:8])
+    year, day, hour, minute = (calendar_date[:4], calendar_date[9:11],
+                               calendar_date[12:14], calendar_date[15:])
+    if month is None or not (year + day + hour + minute).isdigit():
+        return None
+    hour, minute = int(hour), int(minute)
+    if hour > 23 or minute > 59:
+        return None
+    return int(year), month, int(day), hour, minute
+
 
 def cd_to_datetime(calendar_date):
     """Convert a NASA-formatted calendar date/time description into a datetime.
@@ -26,7 +83,104 @@ def cd_to_datetime(calendar_date):
     :param calendar_date: A calendar date in YYYY-bb-DD hh:mm format.
     :return: A naive `datetime` corresponding to the given calendar date and time.
     """
-    return datetime.datetime.strptime(calendar_date, "%Y-%b-%d %H:%M")
+    parts = _split_cd(calendar_date)
+    if parts is None:
+        # Let `strptime` handle (or reject) anything that isn't in the exact layout.
+        return datetime.datetime.strptime(calendar_date, "%Y-%b-%d %H:%M")
+    return datetime.datetime(*parts)
+
+
+def cd_to_minutes(calendar_date):
+    """Convert a NASA-formatted calendar date/time description into epoch minutes.
+
+    For example, `1970-Jan-02 00:01` becomes 1441.
+
+    :param calendar_date: A calendar date in YYYY-bb-DD hh:mm format.
+    :return: The whole number of minutes since 1970-01-01 00:00.
+    """
+    parts = _split_cd(calendar_date)
+    if parts is None:
+        return (cd_to_datetime(calendar_date) - EPOCH) // datetime.timedelta(minutes=1)
+    year, month, day, hour, minute = parts
+    return (datetime.date(year, month, day).toordinal() - EPOCH_ORDINAL) * 1440 + hour * 60 + minute
+
+
+def jd_to_minutes(julian_date):
+    """Convert a Julian date, such as the `jd` field of close approach data, into epoch minutes.
+
+    NASA's `cd` field is the `jd` field rounded to the nearest minute, so both
+    convert to the same number of minutes.
+
+    :param julian_date: A Julian date, as a number or a string.
+    :return: The whole number of minutes since 1970-01-01 00:00.
+    """
+    return round((float(julian_date) - EPOCH_JD) * 1440)
+
+
+def minutes_to_datetime(minutes):
+    """Convert a whole number of epoch minutes into a naive Python datetime.
+
+    :param minutes: The number of minutes since 1970-01-01 00:00.
+    :return: The corresponding naive `datetime`.
+    """
+    return EPOCH + datetime.timedelta(minutes=minutes)
+
+
+def cd_column_to_minutes(calendar_dates):
+    """Convert a column of NASA-formatted calendar date/time descriptions into epoch minutes.
+
+    With NumPy, the column is converted to a fixed-width byte matrix and every
+    field is decoded with array arithmetic; any entries that aren't in the exact
+    `YYYY-Mon-DD hh:mm` layout fall back to `cd_to_minutes`. Without NumPy,
+    each entry is converted with `cd_to_minutes`.
+
+    :param calendar_dates: An iterable of calendar dates in YYYY-bb-DD hh:mm format.
+    :return: An int64 NumPy array, or an `array.array` of type 'q' without NumPy.
+    """
+    if np is None:
+        return array.array('q', map(cd_to_minutes, calendar_dates))
+    calendar_dates = list(calendar_dates)
+
+    count = len(calendar_dates)
+    try:
+        # One extra byte per entry shows whether an entry is too long.
+        raw = np.array(calendar_dates, dtype='S18').reshape(count)
+    except UnicodeEncodeError:
+        return np.fromiter(map(cd_to_minutes, calendar_dates), dtype=np.int64, count=count)
+    chars = raw.view(np.uint8).reshape(count, 18).astype(np.int64)
+    digits = chars[:, _DIGIT_COLUMNS] - ord('0')
+
+    def number(*columns):
+        value = np.zeros(count, dtype=np.int64)
+        for column in columns:
+            value = value * 10 + digits[:, _DIGIT_COLUMNS.index(column)]
+        return value
+
+    year, day, hour, minute = number(0, 1, 2, 3), number(9, 10), number(12, 13), number(15, 16)
+    codes = (chars[:, 5] << 16) | (chars[:, 6] << 8) | chars[:, 7]
+    position = np.minimum(np.searchsorted(_MONTH_CODES, codes), len(_MONTH_CODES) - 1)
+    month = _MONTH_NUMBERS[position]
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    month_length = _MONTH_LENGTHS[month - 1] + ((month == 2) & leap)
+
+    # Howard Hinnant's days-from-civil algorithm, for the proleptic Gregorian calendar.
+    shifted = year - (month <= 2)
+    era = shifted // 400
+    year_of_era = shifted - era * 400
+    day_of_year = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    days = era * 146097 + day_of_era - 719468
+    minutes = days * 1440 + hour * 60 + minute
+
+    # Anything outside of the exact layout is converted (or rejected) one at a time instead.
+    valid = ((_MONTH_CODES[position] == codes)
+             & (chars[:, 4] == ord('-')) & (chars[:, 8] == ord('-'))
+             & (chars[:, 11] == ord(' ')) & (chars[:, 14] == ord(':')) & (chars[:, 17] == 0)
+             & np.all((digits >= 0) & (digits <= 9), axis=1)
+             & (year >= 1) & (day >= 1) & (day <= month_length) & (hour <= 23) & (minute <= 59))
+    for index in np.flatnonzero(~valid).tolist():
+        minutes[index] = cd_to_minutes(calendar_dates[index])
+    return minutes
 
 
 def cd_to_date(calendar_date):
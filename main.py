@@ -5,7 +5,7 @@ See `README.md` for a detailed discussion of this project.
 
 This script can be invoked from the command line::
 
-    $ python3 main.py {inspect,query,interactive} [args]
+    $ python3 main.py {inspect,query,interactive,serve} [args]
 
 The `inspect` subcommand looks up an NEO by name or by primary designation, and
 optionally lists all of that NEO's known close approaches:
@@ -23,37 +23,84 @@ The `query` subcommand searches for close approaches that match given criteria:
     $ python3 main.py query --start-date 2000-01-01 --max-diameter 0.1 --not-hazardous
     $ python3 main.py query --hazardous --max-distance 0.05 --min-velocity 30
 
-The set of results can be limited in size and/or saved to an output file in CSV
-or JSON format:
+The set of results can be limited in size and/or saved to an output file in CSV,
+JSON or JSON Lines format:
 
     $ python3 main.py query --limit 5 --outfile results.csv
     $ python3 main.py query --limit 15 --outfile results.json
+    $ python3 main.py query --hazardous --outfile results.jsonl
+
+Output files whose names end in `.gz` or `.zst` are compressed as they're
+written, and likewise `--neofile` and `--cadfile` may name compressed files.
+
+To see how a query is evaluated - the access path it takes, the order in which
+its filters are checked, how many close approaches survive each one, and where
+the time goes - add `--explain`:
+
+    $ python3 main.py query --max-distance 0.001 --explain
 
 The `interactive` subcommand loads the NEO database and spawns an interactive
 command shell that can repeatedly execute `inspect` and `query` commands without
 having to wait to reload the database each time. However, it doesn't hot-reload.
 
+The `serve` subcommand loads the NEO database once and answers `inspect` and
+`query` requests over a local HTTP API, streaming query results as NDJSON:
+
+    $ python3 main.py serve --port 8765
+    $ curl 'http://127.0.0.1:8765/query?hazardous=true&distance_max=0.05&limit=5'
+    $ python3 main.py serve --unix-socket /tmp/neo.sock
+
 If needed, the script can load data from data files other than the default with
-`--neofile` or `--cadfile`.
+`--neofile` or `--cadfile`. Close approach data split across several files, such
+as one export per year, is merged in time order and without repeated approaches,
+given `--cadfile` once per file or a glob pattern:
+
+    $ python3 main.py --cadfile 'data/cad-*.json' query --start-date 2020-01-01
+    $ python3 main.py --cadfile data/cad-2020.json --cadfile data/cad-2021.json inspect --pdes 433
+
+The parsed and linked database is cached in a snapshot next to the data files,
+which later runs reopen instead of parsing the data files again, as long as the
+data files are unchanged. Pass `--no-snapshot` to always parse the data files.
+
+To reduce memory use, `--compact` builds the database from slotted model
+objects that don't keep any of the raw data.
+
+Queries can instead be evaluated by a columnar engine backed by NumPy, if it is
+installed, with `--engine numpy`:
+
+    $ python3 main.py --engine numpy query --hazardous --max-distance 0.05
 """
 import argparse
 import cmd
 import datetime
+import functools
 import pathlib
 import shlex
 import sys
 import time
 
-from extract import load_neos, load_approaches
+from cache import QueryCache
+from compressed import check_support, strip_compression
 from database import NEODatabase
+from columnar import ColumnarNEODatabase
+from executor import MAX_QUEUE, MAX_SCANS
+from extract import expand_paths
+from server import DEFAULT_HOST, DEFAULT_PORT, serve
+from snapshot import load_database
 from filters import create_filters, limit
-from write import write_to_csv, write_to_json
+from write import write_to_csv, write_to_json, write_to_jsonl
 
 
 # Paths to the root of the project and the `data` subfolder.
 PROJECT_ROOT = pathlib.Path(__file__).parent.resolve()
 DATA_ROOT = PROJECT_ROOT / 'data'
 
+# The database classes that can be selected with `--engine`.
+ENGINES = {
+    'python': NEODatabase,
+    'numpy': ColumnarNEODatabase,
+}
+
 # The current time, for use with the kill-on-change feature of the interactive shell.
 _START = time.time()
 
@@ -73,6 +120,21 @@ def date_fromisoformat(date_string):
         raise argparse.ArgumentTypeError(f"'{date_string}' is not a valid date. Use YYYY-MM-DD.")
 
 
+def non_negative_int(string):
+    """Return the integer in a string, which must not be negative.
+
+    :param string: A whole number, such as `10`.
+    :return: The number, as an `int`.
+    """
+    try:
+        value = int(string)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{string}' is not a whole number.")
+    if value < 0:
+        raise argparse.ArgumentTypeError(f"'{string}' is negative.")
+    return value
+
+
 def make_parser():
     """Create an ArgumentParser for this script.
 
@@ -85,10 +147,20 @@ def make_parser():
     # Add arguments for custom data files.
     parser.add_argument('--neofile', default=(DATA_ROOT / 'neos.csv'),
                         type=pathlib.Path,
-                        help="Path to CSV file of near-Earth objects.")
-    parser.add_argument('--cadfile', default=(DATA_ROOT / 'cad.json'),
-                        type=pathlib.Path,
-                        help="Path to JSON file of close approach data.")
+                        help="Path to CSV file of near-Earth objects, optionally compressed "
+                             "(.csv.gz or .csv.zst).")
+    parser.add_argument('--cadfile', action='append', type=pathlib.Path,
+                        help="Path to JSON file of close approach data, optionally compressed "
+                             "(.json.gz or .json.zst), or a glob pattern matching several. "
+                             "Repeat to merge several files. Defaults to data/cad.json.")
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='python',
+                        help="The query engine to use. The `numpy` engine evaluates "
+                             "filters over columns and requires NumPy.")
+    parser.add_argument('--compact', action='store_true',
+                        help="Build the database from compact, slotted NEOs and close approaches.")
+    parser.add_argument('--no-snapshot', dest='snapshot', action='store_false',
+                        help="Always parse the data files, instead of reopening "
+                             "(and refreshing) a cached snapshot of the database.")
     subparsers = parser.add_subparsers(dest='cmd')
 
     # Add the `inspect` subcommand parser.
@@ -144,18 +216,40 @@ def make_parser():
     filters.add_argument('--not-hazardous', dest='hazardous', default=None, action='store_false',
                          help="If specified, only return close approaches of NEOs that "
                               "are not potentially hazardous.")
-    query.add_argument('-l', '--limit', type=int,
+    query.add_argument('-l', '--limit', type=non_negative_int,
                        help="The maximum number of matches to return. "
                             "Defaults to 10 if no --outfile is given.")
     query.add_argument('-o', '--outfile', type=pathlib.Path,
-                       help="File in which to save structured results. "
+                       help="File in which to save structured results, as CSV, JSON or "
+                            "JSON Lines (by the extension .csv, .json, or .jsonl or .ndjson), "
+                            "compressed if followed by .gz or .zst. "
                             "If omitted, results are printed to standard output.")
+    query.add_argument('--explain', action='store_true',
+                       help="Additionally, report how the query was evaluated and "
+                            "how long each stage took.")
 
     repl = subparsers.add_parser('interactive',
                                  description="Start an interactive command session "
                                              "to repeatedly run `interact` and `query` commands.")
     repl.add_argument('-a', '--aggressive', action='store_true',
                       help="If specified, kill the session whenever a project file is modified.")
+
+    # Add the `serve` subcommand parser.
+    server = subparsers.add_parser('serve',
+                                   description="Answer `inspect` and `query` requests "
+                                               "over a local HTTP API.")
+    server.add_argument('--host', default=DEFAULT_HOST,
+                        help=f"The local address to listen on. Defaults to {DEFAULT_HOST}.")
+    server.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help=f"The TCP port to listen on. Defaults to {DEFAULT_PORT}.")
+    server.add_argument('--unix-socket', type=pathlib.Path,
+                        help="Listen on a Unix domain socket at this path, instead of a TCP port.")
+    server.add_argument('--max-scans', type=int, default=MAX_SCANS,
+                        help="The maximum number of queries to scan the database at once. "
+                             f"Defaults to {MAX_SCANS}.")
+    server.add_argument('--max-queue', type=int, default=MAX_QUEUE,
+                        help="The maximum number of queries to keep waiting for a scan; "
+                             f"more are refused until the queue drains. Defaults to {MAX_QUEUE}.")
     return parser, inspect, query
 
 
@@ -195,7 +289,7 @@ def inspect(database, pdes=None, name=None, verbose=False):
     return neo
 
 
-def query(database, args):
+def query(database, args, cache=None):
     """Perform the `query` subcommand.
 
     Create a collection of filters with `create_filters` and supply them to the
@@ -203,11 +297,13 @@ def query(database, args):
 
     If an output file wasn't given, print these results to stdout, limiting to
     10 entries if no limit was specified. If an output file was given, use the
-    file's extension to infer whether the file should hold CSV or JSON data, and
-    then write the results to the output file in that format.
+    file's extension (ignoring any `.gz` or `.zst`) to infer whether the file
+    should hold CSV, JSON or JSON Lines data, and then write the results to the
+    output file in that format.
 
     :param database: The `NEODatabase` containing data on NEOs and their close approaches.
     :param args: All arguments from the command line, as parsed by the top-level parser.
+    :param cache: A `QueryCache` of the database's query results, to serve repeated queries.
     """
     # Construct a collection of filters from arguments supplied at the command line.
     filters = create_filters(
@@ -217,21 +313,65 @@ def query(database, args):
         diameter_min=args.diameter_min, diameter_max=args.diameter_max,
         hazardous=args.hazardous
     )
-    # Query the database with the collection of filters.
-    results = database.query(filters)
-
     if not args.outfile:
         # Write the results to stdout, limiting to 10 entries if not specified.
-        for result in limit(results, args.limit or 10):
-            print(result)
+        n = args.limit or 10
+        write = print_results
     else:
         # Write the results to a file.
-        if args.outfile.suffix == '.csv':
-            write_to_csv(limit(results, args.limit), args.outfile)
-        elif args.outfile.suffix == '.json':
-            write_to_json(limit(results, args.limit), args.outfile)
+        n = args.limit
+        try:
+            check_support(args.outfile)
+        except ImportError as err:
+            print(err, file=sys.stderr)
+            return
+        suffix = strip_compression(args.outfile).suffix
+        if suffix == '.csv':
+            write = functools.partial(write_to_csv, filename=args.outfile)
+        elif suffix == '.json':
+            write = functools.partial(write_to_json, filename=args.outfile)
+        elif suffix in ('.jsonl', '.ndjson'):
+            write = functools.partial(write_to_jsonl, filename=args.outfile)
         else:
-            print("Please use an output file that ends with `.csv` or `.json`.", file=sys.stderr)
+            print("Please use an output file that ends with `.csv`, `.json`, `.jsonl` or `.ndjson`, "
+                  "optionally followed by `.gz` or `.zst`.", file=sys.stderr)
+            return
+
+    # Query the database with the collection of filters.
+    if args.explain:
+        print_explain(database.explain(filters, n, write))
+    elif cache is not None:
+        write(cache.query(filters, n))
+    else:
+        write(limit(database.query(filters), n))
+
+
+def print_results(results):
+    """Print a stream of close approaches to stdout, one per line."""
+    for result in results:
+        print(result)
+
+
+def print_explain(report):
+    """Print a description of how a query was evaluated, as returned by `NEODatabase.explain`.
+
+    :param report: A dictionary describing the evaluation of a query.
+    """
+    start, stop = report['range']
+    print(f"Engine: {report['engine']}")
+    print(f"Access path: {report['access']} [{start}:{stop}]", end='')
+    if report['answered']:
+        print(f", answering {', '.join(report['answered'])}", end='')
+    print()
+    if report['partitions'] is not None:
+        scanned, total = report['partitions']
+        print(f"Partitions scanned: {scanned} of {total}")
+    print(f"Filter order: {', '.join(report['order']) or '(none)'}")
+    print(f"Rows examined: {report['examined']}")
+    for key, count in report['matched']:
+        print(f"  after {key}: {count}")
+    print(f"Rows returned: {report['returned']}")
+    print("Time: " + ', '.join(f"{stage} {seconds * 1e3:.3f} ms" for stage, seconds in report['seconds'].items()))
 
 
 class NEOShell(cmd.Cmd):
@@ -244,7 +384,8 @@ class NEOShell(cmd.Cmd):
 
     The primary purpose of this shell is to allow users to repeatedly perform
     inspect and query commands, while only loading the data (which can be quite
-    slow) once.
+    slow) once. The results of queries are cached, too, so rerunning a query
+    with a different limit or output file doesn't search the database again.
     """
     intro = ("Explore close approaches of near-Earth objects. "
              "Type `help` or `?` to list commands and `exit` to exit.\n")
@@ -263,6 +404,7 @@ class NEOShell(cmd.Cmd):
         """
         super().__init__(**kwargs)
         self.db = database
+        self.cache = QueryCache(database)
         self.inspect = inspect_parser
         self.query = query_parser
         self.aggressive = aggressive
@@ -344,12 +486,31 @@ class NEOShell(cmd.Cmd):
 
             (neo) query --limit 5 --outfile results.csv
             (neo) query --limit 5 --outfile results.json
+            (neo) query --limit 5 --outfile results.jsonl
         """
         args = self.parse_arg_with(arg, self.query)
         if not args:
             return
 
-        # Run the `inspect` subcommand.
+        # Run the `query` subcommand, through the cache.
+        query(self.db, args, cache=self.cache)
+
+    def do_explain(self, arg):
+        """Explain how a query is evaluated within the REPL session.
+
+        This command takes the same options as `query`, runs the query, and
+        then reports the access path it took, the order in which its filters
+        were checked, the number of close approaches that survived each one,
+        and the time spent in each stage:
+
+            (neo) explain --max-distance 0.001
+            (neo) explain --hazardous --min-velocity 20 --outfile results.csv
+        """
+        args = self.parse_arg_with(arg, self.query)
+        if not args:
+            return
+
+        args.explain = True
         query(self.db, args)
 
     def do_EOF(self, _arg):
@@ -381,8 +542,16 @@ def main():
     parser, inspect_parser, query_parser = make_parser()
     args = parser.parse_args()
 
+    try:
+        cad_paths = expand_paths(args.cadfile or [DATA_ROOT / 'cad.json'])
+        for path in [args.neofile, *cad_paths]:
+            check_support(path)
+    except (ValueError, ImportError) as err:
+        parser.error(str(err))
+
     # Extract data from the data files into structured Python objects.
-    database = NEODatabase(load_neos(args.neofile), load_approaches(args.cadfile))
+    database = load_database(args.neofile, cad_paths, ENGINES[args.engine],
+                             use_snapshot=args.snapshot, compact=args.compact)
 
     # Run the chosen subcommand.
     if args.cmd == 'inspect':
@@ -391,6 +560,9 @@ def main():
         query(database, args)
     elif args.cmd == 'interactive':
         NEOShell(database, inspect_parser, query_parser, aggressive=args.aggressive).cmdloop()
+    elif args.cmd == 'serve':
+        serve(database, host=args.host, port=args.port, path=args.unix_socket,
+              max_scans=args.max_scans, max_queue=args.max_queue)
 
 
 if __name__ == '__main__':
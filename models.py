@@ -6,58 +6,61 @@ for whether the object is potentially hazardous.
 
 The `CloseApproach` class represents a close approach to Earth by an NEO. Each
 has an approach datetime, a nominal approach distance, and a relative approach
-velocity.
+velocity. The approach time is stored as a whole number of minutes since the
+Unix epoch, and only turned into a `datetime` when the `time` is accessed.
 
 A `NearEarthObject` maintains a collection of its close approaches, and a
 `CloseApproach` maintains a reference to its NEO.
 
+Both classes also come in a compact variant, `CompactNearEarthObject` and
+`CompactCloseApproach`, which use `__slots__` instead of a per-instance
+`__dict__` and don't keep an `info` dictionary, but otherwise behave the same.
+They share their behavior with the regular classes through the private
+`_NearEarthObjectBase` and `_CloseApproachBase` classes.
+
 The functions that construct these objects use information extracted from the
 data files from NASA, so these objects should be able to handle all of the
 quirks of the data set, such as missing names and unknown diameters.
 
 You'll edit this file in Task 1.
 """
-from helpers import cd_to_datetime, datetime_to_str
+import copy
 
+from helpers import cd_to_minutes, datetime_to_str, jd_to_minutes, minutes_to_datetime
 
-class NearEarthObject:
-    """A near-Earth object (NEO).
 
-    An NEO encapsulates semantic and physical parameters about the object, such
-    as its primary designation (required, unique), IAU name (optional), diameter
-    in kilometers (optional - sometimes unknown), and whether it's marked as
-    potentially hazardous to Earth.
+class _NearEarthObjectBase:
+    """The behavior shared by `NearEarthObject` and `CompactNearEarthObject`.
 
-    A `NearEarthObject` also maintains a collection of its close approaches -
-    initialized to an empty collection, but eventually populated in the
-    `NEODatabase` constructor.
+    Subclasses call `_assign` from their constructors to coerce the values of a
+    row of NEO data onto their attributes.
     """
-    # If you make changes, be sure to update the comments in this file.
-    def __init__(self, info):
-        """Create a new `NearEarthObject`.
+    __slots__ = ()
 
-        :param info: A dictionary of excess keyword arguments supplied to the constructor.
-        """
+    # The keys of `info` that are coerced onto attributes.
+    fields = ('pdes', 'name', 'diameter', 'pha')
+
+    def _assign(self, info):
+        """Coerce the values of a row of NEO data onto this NEO's attributes."""
         # onto attributes named `designation`, `name`, `diameter`, and `hazardous`.
         # You should coerce these values to their appropriate data type and
         # handle any edge cases, such as a empty name being represented by `None`
         # and a missing diameter being represented by `float('nan')`.
-        self.info = info
-        self.designation = self.info['pdes']
+        self.designation = info['pdes']
 
         # Check for name or assign none.
-        self.name = self.info['name']
+        self.name = info['name']
         if not self.name:
             self.name = None
 
         # Check if diameter is an empty string
-        if self.info['diameter']:
-            self.diameter = float(self.info['diameter'])
+        if info['diameter']:
+            self.diameter = float(info['diameter'])
         else:
             self.diameter = float('nan')
 
         # Check for a N/No or Y/Yes to set hazardous level.
-        if 'N' in self.info['pha'].upper() or not self.info['pha']:
+        if 'N' in info['pha'].upper() or not info['pha']:
             self.hazardous = False
         else:
             self.hazardous = True
@@ -65,6 +68,12 @@ class NearEarthObject:
         # Create an empty initial collection of linked approaches.
         self.approaches = []
 
+    def unlinked_copy(self):
+        """Return a shallow copy of this NEO without any close approaches, ready to link into another database."""
+        neo = copy.copy(self)
+        neo.approaches = []
+        return neo
+
     @property
     def fullname(self):
         """Return a representation of the full name of this NEO."""
@@ -88,37 +97,112 @@ class NearEarthObject:
                f"diameter={self.diameter}, hazardous={str(self.hazardous)})"
 
 
-class CloseApproach:
-    """A close approach to Earth by an NEO.
+class NearEarthObject(_NearEarthObjectBase):
+    """A near-Earth object (NEO).
 
-    A `CloseApproach` encapsulates information about the NEO's close approach to
-    Earth, such as the date and time (in UTC) of closest approach, the nominal
-    approach distance in astronomical units, and the relative approach velocity
-    in kilometers per second.
+    An NEO encapsulates semantic and physical parameters about the object, such
+    as its primary designation (required, unique), IAU name (optional), diameter
+    in kilometers (optional - sometimes unknown), and whether it's marked as
+    potentially hazardous to Earth.
 
-    A `CloseApproach` also maintains a reference to its `NearEarthObject` -
-    initially, this information (the NEO's primary designation) is saved in a
-    private attribute, but the referenced NEO is eventually replaced in the
+    A `NearEarthObject` also maintains a collection of its close approaches -
+    initialized to an empty collection, but eventually populated in the
     `NEODatabase` constructor.
     """
     # If you make changes, be sure to update the comments in this file.
     def __init__(self, info):
-        """Create a new `CloseApproach`.
+        """Create a new `NearEarthObject`.
+
+        Any values in `info` beyond `pdes`, `name`, `diameter` and `pha` are kept
+        in the `info` attribute, so pass only the extra columns that are needed.
 
         :param info: A dictionary of excess keyword arguments supplied to the constructor.
         """
-        # onto attributes named `_designation`, `time`, `distance`, and `velocity`.
-        # You should coerce these values to their appropriate data type and handle any edge cases.
-        # The `cd_to_datetime` function will be useful.
-        self.info = info
-        self._designation = self.info['des']
-        self.time = cd_to_datetime(self.info['cd'])
-        self.distance = float(self.info['dist'])
-        self.velocity = float(self.info['v_rel'])
+        self.info = {key: value for key, value in info.items() if key not in self.fields}
+        self._assign(info)
+
+
+class CompactNearEarthObject(_NearEarthObjectBase):
+    """A near-Earth object (NEO) without a per-instance `__dict__`.
+
+    A `CompactNearEarthObject` has the same attributes and behavior as a
+    `NearEarthObject`, except that it has no `info` - any values beyond `pdes`,
+    `name`, `diameter` and `pha` are discarded.
+    """
+    __slots__ = ('designation', 'name', 'diameter', 'hazardous', 'approaches')
+
+    def __init__(self, info):
+        """Create a new `CompactNearEarthObject`.
+
+        :param info: A dictionary of the values of a row of NEO data.
+        """
+        self._assign(info)
+
+
+class _CloseApproachBase:
+    """The behavior shared by `CloseApproach` and `CompactCloseApproach`.
+
+    Subclasses call `_assign` from their constructors to coerce the values of a
+    close approach onto their attributes.
+    """
+    __slots__ = ()
+
+    # The fields of a row of close approach data that `from_row` reads, in order.
+    row_fields = ('des', 'jd', 'cd', 'dist', 'v_rel')
+
+    @classmethod
+    def from_row(cls, row, columns):
+        """Create a new `CloseApproach` from a positional row of close approach data.
+
+        Unlike the constructor, this doesn't need a dictionary per row, and the
+        row isn't kept around afterwards.
+
+        :param row: A sequence of the values of one close approach, such as a row of `cad.json`.
+        :param columns: The positions of the `row_fields` values in `row`. Either
+            of the `jd` or `cd` positions may be None if the row lacks that field.
+        :return: A new `CloseApproach`.
+        """
+        des, jd, cd, dist, v_rel = columns
+        if jd is not None and row[jd]:
+            minutes = jd_to_minutes(row[jd])
+        else:
+            minutes = cd_to_minutes(row[cd])
+        approach = cls.__new__(cls)
+        approach._assign(row[des], minutes, row[dist], row[v_rel])
+        return approach
+
+    @staticmethod
+    def _info_minutes(info):
+        """Compute the epoch minutes of close approach data from its `jd`, or else its `cd`."""
+        if info.get('jd'):
+            return jd_to_minutes(info['jd'])
+        return cd_to_minutes(info['cd'])
+
+    def _assign(self, designation, epoch_minutes, distance, velocity):
+        """Coerce the raw values of a close approach onto its attributes."""
+        self._designation = designation
+        self.epoch_minutes = epoch_minutes
+        self.distance = float(distance)
+        self.velocity = float(velocity)
 
         # Create an attribute for the referenced NEO, originally None.
         self.neo = None
 
+    def unlinked_copy(self):
+        """Return a shallow copy of this close approach without its NEO, ready to link into another database."""
+        approach = copy.copy(self)
+        approach.neo = None
+        return approach
+
+    @property
+    def time(self):
+        """Return this `CloseApproach`'s approach time as a naive `datetime`, in UTC.
+
+        The `datetime` is built from `epoch_minutes` on each access; compare
+        `epoch_minutes` instead where only the order of approaches matters.
+        """
+        return minutes_to_datetime(self.epoch_minutes)
+
     @property
     def time_str(self):
         """Return a formatted representation of this `CloseApproach`'s approach time.
@@ -152,4 +236,48 @@ class CloseApproach:
         Returns the designation.
         :return:
         """
-        return self._designation
\ No newline at end of file
+        return self._designation
+
+
+class CloseApproach(_CloseApproachBase):
+    """A close approach to Earth by an NEO.
+
+    A `CloseApproach` encapsulates information about the NEO's close approach to
+    Earth, such as the date and time (in UTC) of closest approach, the nominal
+    approach distance in astronomical units, and the relative approach velocity
+    in kilometers per second.
+
+    A `CloseApproach` also maintains a reference to its `NearEarthObject` -
+    initially, this information (the NEO's primary designation) is saved in a
+    private attribute, but the referenced NEO is eventually replaced in the
+    `NEODatabase` constructor.
+    """
+    # The dictionary the approach was constructed from, if any.
+    info = None
+
+    # If you make changes, be sure to update the comments in this file.
+    def __init__(self, info):
+        """Create a new `CloseApproach`.
+
+        :param info: A dictionary of excess keyword arguments supplied to the constructor.
+        """
+        # onto attributes named `_designation`, `epoch_minutes`, `distance`, and `velocity`.
+        # You should coerce these values to their appropriate data type and handle any edge cases.
+        self.info = info
+        self._assign(info['des'], self._info_minutes(info), info['dist'], info['v_rel'])
+
+
+class CompactCloseApproach(_CloseApproachBase):
+    """A close approach to Earth by an NEO, without a per-instance `__dict__`.
+
+    A `CompactCloseApproach` has the same attributes and behavior as a
+    `CloseApproach`, except that it has no `info`.
+    """
+    __slots__ = ('_designation', 'epoch_minutes', 'distance', 'velocity', 'neo')
+
+    def __init__(self, info):
+        """Create a new `CompactCloseApproach`.
+
+        :param info: A dictionary of the values of a close approach.
+        """
+        self._assign(info['des'], self._info_minutes(info), info['dist'], info['v_rel'])
@@ -0,0 +1,135 @@
+"""Split the time-sorted close approaches into partitions by period, with statistics to prune them by.
+
+Since the close approaches of an `NEODatabase` are sorted by time, the
+approaches of one period - by default, one calendar year - are a contiguous run
+of positions. A `Partition` records that run, and the lowest and highest value
+of each indexed attribute within it, such as the nearest and farthest approach
+distances of 2020.
+
+A query that scans a range of positions only needs to examine the partitions
+whose statistics admit a match: a partition whose approaches are all faster than
+25 km/s can't hold a match for `velocity_max=20`, so it's skipped without
+looking at a single approach.
+
+A database reopened from a snapshot also loads partitions lazily. Each
+partition's approaches are stored in a segment of their own, and are only
+unpickled and linked to their NEOs once a query reads them - so a query about
+2020 never builds the approaches of 1900 to 2200. Until then, a `Partition`
+holds the `loader` that reads them from the snapshot.
+"""
+import bisect
+import datetime
+import operator
+
+# The default number of calendar years in each partition.
+PARTITION_YEARS = 1
+
+# For each comparator of a filter, whether some value between `low` and `high`
+# (inclusive) could satisfy it against the filter's reference value.
+MAY_PASS = {
+    operator.ge: lambda low, high, value: high >= value,
+    operator.gt: lambda low, high, value: high > value,
+    operator.le: lambda low, high, value: low <= value,
+    operator.lt: lambda low, high, value: low < value,
+    operator.eq: lambda low, high, value: low <= value <= high,
+}
+
+
+class Partition:
+    """A run of the time-sorted close approaches within one period, and the range of each attribute within it."""
+    __slots__ = ('key', 'start', 'stop', 'stats', 'loader')
+
+    def __init__(self, key, start, stop):
+        """Create a new `Partition`, without any statistics yet.
+
+        :param key: The first calendar year of the period.
+        :param start: The first position of the period's approaches.
+        :param stop: One past the last position of the period's approaches.
+        """
+        self.key = key
+        self.start = start
+        self.stop = stop
+        self.stats = {}
+        # A function that loads the approaches, while they're still in a snapshot, or else None.
+        self.loader = None
+
+    def __repr__(self):
+        return f"Partition(key={self.key}, start={self.start}, stop={self.stop}, stats={self.stats})"
+
+    def add_values(self, attribute, values):
+        """Widen the range of an attribute's values to cover more of them.
+
+        :param attribute: The name of the attribute, such as `distance`.
+        :param values: An iterable of values, where None or NaN stands for an unknown value.
+        """
+        known = [value for value in values if value is not None and value == value]
+        if not known:
+            return
+        low, high = min(known), max(known)
+        if attribute in self.stats:
+            low = min(low, self.stats[attribute][0])
+            high = max(high, self.stats[attribute][1])
+        self.stats[attribute] = (low, high)
+
+    def may_match(self, filters, attributes):
+        """Check whether the partition could hold an approach that passes a collection of filters.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :param attributes: The attribute that each filter compares, by key, for the filters with statistics.
+        :return: False if some filter rules out every approach of the partition.
+        """
+        for key, f in filters.items():
+            attribute = attributes.get(key)
+            may_pass = MAY_PASS.get(f.op)
+            if attribute is None or may_pass is None:
+                continue
+            if attribute not in self.stats:
+                # No value is known, and an unknown value never passes a comparison.
+                return False
+            low, high = self.stats[attribute]
+            if not may_pass(low, high, f.value):
+                return False
+        return True
+
+
+def partition_key(day, years=PARTITION_YEARS):
+    """Find the first calendar year of the period that contains an ordinal day."""
+    year = datetime.date.fromordinal(day).year
+    return year - year % years
+
+
+def locate(days, key, years=PARTITION_YEARS):
+    """Find the positions of the run of a period's approaches, given the sorted ordinal day of each approach.
+
+    :param days: The ordinal day of each of the time-sorted approaches.
+    :param key: The first calendar year of the period.
+    :param years: The number of calendar years in the period.
+    :return: A tuple of the start (inclusive) and stop (exclusive) positions.
+    """
+    start = 0
+    if key > datetime.MINYEAR:
+        start = bisect.bisect_left(days, datetime.date(key, 1, 1).toordinal())
+    if key + years > datetime.MAXYEAR:
+        return start, len(days)
+    return start, bisect.bisect_left(days, datetime.date(key + years, 1, 1).toordinal())
+
+
+def build_partitions(days, values, years=PARTITION_YEARS):
+    """Partition the time-sorted approaches by period, and gather the statistics of each partition.
+
+    :param days: The ordinal day of each of the time-sorted approaches.
+    :param values: A dictionary mapping each attribute to its value for each approach, in order.
+    :param years: The number of calendar years in each partition.
+    :return: A list of the non-empty `Partition`s, in time order.
+    """
+    partitions = []
+    position = 0
+    while position < len(days):
+        key = partition_key(days[position], years)
+        start, stop = locate(days, key, years)
+        partition = Partition(key, start, stop)
+        for attribute, column in values.items():
+            partition.add_values(attribute, column[start:stop])
+        partitions.append(partition)
+        position = stop
+    return partitions
@@ -0,0 +1,257 @@
+"""Serve inspect and query requests against an in-memory `NEODatabase` over a local HTTP API.
+
+The `serve` function loads nothing itself - it's handed the database that the
+main module loaded once - and answers HTTP requests on a localhost TCP port or
+on a Unix domain socket, until it's interrupted:
+
+    GET /inspect?pdes=433
+    GET /inspect?name=Halley&verbose=true
+    GET /query?start_date=2020-01-01&distance_max=0.025&hazardous=true&limit=100
+
+The parameters of `/query` are the arguments of `create_filters` - `date`,
+`start_date` and `end_date` in YYYY-MM-DD format, `distance_min`,
+`distance_max`, `velocity_min`, `velocity_max`, `diameter_min` and
+`diameter_max` as numbers, and `hazardous` as `true` or `false` - plus an
+optional `limit`. Its results are streamed as NDJSON, one close approach per
+line, formatted as by `write.iter_jsonl`. `/inspect` answers with one JSON object
+describing the NEO (and its close approaches, with `verbose=true`). A request
+that can't be answered gets a 4xx status and a JSON object with an `error` key.
+
+Each connection carries one request. The event loop only parses requests and
+writes responses; queries run through a `QueryExecutor`, which scans the
+database in worker threads, so other clients are still answered while a long
+scan runs. A client streaming the results of a scan waits for them in the event
+loop, woken by the scan, so waiting clients never hold a thread that a running
+scan's clients need. Identical concurrent queries share one scan, and a query
+refused because too many scans are already waiting gets a 503 status.
+"""
+import asyncio
+import datetime
+import http
+import json
+import logging
+import sys
+import urllib.parse
+
+from executor import MAX_QUEUE, MAX_SCANS, Overloaded, QueryExecutor
+from filters import create_filters
+from write import iter_jsonl
+
+logging.basicConfig()
+
+# Create logger and set the log level
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.ERROR)
+
+# The default address to listen on.
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+
+class RequestError(Exception):
+    """A request can't be answered, with the HTTP status to answer it with instead."""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_date(value):
+    """Parse a date in YYYY-MM-DD format."""
+    return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def parse_bool(value):
+    """Parse a boolean written as `true` or `false` (or `1` or `0`)."""
+    if value.lower() in ('true', '1'):
+        return True
+    if value.lower() in ('false', '0'):
+        return False
+    raise ValueError(f"'{value}' is not `true` or `false`.")
+
+
+# The parameters of `/query` that become arguments of `create_filters`, and how
+# to parse the value of each one.
+FILTER_PARAMETERS = {
+    'date': parse_date,
+    'start_date': parse_date,
+    'end_date': parse_date,
+    'distance_min': float,
+    'distance_max': float,
+    'velocity_min': float,
+    'velocity_max': float,
+    'diameter_min': float,
+    'diameter_max': float,
+    'hazardous': parse_bool,
+}
+
+
+def parse_query(params):
+    """Build the filters and the limit of a `/query` request from its parameters.
+
+    :param params: A dictionary of the request's query parameters.
+    :return: A tuple of the collection of filters and the limit (or None).
+    """
+    criteria = {}
+    n = None
+    for key, value in params.items():
+        try:
+            if key == 'limit':
+                n = int(value)
+                if n < 0:
+                    raise ValueError("the limit must not be negative.")
+            elif key in FILTER_PARAMETERS:
+                criteria[key] = FILTER_PARAMETERS[key](value)
+            else:
+                raise RequestError(400, f"Unknown query parameter '{key}'.")
+        except ValueError as err:
+            raise RequestError(400, f"Invalid value for '{key}': {err}") from err
+    return create_filters(**criteria), n
+
+
+def inspect_neo(database, params):
+    """Describe the NEO that an `/inspect` request asks for, as a JSON object.
+
+    :param database: The `NEODatabase` to look the NEO up in.
+    :param params: A dictionary of the request's query parameters.
+    :return: The JSON text of the response.
+    """
+    if 'pdes' in params:
+        neo = database.get_neo_by_designation(params['pdes'])
+    elif 'name' in params:
+        neo = database.get_neo_by_name(params['name'])
+    else:
+        raise RequestError(400, "Pass either `pdes` or `name`.")
+    if neo is None:
+        raise RequestError(404, "No matching NEOs exist in the database.")
+
+    body = {'designation': neo.designation, 'name': neo.name,
+            'diameter_km': neo.diameter, 'potentially_hazardous': neo.hazardous}
+    try:
+        verbose = parse_bool(params.get('verbose', 'false'))
+    except ValueError as err:
+        raise RequestError(400, f"Invalid value for 'verbose': {err}") from err
+    if verbose:
+        body['approaches'] = [{'datetime_utc': approach.time_str, 'distance_au': approach.distance,
+                               'velocity_km_s': approach.velocity} for approach in neo.approaches]
+    return json.dumps(body) + '\n'
+
+
+def response_head(status, content_type):
+    """Encode the status line and headers of a response, whose body runs until the connection closes."""
+    return (f'HTTP/1.1 {status} {http.HTTPStatus(status).phrase}\r\n'
+            f'Content-Type: {content_type}\r\n'
+            'Connection: close\r\n'
+            '\r\n').encode('latin-1')
+
+
+async def read_request(reader):
+    """Read the request line and headers of an HTTP request.
+
+    :param reader: The `asyncio.StreamReader` of the connection.
+    :return: A tuple of the request's method, path and query parameters.
+    """
+    parts = (await reader.readline()).decode('latin-1').split()
+    if len(parts) != 3:
+        raise RequestError(400, "Malformed request line.")
+    method, target, _ = parts
+
+    # Skip the headers, which don't change the response.
+    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+        pass
+
+    url = urllib.parse.urlsplit(target)
+    return method, url.path, dict(urllib.parse.parse_qsl(url.query, keep_blank_values=True))
+
+
+class NEOServer:
+    """Answer HTTP requests against an `NEODatabase`, one request per connection."""
+    def __init__(self, database, executor=None):
+        """Create a new `NEOServer`.
+
+        :param database: The `NEODatabase` (or `VersionedDatabase`) to answer requests against.
+        :param executor: The `QueryExecutor` to run queries with, or None for a default one.
+        """
+        self.database = database
+        self.executor = executor if executor is not None else QueryExecutor(database)
+
+    async def handle(self, reader, writer):
+        """Answer the request on one connection, and then close it."""
+        try:
+            try:
+                method, path, params = await read_request(reader)
+                if method != 'GET':
+                    raise RequestError(405, f"Method {method} isn't allowed.")
+                if path == '/inspect':
+                    body = inspect_neo(self.database, params)
+                    writer.write(response_head(200, 'application/json') + body.encode())
+                elif path == '/query':
+                    filters, n = parse_query(params)
+                    await self.stream_query(writer, filters, n)
+                else:
+                    raise RequestError(404, f"There's no endpoint at {path}.")
+            except RequestError as err:
+                body = json.dumps({'error': str(err)}) + '\n'
+                writer.write(response_head(err.status, 'application/json') + body.encode())
+            await writer.drain()
+        except ConnectionError as err:
+            logger.info(f'Lost a client connection: {err}')
+        finally:
+            writer.close()
+
+    async def stream_query(self, writer, filters, n):
+        """Stream the results of a query to a client as NDJSON, a batch at a time."""
+        try:
+            batches = self.executor.query_batches(filters, n)
+        except Overloaded as err:
+            raise RequestError(503, str(err)) from err
+        writer.write(response_head(200, 'application/x-ndjson'))
+        try:
+            async for batch in batches:
+                writer.write(''.join(iter_jsonl(batch)).encode())
+                # Let a slow client hold back the query, rather than buffering its results.
+                await writer.drain()
+        finally:
+            await batches.aclose()
+
+
+async def start_server(database, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None, executor=None):
+    """Start answering requests against a database in the running event loop.
+
+    :param database: The `NEODatabase` to serve.
+    :param host: The host to listen on, which should be a local address.
+    :param port: The TCP port to listen on, or 0 to pick a free one.
+    :param path: A path at which to listen on a Unix domain socket instead of TCP.
+    :param executor: The `QueryExecutor` to run queries with, or None for a default one.
+    :return: The listening `asyncio.Server`.
+    """
+    handler = NEOServer(database, executor).handle
+    if path is not None:
+        return await asyncio.start_unix_server(handler, path=str(path))
+    return await asyncio.start_server(handler, host, port)
+
+
+def serve(database, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None,
+          max_scans=MAX_SCANS, max_queue=MAX_QUEUE):
+    """Answer requests against a database until interrupted.
+
+    :param database: The `NEODatabase` to serve.
+    :param host: The host to listen on, which should be a local address.
+    :param port: The TCP port to listen on.
+    :param path: A path at which to listen on a Unix domain socket instead of TCP.
+    :param max_scans: The maximum number of queries to scan the database at once.
+    :param max_queue: The maximum number of queries to keep waiting for a scan.
+    """
+    executor = QueryExecutor(database, max_scans, max_queue)
+
+    async def run():
+        server = await start_server(database, host, port, path, executor)
+        print(f"Serving on {path or f'http://{host}:{port}'}; press Ctrl-C to stop.", file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        executor.shutdown()
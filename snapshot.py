@@ -0,0 +1,454 @@
+"""Cache a parsed and linked `NEODatabase` in a binary snapshot next to its data files.
+
+Parsing `neos.csv` and `cad.json` and linking the results together dominates
+the start-up time of the main module. The `load_database` function instead
+reopens a snapshot of a previously built database, if a fresh one exists, and
+otherwise builds the database from the data files and writes a new snapshot.
+
+A snapshot lives in a directory next to the close approach data file, named
+after both data files (for example, `data/.neos-cad.snapshot/`) - or next to the
+first of several close approach data files, named after all of them - and
+contains:
+
+    manifest.json   The size, modification time and SHA-256 digest of each
+                    data file, plus a digest of the code that defines the
+                    pickled classes and parses the data files into them, and
+                    the positions, statistics and checksum of each partition.
+    database.bin    The pickled database, in aligned segments. The first holds
+                    the database without its close approaches: the NEOs, the
+                    indexes and the bitmaps. Each partition's approaches follow
+                    in a segment of their own, which is only unpickled, and its
+                    approaches linked to their NEOs, once a query reads them.
+                    Large binary buffers (such as the columns of a
+                    `ColumnarNEODatabase`) come last, out-of-band, and are
+                    reopened as zero-copy views of the memory-mapped file.
+
+A snapshot is fresh if every data file has the recorded size and either the
+recorded modification time or, failing that, the recorded content digest. The
+snapshot format is pickle-based, so only open snapshots that you wrote.
+"""
+import functools
+import hashlib
+import io
+import json
+import logging
+import mmap
+import os
+import pathlib
+import pickle
+import struct
+import tempfile
+import zlib
+
+import bitmaps
+import columnar
+import database
+import extract
+import helpers
+import models
+import partitions
+from database import NEODatabase
+from extract import load_neos, load_approaches, load_merged_approaches
+from models import CompactNearEarthObject, CompactCloseApproach
+from partitions import Partition
+
+logging.basicConfig()
+
+# Create logger and set the log level
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.ERROR)
+
+# The leading bytes of `database.bin`.
+MAGIC = b'NEOSNAP1'
+
+# Out-of-band buffers are aligned to this many bytes within `database.bin`.
+ALIGNMENT = 64
+
+# The modules whose source defines the pickled objects - their layout, and the
+# values parsed into them from the data files.
+CODE_MODULES = (models, database, columnar, partitions, bitmaps, extract, helpers)
+
+
+def cad_paths_of(cad_path):
+    """Return a list of close approach data files, given either one path or a sequence of them."""
+    if isinstance(cad_path, (str, os.PathLike)):
+        return [cad_path]
+    return list(cad_path)
+
+
+def snapshot_dir(neo_path, cad_path):
+    """Return the snapshot directory for a set of data files.
+
+    :param neo_path: A path to a CSV file containing data about near-Earth objects.
+    :param cad_path: A path to a JSON file containing data about close approaches,
+        or a sequence of paths to several of them.
+    :return: A `pathlib.Path` to the snapshot directory.
+    """
+    cad_paths = [pathlib.Path(path) for path in cad_paths_of(cad_path)]
+    name = f'.{pathlib.Path(neo_path).stem}-{cad_paths[0].stem}'
+    if len(cad_paths) > 1:
+        # Name the snapshot of a set of files after all of them, so different sets don't share one.
+        digest = hashlib.sha256('\0'.join(str(path.resolve()) for path in cad_paths).encode()).hexdigest()
+        name += f'-{len(cad_paths)}-{digest[:12]}'
+    return cad_paths[0].parent / f'{name}.snapshot'
+
+
+def file_digest(path):
+    """Compute the SHA-256 digest of a file's content, reading it in blocks.
+
+    :param path: A path to the file to hash.
+    :return: The hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def code_digest():
+    """Compute a digest of the source of the modules that define pickled classes."""
+    digest = hashlib.sha256()
+    for module in CODE_MODULES:
+        digest.update(pathlib.Path(module.__file__).read_bytes())
+    return digest.hexdigest()
+
+
+def describe_source(path):
+    """Describe a data file by its size, modification time and content digest."""
+    stat = os.stat(path)
+    return {'path': str(pathlib.Path(path).resolve()), 'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns, 'sha256': file_digest(path)}
+
+
+def is_fresh(manifest, sources, database_class, compact=False):
+    """Check whether a snapshot manifest still matches its data files and code.
+
+    A data file whose modification time has changed, but whose content
+    digest still matches, has its new modification time recorded in the
+    manifest, so that it needn't be hashed again once the manifest is saved.
+
+    :param manifest: The decoded `manifest.json` of a snapshot, which may be updated.
+    :param sources: The paths of the data files, in the order they were recorded.
+    :param database_class: The class of database being loaded.
+    :param compact: Whether the database should hold the compact model variants.
+    :return: Whether the snapshot can be used in place of the data files.
+    """
+    if manifest.get('engine') != database_class.__name__ or manifest.get('code') != code_digest():
+        return False
+    if manifest.get('compact', False) != compact:
+        return False
+    recorded = manifest.get('sources', [])
+    if len(recorded) != len(sources):
+        return False
+    for entry, path in zip(recorded, sources):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        if stat.st_size != entry['size']:
+            return False
+        if stat.st_mtime_ns != entry['mtime_ns']:
+            if file_digest(path) != entry['sha256']:
+                return False
+            entry['mtime_ns'] = stat.st_mtime_ns
+    return True
+
+
+def write_snapshot(directory, db, sources, compact=False):
+    """Write a snapshot of a database to a directory.
+
+    Both files are written to temporary names first and then moved into place,
+    so a concurrent reader never observes a partial snapshot. A reader that
+    pairs the new `database.bin` with the old manifest finds that the checksum
+    of the first segment doesn't match, and rebuilds.
+
+    :param directory: The snapshot directory, which is created if missing.
+    :param db: The `NEODatabase` to save.
+    :param sources: The paths of the data files that the database was built from.
+    :param compact: Whether the database holds the compact model variants.
+    """
+    directory = pathlib.Path(directory)
+    directory.mkdir(exist_ok=True)
+    db.load_partitions(db._partitions)
+
+    numbers = {id(neo): number for number, neo in enumerate(db._neos)}
+    parts = []
+    for partition in db._partitions:
+        part = io.BytesIO()
+        PartitionPickler(part, numbers, protocol=5).dump(db._approaches[partition.start:partition.stop])
+        parts.append(part.getbuffer())
+    buffers = []
+    core = io.BytesIO()
+    CorePickler(core, db, protocol=5, buffer_callback=buffers.append).dump(db)
+    segments = [core.getbuffer()] + parts + [buffer.raw() for buffer in buffers]
+
+    # Lay out the header, then each segment at an aligned offset.
+    header_size = len(MAGIC) + struct.calcsize('<I') + len(segments) * struct.calcsize('<QQ')
+    offsets = []
+    offset = header_size
+    for segment in segments:
+        offset += -offset % ALIGNMENT
+        offsets.append(offset)
+        offset += segment.nbytes
+
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(segments)))
+        for offset, segment in zip(offsets, segments):
+            f.write(struct.pack('<QQ', offset, segment.nbytes))
+        for offset, segment in zip(offsets, segments):
+            f.write(b'\0' * (offset - f.tell()))
+            f.write(segment)
+    os.replace(f.name, directory / 'database.bin')
+
+    write_manifest(directory, {'engine': type(db).__name__, 'code': code_digest(), 'compact': compact,
+                               'sources': [describe_source(path) for path in sources],
+                               'crc32': zlib.crc32(segments[0]),
+                               'partitions': [{'key': partition.key, 'start': partition.start, 'stop': partition.stop,
+                                               'stats': partition.stats, 'crc32': zlib.crc32(part)}
+                                              for partition, part in zip(db._partitions, parts)]})
+
+
+def write_manifest(directory, manifest):
+    """Write the manifest of a snapshot, replacing any earlier one atomically.
+
+    :param directory: The snapshot directory.
+    :param manifest: The manifest, as a JSON-serializable dictionary.
+    """
+    with tempfile.NamedTemporaryFile('w', dir=directory, delete=False) as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f.name, pathlib.Path(directory) / 'manifest.json')
+
+
+class CorePickler(pickle.Pickler):
+    """Pickle a database without its close approaches, which are pickled by `PartitionPickler`, a partition at a time.
+
+    The list of time-sorted approaches, the list of partitions and each
+    designation's list of approaches are left out, as persistent IDs, which
+    `CoreUnpickler` replaces by their unloaded counterparts.
+    """
+    def __init__(self, file, db, **kwargs):
+        """Create a pickler for a database.
+
+        :param file: A binary file to write the pickle to.
+        :param db: The `NEODatabase` that will be pickled.
+        :param kwargs: Further arguments for `pickle.Pickler`.
+        """
+        super().__init__(file, **kwargs)
+        self.persistent = {id(db._approaches): ('approaches', len(db._approaches)),
+                           id(db._partitions): ('partitions',)}
+        for designation, linked in db._approaches_dict.items():
+            self.persistent[id(linked)] = ('linked', designation)
+
+    def persistent_id(self, obj):
+        return self.persistent.get(id(obj))
+
+
+class CoreUnpickler(pickle.Unpickler):
+    """Unpickle a database pickled by `CorePickler`, with none of its close approaches loaded yet."""
+    def __init__(self, file, partitions, **kwargs):
+        """Create an unpickler for a database.
+
+        :param file: A binary file to read the pickle from.
+        :param partitions: The database's `Partition`s, as described by the manifest.
+        :param kwargs: Further arguments for `pickle.Unpickler`.
+        """
+        super().__init__(file, **kwargs)
+        self.partitions = partitions
+        self.linked = {}
+
+    def persistent_load(self, pid):
+        kind, *args = pid
+        if kind == 'approaches':
+            return [None] * args[0]
+        if kind == 'partitions':
+            return self.partitions
+        if kind == 'linked':
+            # The same list is both the designation's entry and its NEO's `.approaches`.
+            return self.linked.setdefault(args[0], [])
+        raise pickle.UnpicklingError(f"Unknown persistent ID {pid!r}.")
+
+
+class PartitionPickler(pickle.Pickler):
+    """Pickle the close approaches of a partition, with each linked NEO as its position among the database's NEOs."""
+    def __init__(self, file, numbers, **kwargs):
+        """Create a pickler for the approaches of a partition.
+
+        :param file: A binary file to write the pickle to.
+        :param numbers: The position of each NEO of the database, by `id`.
+        :param kwargs: Further arguments for `pickle.Pickler`.
+        """
+        super().__init__(file, **kwargs)
+        self.numbers = numbers
+
+    def persistent_id(self, obj):
+        return self.numbers.get(id(obj))
+
+
+class PartitionUnpickler(pickle.Unpickler):
+    """Unpickle the close approaches of a partition, linking them to the NEOs of a database."""
+    def __init__(self, file, neos):
+        """Create an unpickler for the approaches of a partition.
+
+        :param file: A binary file to read the pickle from.
+        :param neos: The NEOs of the database that the approaches belong to.
+        """
+        super().__init__(file)
+        self.neos = neos
+
+    def persistent_load(self, pid):
+        return self.neos[pid]
+
+
+def load_partition(segment, checksum, size, neos):
+    """Unpickle the close approaches of a partition from its segment of a snapshot.
+
+    :param segment: The partition's segment of the memory-mapped `database.bin`.
+    :param checksum: The CRC-32 of the segment recorded in the manifest.
+    :param size: The number of approaches in the partition.
+    :param neos: The NEOs of the database that the approaches belong to.
+    :return: A list of the partition's approaches, in time order, linked to their NEOs.
+    :raises ValueError: If the segment is corrupt.
+    """
+    if zlib.crc32(segment) != checksum:
+        raise ValueError("A partition of the snapshot is corrupt.")
+    approaches = PartitionUnpickler(io.BytesIO(segment), neos).load()
+    if len(approaches) != size:
+        raise ValueError("A partition of the snapshot has the wrong number of approaches.")
+    return approaches
+
+
+def load_mapped(mapped, manifest):
+    """Unpickle the database in a memory-mapped `database.bin`, leaving its partitions to be loaded on demand.
+
+    Any out-of-band buffers are zero-copy views of the mapping, and keep it
+    alive for as long as they're used, as do the partitions not loaded yet.
+
+    :param mapped: The `mmap.mmap` of the file.
+    :param manifest: The decoded `manifest.json` of the snapshot.
+    :return: The unpickled object.
+    :raises ValueError: If the file isn't a snapshot, or doesn't match the manifest.
+    """
+    view = memoryview(mapped)
+    if view[:len(MAGIC)] != MAGIC:
+        raise ValueError("The file doesn't start with the snapshot magic number.")
+    position = len(MAGIC)
+    count, = struct.unpack_from('<I', view, position)
+    position += struct.calcsize('<I')
+    segments = []
+    for _ in range(count):
+        offset, length = struct.unpack_from('<QQ', view, position)
+        position += struct.calcsize('<QQ')
+        if offset + length > len(view):
+            raise ValueError("A segment runs past the end of the file.")
+        segments.append(view[offset:offset + length])
+    entries = manifest['partitions']
+    if len(segments) <= len(entries) or zlib.crc32(segments[0]) != manifest['crc32']:
+        raise ValueError("The file doesn't match the manifest.")
+    parts = []
+    for entry in entries:
+        partition = Partition(entry['key'], entry['start'], entry['stop'])
+        partition.stats = {attribute: tuple(bounds) for attribute, bounds in entry['stats'].items()}
+        parts.append(partition)
+    db = CoreUnpickler(io.BytesIO(segments[0]), parts, buffers=segments[1 + len(entries):]).load()
+    for partition, entry, segment in zip(parts, entries, segments[1:]):
+        partition.loader = functools.partial(load_partition, segment, entry['crc32'],
+                                             partition.stop - partition.start, db._neos)
+    return db
+
+
+def close_mapping(mapped):
+    """Close a memory mapping, unless views of it are still in use, which keep it open until they're freed."""
+    try:
+        mapped.close()
+    except BufferError:
+        pass
+
+
+def read_snapshot(directory, sources, database_class=NEODatabase, compact=False):
+    """Reopen the database saved in a snapshot directory, if it is fresh.
+
+    The snapshot is memory-mapped rather than read, so out-of-band buffers are
+    never copied, and each partition's close approaches are only read once a
+    query needs them, by `NEODatabase.load_partitions`.
+
+    :param directory: The snapshot directory.
+    :param sources: The paths of the data files that the database should reflect.
+    :param database_class: The class of database to load.
+    :param compact: Whether the database should hold the compact model variants.
+    :return: The saved database, or None if there's no fresh snapshot.
+    """
+    directory = pathlib.Path(directory)
+    try:
+        with open(directory / 'manifest.json') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    recorded = json.dumps(manifest)
+    if not is_fresh(manifest, sources, database_class, compact):
+        logger.info(f'Snapshot {directory} is stale.')
+        return None
+
+    try:
+        with open(directory / 'database.bin', 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        db = load_mapped(mapped, manifest)
+    except Exception as err:
+        # Besides `struct.error`, `pickle.UnpicklingError` and `EOFError`,
+        # unpickling corrupt data can raise almost any exception.
+        logger.warning(f'Snapshot {directory} is corrupt: {err}')
+        db = None
+    if not isinstance(db, database_class):
+        del db
+        close_mapping(mapped)
+        return None
+    if json.dumps(manifest) != recorded:
+        # Record the new modification times of data files that were only touched.
+        try:
+            write_manifest(directory, manifest)
+        except OSError as err:
+            logger.warning(f'Unable to update snapshot manifest {directory}: {err}')
+    return db
+
+
+def load_database(neo_path, cad_path, database_class=NEODatabase, use_snapshot=True, compact=False):
+    """Load a database from its data files, going through a snapshot if possible.
+
+    Several close approach data files are merged as by `load_merged_approaches`.
+
+    :param neo_path: A path to a CSV file containing data about near-Earth objects.
+    :param cad_path: A path to a JSON file containing data about close approaches,
+        or a sequence of paths to several of them.
+    :param database_class: The class of database to build, such as `NEODatabase`.
+    :param use_snapshot: Whether to read and write a snapshot at all.
+    :param compact: Whether to build the database from the compact, slotted model variants.
+    :return: A `database_class` instance.
+    """
+    # Out-of-band buffers need pickle protocol 5, from Python 3.8.
+    use_snapshot = use_snapshot and pickle.HIGHEST_PROTOCOL >= 5
+    cad_paths = cad_paths_of(cad_path)
+    sources = [neo_path, *cad_paths]
+    directory = snapshot_dir(neo_path, cad_paths)
+    if use_snapshot:
+        db = read_snapshot(directory, sources, database_class, compact)
+        if db is not None:
+            logger.debug(f'Loaded database from snapshot {directory}')
+            return db
+
+    load = load_approaches if len(cad_paths) == 1 else load_merged_approaches
+    cad_source = cad_paths[0] if len(cad_paths) == 1 else cad_paths
+    if compact:
+        db = database_class(load_neos(neo_path, neo_class=CompactNearEarthObject),
+                            load(cad_source, approach_class=CompactCloseApproach))
+    else:
+        db = database_class(load_neos(neo_path), load(cad_source))
+    if use_snapshot:
+        try:
+            write_snapshot(directory, db, sources, compact)
+        except OSError as err:
+            logger.warning(f'Unable to write snapshot {directory}: {err}')
+    return db
@@ -0,0 +1,38 @@
+"""Check packing row numbers into bitmaps and unpacking them again.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_bitmaps
+"""
+import unittest
+
+from bitmaps import bitmap_from_range, bitmap_from_rows, iter_bitmap, popcount
+
+
+class TestBitmaps(unittest.TestCase):
+    def test_rows_round_trip(self):
+        rows = [0, 1, 7, 8, 63, 64, 65, 127, 128, 1000]
+        bitmap = bitmap_from_rows(rows, 1001)
+        self.assertEqual(list(iter_bitmap(bitmap, 1001)), rows)
+        self.assertEqual(popcount(bitmap), len(rows))
+
+    def test_rows_in_any_order(self):
+        self.assertEqual(bitmap_from_rows([9, 2, 5], 10), bitmap_from_rows([2, 5, 9], 10))
+
+    def test_range(self):
+        self.assertEqual(list(iter_bitmap(bitmap_from_range(60, 70), 100)), list(range(60, 70)))
+        self.assertEqual(bitmap_from_range(5, 5), 0)
+        self.assertEqual(bitmap_from_range(7, 3), 0)
+
+    def test_intersection(self):
+        evens = bitmap_from_rows(range(0, 200, 2), 200)
+        threes = bitmap_from_rows(range(0, 200, 3), 200)
+        self.assertEqual(list(iter_bitmap(evens & threes, 200)), list(range(0, 200, 6)))
+
+    def test_empty(self):
+        self.assertEqual(list(iter_bitmap(0, 0)), [])
+        self.assertEqual(list(iter_bitmap(0, 100)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+"""Check that a `QueryCache` serves the same results as querying its database directly.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_cache
+"""
+import array
+import datetime
+import itertools
+import pathlib
+import unittest
+
+from cache import QueryCache, canonical_filters
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters, limit
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class CountingDatabase(NEODatabase):
+    """An `NEODatabase` that counts how many positions its queries generate."""
+    generated = 0
+
+    def query_positions(self, filters, first_position=0):
+        for position in super().query_positions(filters, first_position):
+            self.generated += 1
+            yield position
+
+
+class TestQueryCache(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = CountingDatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        cls.filters = create_filters(start_date=datetime.date(2020, 3, 1), velocity_max=20)
+        cls.expected = list(cls.db.query(cls.filters))
+
+    def setUp(self):
+        self.db.generated = 0
+        self.cache = QueryCache(self.db)
+
+    def test_canonical_filters_ignores_order(self):
+        filters = create_filters(distance_max=0.1, hazardous=True)
+        reordered = dict(reversed(list(filters.items())))
+        self.assertEqual(canonical_filters(filters), canonical_filters(reordered))
+        self.assertNotEqual(canonical_filters(filters), canonical_filters(create_filters(distance_max=0.2)))
+
+    def test_repeated_query_is_a_hit(self):
+        self.assertEqual(list(self.cache.query(self.filters)), self.expected)
+        generated = self.db.generated
+        self.assertEqual(list(self.cache.query(self.filters)), self.expected)
+        self.assertEqual(self.db.generated, generated)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_smaller_limit_is_a_hit(self):
+        self.assertEqual(list(self.cache.query(self.filters, 20)), self.expected[:20])
+        self.assertEqual(list(self.cache.query(self.filters, 5)), self.expected[:5])
+        self.assertEqual(self.db.generated, 20)
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_larger_limit_resumes(self):
+        self.assertEqual(list(self.cache.query(self.filters, 5)), self.expected[:5])
+        self.assertEqual(list(self.cache.query(self.filters, 20)), self.expected[:20])
+        self.assertEqual(self.db.generated, 20)
+        self.assertEqual(list(self.cache.query(self.filters)), self.expected)
+        self.assertEqual(self.db.generated, len(self.expected))
+        self.assertEqual(list(self.cache.query(self.filters, len(self.expected) + 10)), self.expected)
+        self.assertEqual(self.db.generated, len(self.expected))
+
+    def test_early_stop_caches_what_was_found(self):
+        results = self.cache.query(self.filters)
+        self.assertEqual(list(itertools.islice(results, 3)), self.expected[:3])
+        results.close()
+        self.assertEqual(list(self.cache.query(self.filters, 3)), self.expected[:3])
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_limit_matches_uncached_limit(self):
+        filters = create_filters(hazardous=True)
+        for n in (0, 1, 7, 3, 500, None):
+            self.assertEqual(list(self.cache.query(filters, n)), list(limit(self.db.query(filters), n)))
+
+    def test_negative_limit_is_refused(self):
+        with self.assertRaises(ValueError):
+            self.cache.query(self.filters, -1)
+        list(self.cache.query(self.filters))
+        with self.assertRaises(ValueError):
+            self.cache.query(self.filters, -1)
+
+    def test_evicts_least_recently_used_by_count(self):
+        cache = QueryCache(self.db, max_entries=2)
+        first, second, third = (create_filters(velocity_min=v) for v in (10, 20, 30))
+        list(cache.query(first, 1))
+        list(cache.query(second, 1))
+        list(cache.query(first, 1))
+        list(cache.query(third, 1))
+        self.assertEqual(len(cache), 2)
+        self.assertIsNotNone(cache.get(canonical_filters(first)))
+        self.assertIsNone(cache.get(canonical_filters(second)))
+
+    def test_evicts_by_size(self):
+        small = QueryCache(self.db, max_bytes=QueryCache.entry_size(array.array('q', range(50))))
+        list(small.query(self.filters, 10))
+        self.assertEqual(len(small), 1)
+        list(small.query(create_filters(), 40))
+        self.assertEqual(len(small), 1)
+        list(small.query(create_filters()))
+        self.assertEqual(len(small), 0)
+        self.assertEqual(small.size, 0)
+
+    def test_added_approaches_clear_the_cache(self):
+        approaches = sorted(load_approaches(TEST_CAD_FILE), key=lambda approach: approach.epoch_minutes)
+        db = NEODatabase(load_neos(TEST_NEO_FILE), approaches[::2])
+        cache = QueryCache(db)
+        list(cache.query(self.filters))
+        db.add_approaches(approaches[1::2])
+        self.assertEqual(list(cache.query(self.filters)), list(db.query(self.filters)))
+        self.assertEqual(cache.misses, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+"""Check that a `ColumnarNEODatabase` answers queries exactly like an `NEODatabase`.
+
+These tests are skipped if NumPy isn't installed.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_columnar
+"""
+import datetime
+import itertools
+import pathlib
+import unittest
+
+from columnar import ColumnarNEODatabase, np
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters, limit
+from tests import test_database
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+# A pool of criteria, combined in pairs below.
+CRITERIA = {
+    'date': datetime.date(2020, 3, 2),
+    'start_date': datetime.date(2020, 3, 1),
+    'end_date': datetime.date(2020, 5, 31),
+    'distance_min': 0.05,
+    'distance_max': 0.3,
+    'velocity_min': 10,
+    'velocity_max': 25,
+    'diameter_min': 0.2,
+    'diameter_max': 1.5,
+    'hazardous': False,
+}
+
+
+@unittest.skipIf(np is None, "NumPy is not installed.")
+class TestColumnarQuery(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        cls.columnar = ColumnarNEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    def assertSameResults(self, **criteria):
+        filters = create_filters(**criteria)
+        expected = [(a.time, a.neo.designation) for a in self.db.query(filters)]
+        received = [(a.time, a.neo.designation) for a in self.columnar.query(filters)]
+        self.assertEqual(expected, received, msg=f"Results differ for {criteria}.")
+
+    def test_columns_have_one_row_per_approach(self):
+        for column in self.columnar._columns.values():
+            self.assertEqual(len(column), len(self.columnar._approaches))
+
+    def test_query_all(self):
+        self.assertSameResults()
+
+    def test_query_with_single_criteria(self):
+        for key, value in CRITERIA.items():
+            self.assertSameResults(**{key: value})
+
+    def test_query_with_pairs_of_criteria(self):
+        for (key1, value1), (key2, value2) in itertools.combinations(CRITERIA.items(), 2):
+            self.assertSameResults(**{key1: value1, key2: value2})
+
+    def test_query_with_hazardous(self):
+        self.assertSameResults(hazardous=True, distance_max=0.2)
+
+    def test_query_across_chunks(self):
+        self.columnar.chunk_size = 100
+        try:
+            self.assertSameResults(velocity_min=15)
+            self.assertSameResults(start_date=datetime.date(2020, 6, 1), distance_max=0.1)
+        finally:
+            del self.columnar.chunk_size
+
+    def test_query_with_limit(self):
+        filters = create_filters(distance_max=0.1)
+        expected = list(limit(self.db.query(filters), 5))
+        received = list(limit(self.columnar.query(filters), 5))
+        self.assertEqual([a.time for a in expected], [a.time for a in received])
+
+    def test_explain_evaluates_masks(self):
+        filters = create_filters(date=datetime.date(2020, 3, 2), velocity_min=10, hazardous=False)
+        results = []
+        report = self.columnar.explain(filters, write=results.extend)
+        self.assertEqual(results, list(self.columnar.query(filters)))
+        self.assertEqual(report['engine'], 'numpy')
+        self.assertEqual(report['access'], 'time range scan')
+        self.assertIn('mask', report['seconds'])
+        start, stop = self.columnar.get_day_range(filters)
+        self.assertEqual(report['examined'], stop - start)
+        self.assertEqual(set(report['order']), {'velocity_min', 'hazardous'})
+        counts = [count for _, count in report['matched']]
+        self.assertEqual(counts, sorted(counts, reverse=True))
+        self.assertEqual(counts[-1], len(results))
+
+    def test_broad_filters_use_the_masks(self):
+        for criteria in ({'velocity_min': 10}, {'hazardous': True}, {'hazardous': False}, {'diameter_max': 100}):
+            report = self.columnar.explain(create_filters(**criteria))
+            self.assertEqual((report['access'], report['engine']), ('time range scan', 'numpy'), msg=str(criteria))
+            self.assertSameResults(**criteria)
+
+    def test_explain_walks_an_index_range_per_object(self):
+        filters = create_filters(distance_max=0.0002)
+        report = self.columnar.explain(filters)
+        self.assertEqual(report['engine'], 'python')
+        self.assertEqual(report['access'], 'distance index range')
+        self.assertNotIn('mask', report['seconds'])
+        self.assertEqual(report['returned'], len(list(self.columnar.query(filters))))
+
+
+@unittest.skipIf(np is None, "NumPy is not installed.")
+class TestColumnarIncrementalIngestion(test_database.TestIncrementalIngestion):
+    database_class = ColumnarNEODatabase
+
+    def test_columns_match_the_approaches(self):
+        expected = ColumnarNEODatabase.build_columns(self.db._approaches)
+        for name, column in expected.items():
+            np.testing.assert_array_equal(self.db._columns[name], column)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+"""Check that data files and output files can be compressed with gzip or Zstandard.
+
+Zstandard needs Python 3.14 or the optional `zstandard` module, so its tests
+are skipped without either.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_compressed
+"""
+import gzip
+import json
+import pathlib
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+import compressed
+from compressed import check_support, compression_of, open_text, strip_compression
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from write import write_to_csv, write_to_json, write_to_jsonl
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+HAS_ZSTD = compressed.zstd is not None or compressed.zstandard is not None
+
+
+class TestCompressionSuffixes(unittest.TestCase):
+    def test_compression_of(self):
+        self.assertEqual(compression_of('cad.json.gz'), 'gzip')
+        self.assertEqual(compression_of(pathlib.Path('data/neos.csv.zst')), 'zstd')
+        self.assertIsNone(compression_of('cad.json'))
+        self.assertIsNone(compression_of(None))
+
+    def test_strip_compression(self):
+        self.assertEqual(strip_compression('results.csv.gz').suffix, '.csv')
+        self.assertEqual(strip_compression('results.jsonl.zst').suffix, '.jsonl')
+        self.assertEqual(strip_compression('results.json').suffix, '.json')
+
+
+class TestCompressedFiles(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.root = pathlib.Path(cls.directory.name)
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        NEODatabase(cls.neos, cls.approaches)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def compress(self, path, suffix):
+        target = self.root / (path.name + suffix)
+        with open(path) as source, open_text(target, 'w') as f:
+            shutil.copyfileobj(source, f)
+        return target
+
+    def assertLoadsFrom(self, suffix):
+        neos = load_neos(self.compress(TEST_NEO_FILE, suffix))
+        approaches = load_approaches(self.compress(TEST_CAD_FILE, suffix))
+        self.assertEqual([neo.designation for neo in neos], [neo.designation for neo in self.neos])
+        self.assertEqual([(approach._designation, approach.epoch_minutes, approach.distance)
+                          for approach in approaches],
+                         [(approach._designation, approach.epoch_minutes, approach.distance)
+                          for approach in self.approaches])
+
+    def assertWritesTo(self, suffix):
+        for writer, name in ((write_to_csv, 'results.csv'), (write_to_json, 'results.json'),
+                             (write_to_jsonl, 'results.jsonl')):
+            plain = self.root / name
+            packed = self.root / (name + suffix)
+            writer(self.approaches[:100], plain)
+            writer(self.approaches[:100], packed)
+            with open_text(packed, newline='') as f, open(plain, newline='') as expected:
+                self.assertEqual(f.read(), expected.read())
+            self.assertLess(packed.stat().st_size, plain.stat().st_size)
+
+    def test_load_gzip(self):
+        self.assertLoadsFrom('.gz')
+
+    def test_write_gzip(self):
+        self.assertWritesTo('.gz')
+        with gzip.open(self.root / 'results.json.gz', 'rt') as f:
+            self.assertEqual(len(json.load(f)), 100)
+
+    @unittest.skipIf(not HAS_ZSTD, "Zstandard support requires Python 3.14 or the zstandard module.")
+    def test_load_zstd(self):
+        self.assertLoadsFrom('.zst')
+
+    @unittest.skipIf(not HAS_ZSTD, "Zstandard support requires Python 3.14 or the zstandard module.")
+    def test_write_zstd(self):
+        self.assertWritesTo('.zst')
+
+    @unittest.skipIf(HAS_ZSTD, "Zstandard is supported.")
+    def test_zstd_without_support_raises(self):
+        with self.assertRaises(ImportError):
+            open_text(self.root / 'results.csv.zst', 'w')
+
+    def test_check_support(self):
+        check_support(self.root / 'results.csv.gz')
+        with unittest.mock.patch('compressed.zstd', None), unittest.mock.patch('compressed.zstandard', None):
+            with self.assertRaises(ImportError):
+                check_support(self.root / 'results.csv.zst')
+            check_support(self.root / 'results.csv')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,13 +10,19 @@ To run these tests from the project root, run:
 
 These tests should pass when Task 2 is complete.
 """
+import datetime
+import itertools
 import pathlib
 import math
 import unittest
+import unittest.mock
 
 
 from extract import load_neos, load_approaches
+from bitmaps import iter_bitmap
 from database import NEODatabase
+from filters import create_filters
+from models import NearEarthObject, CompactNearEarthObject, CompactCloseApproach
 
 
 # Paths to the test data files.
@@ -114,6 +120,213 @@ class TestDatabase(unittest.TestCase):
         nonexistent = self.db.get_neo_by_name('not-real-name')
         self.assertIsNone(nonexistent)
 
+    def test_get_neo_by_name_prefers_first_match(self):
+        first = NearEarthObject({'pdes': '1', 'name': 'Shared', 'diameter': '', 'pha': 'N'})
+        second = NearEarthObject({'pdes': '2', 'name': 'Shared', 'diameter': '', 'pha': 'N'})
+        db = NEODatabase([first, second], [])
+        self.assertIs(db.get_neo_by_name('Shared'), first)
+        self.assertIs(db.get_neo_by_designation('2'), second)
+
+    def test_compact_database_matches(self):
+        neos = load_neos(TEST_NEO_FILE, neo_class=CompactNearEarthObject)
+        approaches = load_approaches(TEST_CAD_FILE, approach_class=CompactCloseApproach)
+        db = NEODatabase(neos, approaches)
+        filters = create_filters(start_date=datetime.date(2020, 3, 1), hazardous=True)
+        self.assertEqual([(a.time, a.neo.designation) for a in db.query(filters)],
+                         [(a.time, a.neo.designation) for a in self.db.query(filters)])
+        self.assertEqual(len(db.get_neo_by_name('Adonis').approaches),
+                         len(self.db.get_neo_by_name('Adonis').approaches))
+
+    def test_query_generates_approaches_in_time_order(self):
+        filters = create_filters(start_date=datetime.date(2020, 3, 1),
+                                 end_date=datetime.date(2020, 3, 31))
+        times = [approach.time for approach in self.db.query(filters)]
+        self.assertGreater(len(times), 0)
+        self.assertEqual(times, sorted(times))
+
+    def test_query_streams_earliest_approach_first(self):
+        earliest = min(self.approaches, key=lambda approach: approach.time)
+        first = next(self.db.query(create_filters()))
+        self.assertEqual(first.time, earliest.time)
+
+    def test_day_range_covers_exactly_the_matching_approaches(self):
+        date = datetime.date(2020, 3, 2)
+        start, stop = self.db.get_day_range(create_filters(date=date))
+        expected = sum(1 for approach in self.approaches if approach.time.date() == date)
+        self.assertGreater(expected, 0)
+        self.assertEqual(stop - start, expected)
+
+    def test_day_range_is_empty_for_conflicting_bounds(self):
+        filters = create_filters(start_date=datetime.date(2020, 10, 1),
+                                 end_date=datetime.date(2020, 4, 1))
+        start, stop = self.db.get_day_range(filters)
+        self.assertEqual(start, stop)
+
+    def test_indexes_are_sorted_permutations(self):
+        for attribute in ('distance', 'velocity', 'diameter'):
+            values, rows = self.db._indexes[attribute]
+            self.assertEqual(list(values), sorted(values))
+            self.assertEqual(len(set(rows)), len(rows))
+
+    def test_plan_walks_a_selective_index(self):
+        filters = create_filters(distance_max=0.001)
+        attribute, start, stop, answered = self.db.plan(filters)
+        self.assertEqual(attribute, 'distance')
+        self.assertEqual(answered, ('distance_max',))
+        expected = sum(1 for approach in self.approaches if approach.distance <= 0.001)
+        self.assertEqual(stop - start, expected)
+
+    def test_plan_prefers_a_selective_date(self):
+        filters = create_filters(date=datetime.date(2020, 3, 2), velocity_min=5)
+        attribute, _, _, answered = self.db.plan(filters)
+        self.assertIsNone(attribute)
+        self.assertEqual(answered, ('date',))
+
+    def assertQueryMatchesInTimeOrder(self, filters):
+        received = list(self.db.query(filters))
+        expected = [approach for approach in sorted(self.approaches, key=lambda approach: approach.time)
+                    if all(f.get(approach) for f in filters.values())]
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(received, expected)
+
+    def test_indexed_query_generates_approaches_in_time_order(self):
+        filters = create_filters(start_date=datetime.date(2020, 3, 1), diameter_min=2.0, velocity_max=30)
+        self.assertEqual(self.db.plan(filters)[0], 'diameter')
+        self.assertQueryMatchesInTimeOrder(filters)
+
+    def test_bitmap_query_generates_approaches_in_time_order(self):
+        filters = create_filters(start_date=datetime.date(2020, 3, 1), diameter_min=1.0, velocity_max=30)
+        self.assertEqual(self.db.plan(filters)[0], 'bitmap')
+        self.assertQueryMatchesInTimeOrder(filters)
+
+    def test_bitmap_query_answers_hazardous(self):
+        for hazardous in (True, False):
+            filters = create_filters(hazardous=hazardous, velocity_min=20)
+            self.assertEqual(self.db.plan(filters)[0], 'bitmap')
+            self.assertQueryMatchesInTimeOrder(filters)
+
+    def test_range_bitmap_matches_index_range(self):
+        for attribute in ('distance', 'velocity', 'diameter'):
+            values, rows = self.db._indexes[attribute]
+            for start, stop in ((0, len(rows)), (3, len(rows) // 2), (len(rows) // 3, len(rows) // 3 + 5), (7, 7)):
+                bitmap = self.db.get_range_bitmap(attribute, start, stop)
+                self.assertEqual(list(iter_bitmap(bitmap, len(self.approaches))), sorted(rows[start:stop]))
+
+    def test_explain_counts_rows_surviving_each_filter(self):
+        filters = create_filters(date=datetime.date(2020, 3, 2), velocity_min=10, hazardous=False)
+        results = []
+        report = self.db.explain(filters, write=results.extend)
+        self.assertEqual(results, list(self.db.query(filters)))
+        self.assertEqual(report['access'], 'time range scan')
+        self.assertEqual(report['answered'], ('date',))
+        start, stop = self.db.get_day_range(filters)
+        self.assertEqual(report['examined'], stop - start)
+        self.assertEqual([key for key, _ in report['matched']], list(report['order']))
+        counts = [count for _, count in report['matched']]
+        self.assertEqual(counts, sorted(counts, reverse=True))
+        self.assertEqual(counts[-1], len(results))
+        self.assertEqual(report['returned'], len(results))
+        self.assertEqual(set(report['seconds']), {'plan', 'sort', 'scan', 'limit', 'write'})
+
+    def test_explain_stops_at_the_limit(self):
+        filters = create_filters(velocity_min=10)
+        report = self.db.explain(filters, n=3)
+        self.assertEqual(report['returned'], 3)
+        self.assertLess(report['examined'], len(self.approaches))
+
+    def test_explain_reports_an_index_range(self):
+        report = self.db.explain(create_filters(distance_max=0.001))
+        self.assertEqual(report['access'], 'distance index range')
+        self.assertEqual(report['order'], ())
+        self.assertEqual(report['examined'], report['returned'])
+
+    def test_explain_plans_once(self):
+        plan = NEODatabase.plan
+        with unittest.mock.patch.object(NEODatabase, 'plan', autospec=True, side_effect=plan) as planned:
+            self.db.explain(create_filters(velocity_min=10, hazardous=False))
+        self.assertEqual(planned.call_count, 1)
+
+
+class TestIncrementalIngestion(unittest.TestCase):
+    """Check that a database grown by `add_neos` and `add_approaches` matches one built all at once."""
+    database_class = NEODatabase
+
+    @classmethod
+    def setUpClass(cls):
+        cls.full = cls.database_class(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+        # Start with every other NEO, and the close approaches of the first half of the year.
+        neos = load_neos(TEST_NEO_FILE)
+        approaches = sorted(load_approaches(TEST_CAD_FILE), key=lambda approach: approach.epoch_minutes)
+        middle = len(approaches) // 2
+        cls.db = cls.database_class(neos[::2], approaches[:middle])
+
+        # Add the rest of the approaches, along with a fresh copy of every approach, out of order.
+        duplicates = load_approaches(TEST_CAD_FILE)
+        cls.approaches_added = cls.db.add_approaches(approaches[middle:][::-1] + duplicates)
+        cls.neos_added = cls.db.add_neos(neos[1::2] + load_neos(TEST_NEO_FILE)[:10])
+
+    @staticmethod
+    def identify(database, rows):
+        """Identify the approaches at some rows by designation and time, since approaches at the same time may swap rows."""
+        return sorted((database._approaches[row].get_designation(), database._approaches[row].epoch_minutes)
+                      for row in rows)
+
+    def assertSameResults(self, filters):
+        results = list(self.db.query(filters))
+        self.assertEqual([approach.epoch_minutes for approach in results],
+                         [approach.epoch_minutes for approach in self.full.query(filters)])
+        self.assertEqual(sorted(map(repr, results)), sorted(map(repr, self.full.query(filters))))
+
+    def test_counts_skip_duplicates(self):
+        self.assertEqual(self.approaches_added, len(self.full._approaches) - len(self.full._approaches) // 2)
+        self.assertEqual(self.neos_added, len(self.full._neos) // 2)
+        self.assertEqual(self.db.revision, 2)
+        self.assertEqual(self.db.add_approaches(load_approaches(TEST_CAD_FILE)), 0)
+        self.assertEqual(self.db.revision, 2)
+
+    def test_links_match(self):
+        for neo in self.full._neos:
+            linked = self.db.get_neo_by_designation(neo.designation)
+            self.assertEqual([approach.epoch_minutes for approach in linked.approaches],
+                             [approach.epoch_minutes for approach in neo.approaches])
+            for approach in linked.approaches:
+                self.assertIs(approach.neo, linked)
+
+    def test_store_indexes_and_bitmaps_match(self):
+        self.assertEqual(self.db._days, self.full._days)
+        for attribute, (values, rows) in self.full._indexes.items():
+            self.assertEqual(self.db._indexes[attribute][0], values)
+            self.assertEqual(self.identify(self.db, self.db._indexes[attribute][1]), self.identify(self.full, rows))
+        size = len(self.full._approaches)
+        for name, bitmap in self.full._bitmaps.items():
+            self.assertEqual(self.identify(self.db, iter_bitmap(self.db._bitmaps[name], size)),
+                             self.identify(self.full, iter_bitmap(bitmap, size)))
+        self.assertEqual(self.db._bitmap_counts, self.full._bitmap_counts)
+
+    def test_range_bitmaps_match_index_ranges(self):
+        size = len(self.db._approaches)
+        for attribute in ('distance', 'velocity', 'diameter'):
+            _, rows = self.db._indexes[attribute]
+            for start, stop in ((0, len(rows)), (3, len(rows) // 2), (len(rows) // 3, len(rows) - 5)):
+                bitmap = self.db.get_range_bitmap(attribute, start, stop)
+                self.assertEqual(list(iter_bitmap(bitmap, size)), sorted(rows[start:stop]))
+
+    def test_queries_match(self):
+        criteria = {
+            'date': datetime.date(2020, 3, 2),
+            'start_date': datetime.date(2020, 5, 1),
+            'distance_max': 0.05,
+            'velocity_min': 20,
+            'diameter_min': 0.5,
+            'diameter_max': 1.5,
+            'hazardous': True,
+        }
+        self.assertSameResults({})
+        for (first, a), (second, b) in itertools.combinations(criteria.items(), 2):
+            with self.subTest(first=first, second=second):
+                self.assertSameResults(create_filters(**{first: a, second: b}))
+
 
 if __name__ == '__main__':
     unittest.main()
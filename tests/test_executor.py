@@ -0,0 +1,179 @@
+"""Check that a `QueryExecutor` coalesces identical queries and bounds the rest.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_executor
+"""
+import asyncio
+import concurrent.futures
+import datetime
+import pathlib
+import threading
+import unittest
+
+from database import NEODatabase
+from executor import BATCH_SIZE, Overloaded, QueryExecutor
+from extract import load_neos, load_approaches
+from filters import create_filters, limit
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class GatedDatabase(NEODatabase):
+    """An `NEODatabase` whose queries wait for a gate to open before generating anything.
+
+    If `pause_after` is set, its queries also wait for `resume` after generating that many positions.
+    """
+    pause_after = None
+
+    def __init__(self, neos, approaches):
+        super().__init__(neos, approaches)
+        self.gate = threading.Event()
+        self.resume = threading.Event()
+        self.started = threading.Semaphore(0)
+        self.generated = 0
+
+    def query_positions(self, filters, first_position=0):
+        self.started.release()
+        self.gate.wait()
+        for position in super().query_positions(filters, first_position):
+            if self.generated == self.pause_after:
+                self.resume.wait()
+            self.generated += 1
+            yield position
+
+
+class TestQueryExecutor(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = GatedDatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        cls.filters = create_filters(start_date=datetime.date(2020, 3, 1), velocity_max=20)
+
+    def setUp(self):
+        self.db.gate.clear()
+        self.db.resume.clear()
+        self.db.generated = 0
+        self.db.pause_after = None
+        self.executor = QueryExecutor(self.db, max_scans=1, max_queue=1)
+
+    def tearDown(self):
+        self.db.gate.set()
+        self.db.resume.set()
+        self.executor.shutdown()
+
+    def test_results_match_the_database(self):
+        self.db.gate.set()
+        self.assertEqual(list(self.executor.query(self.filters)), list(self.db.query(self.filters)))
+        self.assertEqual(list(self.executor.query(self.filters, 5)), list(limit(self.db.query(self.filters), 5)))
+
+    def test_identical_queries_share_a_scan(self):
+        streams = [self.executor.query(self.filters) for _ in range(10)]
+        self.assertEqual(self.executor.scans, 1)
+        self.assertEqual(self.executor.coalesced, 9)
+
+        self.db.gate.set()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=10) as pool:
+            results = list(pool.map(list, streams))
+        expected = list(self.db.query(self.filters))
+        for result in results:
+            self.assertEqual(result, expected)
+        self.assertEqual(self.db.generated, 2 * len(expected))
+
+    def test_different_limits_scan_separately(self):
+        self.db.gate.set()
+        first = self.executor.query(self.filters, 5)
+        second = self.executor.query(self.filters, 10)
+        self.assertEqual(self.executor.scans, 2)
+        self.assertEqual(len(list(first)), 5)
+        self.assertEqual(len(list(second)), 10)
+
+    def test_full_queue_refuses_new_scans(self):
+        running = self.executor.query(create_filters(hazardous=True))
+        self.db.started.acquire()
+        waiting = self.executor.query(create_filters(hazardous=False))
+        with self.assertRaises(Overloaded):
+            self.executor.query(create_filters(distance_max=0.1))
+        self.assertEqual(self.executor.rejected, 1)
+
+        # A query joining a scan that's already admitted is still served.
+        joined = self.executor.query(create_filters(hazardous=True))
+        self.db.gate.set()
+        self.assertEqual(list(joined), list(running))
+        self.assertEqual(list(waiting), list(self.db.query(create_filters(hazardous=False))))
+
+        # Once the scans finish, new ones are admitted again.
+        self.assertEqual(list(self.executor.query(create_filters(distance_max=0.1))),
+                         list(self.db.query(create_filters(distance_max=0.1))))
+
+    def test_batches_wait_without_threads(self):
+        async def run():
+            streams = [self.executor.query_batches(self.filters) for _ in range(64)]
+            waiting = [asyncio.ensure_future(stream.__anext__()) for stream in streams]
+            await asyncio.sleep(0.1)
+            # Every client is waiting on the gated scan, and the loop's thread pool is still free.
+            self.assertFalse(any(future.done() for future in waiting))
+            self.assertEqual(await asyncio.wait_for(asyncio.get_running_loop().run_in_executor(None, int), 5), 0)
+
+            self.db.gate.set()
+            results = []
+            for stream, first in zip(streams, waiting):
+                approaches = list(await first)
+                async for batch in stream:
+                    approaches.extend(batch)
+                results.append(approaches)
+            return results
+
+        results = asyncio.run(run())
+        expected = list(self.db.query(self.filters))
+        for result in results:
+            self.assertEqual(result, expected)
+        self.assertEqual(self.executor.scans, 1)
+
+    def test_closed_batches_leave_the_scan(self):
+        async def run():
+            stream = self.executor.query_batches({})
+            self.db.gate.set()
+            batch = await stream.__anext__()
+            await stream.aclose()
+            return batch
+
+        self.db.pause_after = BATCH_SIZE
+        self.assertEqual(len(asyncio.run(run())), BATCH_SIZE)
+        self.db.resume.set()
+        self.executor.shutdown()
+        self.assertEqual(self.db.generated, 2 * BATCH_SIZE)
+
+    def test_negative_limit_is_refused(self):
+        with self.assertRaises(ValueError):
+            self.executor.query(self.filters, -1)
+        self.assertEqual(self.executor.scans, 0)
+
+    def test_failed_scan_raises_in_every_client(self):
+        class BrokenDatabase(NEODatabase):
+            def query_positions(self, filters, first_position=0):
+                raise RuntimeError("The scan failed.")
+
+        executor = QueryExecutor(BrokenDatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE)))
+        streams = [executor.query(self.filters) for _ in range(2)]
+        for stream in streams:
+            with self.assertRaises(RuntimeError):
+                list(stream)
+        executor.shutdown()
+
+    def test_abandoned_scan_stops_early(self):
+        self.db.pause_after = BATCH_SIZE
+        stream = self.executor.query({})
+        self.db.gate.set()
+        next(stream)
+        stream.close()
+        self.db.resume.set()
+        self.executor.shutdown()
+        # The scan finishes the batch it was finding, and then stops.
+        self.assertEqual(self.db.generated, 2 * BATCH_SIZE)
+
+
+if __name__ == '__main__':
+    unittest.main()
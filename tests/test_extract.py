@@ -12,12 +12,16 @@ These tests should pass when Task 2 is complete.
 """
 import collections.abc
 import datetime
+import json
 import pathlib
 import math
+import tempfile
 import unittest
+import unittest.mock
 
-from extract import load_neos, load_approaches
-from models import NearEarthObject, CloseApproach
+from extract import (load_neos, load_approaches, iter_cad_rows, expand_paths,
+                     iter_merged_approaches, load_merged_approaches)
+from models import NearEarthObject, CloseApproach, CompactNearEarthObject, CompactCloseApproach
 
 
 TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
@@ -68,6 +72,27 @@ class TestLoadNEOs(unittest.TestCase):
         self.assertTrue(math.isnan(neo.diameter))
         self.assertEqual(neo.hazardous, True)
 
+    def test_neos_keep_no_extra_columns_by_default(self):
+        neo = self.neos_by_designation['2101']
+        self.assertEqual(neo.info, {})
+
+    def test_neos_keep_requested_columns(self):
+        neos = load_neos(TEST_NEO_FILE, columns=('H', 'albedo', 'pdes'))
+        neo = next(neo for neo in neos if neo.designation == '1685')
+        self.assertEqual(neo.info, {'H': '14.3', 'albedo': '0.31'})
+        self.assertEqual(neo.name, 'Toro')
+        self.assertEqual(neo.diameter, 3.4)
+
+    def test_neos_with_unknown_column_raise(self):
+        with self.assertRaises(ValueError):
+            load_neos(TEST_NEO_FILE, columns=('not-a-column',))
+
+    def test_neos_skip_blank_lines(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = pathlib.Path(directory) / 'neos.csv'
+            path.write_bytes(TEST_NEO_FILE.read_bytes() + b'\n')
+            self.assertEqual(len(load_neos(path)), 4226)
+
     def test_adonis_is_potentially_hazardous(self):
         self.assertIn('2101', self.neos_by_designation)
         neo = self.neos_by_designation['2101']
@@ -107,6 +132,26 @@ class TestLoadApproaches(unittest.TestCase):
         self.assertIsNotNone(approach)
         self.assertIsInstance(approach.time, datetime.datetime)
 
+    def test_approach_time_is_built_lazily(self):
+        approach = self.get_first_approach_or_none()
+        self.assertIsInstance(approach.epoch_minutes, int)
+        self.assertNotIn('time', vars(approach))
+        self.assertEqual(approach.time, datetime.datetime(1970, 1, 1)
+                         + datetime.timedelta(minutes=approach.epoch_minutes))
+
+    def test_approach_time_from_jd_matches_cd(self):
+        with open(TEST_CAD_FILE) as f:
+            document = json.load(f)
+        cd = document['fields'].index('cd')
+        for approach, row in zip(self.approaches, document['data']):
+            expected = datetime.datetime.strptime(row[cd], '%Y-%b-%d %H:%M')
+            self.assertEqual(approach.time, expected)
+
+    def test_approach_time_without_jd_uses_cd(self):
+        approach = CloseApproach({'des': '433', 'cd': '2020-Jan-01 00:54', 'dist': '0.1', 'v_rel': '5'})
+        self.assertEqual(approach.time, datetime.datetime(2020, 1, 1, 0, 54))
+        self.assertEqual(approach.time_str, '2020-01-01 00:54')
+
     def test_approach_distance_is_float(self):
         approach = self.get_first_approach_or_none()
         self.assertIsNotNone(approach)
@@ -118,5 +163,159 @@ class TestLoadApproaches(unittest.TestCase):
         self.assertIsInstance(approach.velocity, float)
 
 
+class TestLoadCompact(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.compact_neos = load_neos(TEST_NEO_FILE, neo_class=CompactNearEarthObject)
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        cls.compact_approaches = load_approaches(TEST_CAD_FILE, approach_class=CompactCloseApproach)
+
+    def test_compact_objects_have_no_dict(self):
+        for obj in (self.compact_neos[0], self.compact_approaches[0]):
+            self.assertFalse(hasattr(obj, '__dict__'))
+            self.assertFalse(hasattr(obj, 'info'))
+
+    def test_compact_neos_match_neos(self):
+        self.assertEqual(len(self.compact_neos), len(self.neos))
+        for neo, compact in zip(self.neos, self.compact_neos):
+            self.assertIsInstance(compact, CompactNearEarthObject)
+            self.assertEqual(str(compact), str(neo))
+            self.assertEqual((compact.designation, compact.name, compact.hazardous, compact.approaches),
+                             (neo.designation, neo.name, neo.hazardous, neo.approaches))
+
+    def test_compact_approaches_match_approaches(self):
+        self.assertEqual(len(self.compact_approaches), len(self.approaches))
+        for approach, compact in zip(self.approaches, self.compact_approaches):
+            self.assertIsInstance(compact, CompactCloseApproach)
+            self.assertEqual((compact.time, compact.time_str, compact.distance, compact.velocity),
+                             (approach.time, approach.time_str, approach.distance, approach.velocity))
+            self.assertEqual(compact.get_designation(), approach.get_designation())
+            self.assertIsNone(compact.neo)
+
+
+class TestIterCADRows(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(TEST_CAD_FILE) as f:
+            cls.document = json.load(f)
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.tmp.name) / 'cad.json'
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, document, **kwargs):
+        with open(self.path, 'w') as f:
+            json.dump(document, f, **kwargs)
+
+    def assertStreamsDocument(self, path):
+        rows = list(iter_cad_rows(path))
+        self.assertEqual([row for _, row in rows], self.document['data'])
+        for fields, _ in rows:
+            self.assertEqual(fields, self.document['fields'])
+
+    def test_rows_match_json_load(self):
+        self.assertStreamsDocument(TEST_CAD_FILE)
+
+    def test_rows_are_streamed(self):
+        rows = iter_cad_rows(TEST_CAD_FILE)
+        self.assertIsInstance(rows, collections.abc.Iterator)
+        _, row = next(rows)
+        self.assertEqual(row, self.document['data'][0])
+
+    def test_rows_with_tiny_chunks(self):
+        with unittest.mock.patch('extract.CHUNK_SIZE', 7):
+            self.assertStreamsDocument(TEST_CAD_FILE)
+
+    def test_rows_with_fields_before_data(self):
+        document = {'fields': self.document['fields'], 'count': self.document['count'],
+                    'data': self.document['data']}
+        self.write(document, separators=(',', ':'))
+        self.assertStreamsDocument(self.path)
+
+    def test_rows_with_fields_beyond_the_tail(self):
+        self.write(self.document, indent=2)
+        with unittest.mock.patch('extract.FIELDS_TAIL_SIZE', 16):
+            self.assertStreamsDocument(self.path)
+
+    def test_rows_of_empty_data(self):
+        self.write({'count': 0, 'data': [], 'fields': self.document['fields']})
+        self.assertEqual(list(iter_cad_rows(self.path)), [])
+
+    def test_truncated_document_raises(self):
+        with open(TEST_CAD_FILE) as f:
+            text = f.read()
+        with open(self.path, 'w') as f:
+            f.write(text[:len(text) // 2])
+        with self.assertRaises(ValueError):
+            list(iter_cad_rows(self.path))
+
+
+class TestMergedApproaches(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(TEST_CAD_FILE) as f:
+            cls.document = json.load(f)
+        cls.expected = [repr(approach) for approach in load_approaches(TEST_CAD_FILE)]
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, rows):
+        path = self.root / name
+        with open(path, 'w') as f:
+            json.dump(dict(self.document, data=rows, count=str(len(rows))), f)
+        return path
+
+    def split(self):
+        """Split the test data into three exports, where each overlaps the next."""
+        rows = self.document['data']
+        third = len(rows) // 3
+        return [self.write('cad-1.json', rows[:third + 10]),
+                self.write('cad-2.json', rows[third:2 * third + 10]),
+                self.write('cad-3.json', rows[2 * third:])]
+
+    def test_merge_matches_the_whole_file(self):
+        paths = self.split()
+        self.assertEqual([repr(approach) for approach in load_merged_approaches(paths)], self.expected)
+
+    def test_merge_is_streamed(self):
+        merged = iter_merged_approaches(self.split())
+        self.assertNotIsInstance(merged, collections.abc.Sequence)
+        self.assertEqual(repr(next(merged)), self.expected[0])
+
+    def test_interleaved_files_merge_in_time_order(self):
+        rows = self.document['data']
+        paths = [self.write('even.json', rows[::2]), self.write('odd.json', rows[1::2]),
+                 self.write('all.json', rows)]
+        merged = load_merged_approaches(paths)
+        self.assertEqual(sorted(repr(approach) for approach in merged), sorted(self.expected))
+        times = [approach.epoch_minutes for approach in merged]
+        self.assertEqual(times, sorted(times))
+
+    def test_unsorted_file_is_sorted_instead(self):
+        rows = self.document['data']
+        paths = [self.write('reversed.json', rows[::-1]), self.write('copy.json', rows[:100])]
+        merged = load_merged_approaches(paths)
+        self.assertEqual(sorted(repr(approach) for approach in merged), sorted(self.expected))
+        times = [approach.epoch_minutes for approach in merged]
+        self.assertEqual(times, sorted(times))
+
+    def test_expand_paths(self):
+        paths = self.split()
+        self.assertEqual(expand_paths([self.root / 'cad-*.json']), paths)
+        self.assertEqual(expand_paths([paths[2], self.root / 'cad-[12].json']), [paths[2]] + paths[:2])
+        self.assertEqual(expand_paths([self.root / 'missing.json']), [self.root / 'missing.json'])
+        with self.assertRaises(ValueError):
+            expand_paths([self.root / 'missing-*.json'])
+
+
 if __name__ == '__main__':
     unittest.main()
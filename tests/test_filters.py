@@ -0,0 +1,93 @@
+"""Check that a compiled predicate agrees with the filters it was compiled from.
+
+The predicate from `compile_filters` must accept exactly the close approaches
+for which every filter's `get` succeeds, for any combination of filters, and
+must check cheap, selective filters first.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_filters
+"""
+import datetime
+import itertools
+import operator
+import pathlib
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters, compile_filters, AttributeFilter, DiameterMaxFilter
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+# A pool of criteria, combined in triples below.
+CRITERIA = {
+    'date': datetime.date(2020, 3, 2),
+    'start_date': datetime.date(2020, 3, 1),
+    'end_date': datetime.date(2020, 5, 31),
+    'distance_min': 0.05,
+    'distance_max': 0.3,
+    'velocity_min': 10,
+    'velocity_max': 25,
+    'diameter_min': 0.2,
+    'diameter_max': 1.5,
+    'hazardous': False,
+}
+
+
+class NameLengthFilter(AttributeFilter):
+    def get(self, approach):
+        return self.op(len(approach.neo.designation), self.value)
+
+
+class TestCompileFilters(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        NEODatabase(load_neos(TEST_NEO_FILE), cls.approaches)
+
+    def assertCompiledMatches(self, filters):
+        predicate = compile_filters(filters)
+        for approach in self.approaches:
+            expected = all(f.get(approach) for f in filters.values())
+            self.assertEqual(bool(predicate(approach)), expected,
+                             msg=f"{filters} disagree on {approach!r}.")
+        self.assertCountEqual(predicate.order, filters.keys())
+
+    def test_no_filters_accepts_everything(self):
+        predicate = compile_filters({})
+        self.assertTrue(all(predicate(approach) for approach in self.approaches))
+
+    def test_compiled_matches_each_triple_of_filters(self):
+        for criteria in itertools.combinations(CRITERIA.items(), 3):
+            self.assertCompiledMatches(create_filters(**dict(criteria)))
+
+    def test_compiled_matches_hazardous(self):
+        self.assertCompiledMatches(create_filters(hazardous=True, diameter_min=0.1))
+
+    def test_compiled_rejects_zero_diameter_bound_like_get(self):
+        self.assertCompiledMatches({'diameter_max': DiameterMaxFilter(operator.le, 0)})
+
+    def test_compiled_calls_unknown_filters(self):
+        filters = create_filters(distance_max=0.1)
+        filters['name_length'] = NameLengthFilter(operator.le, 6)
+        self.assertCompiledMatches(filters)
+        self.assertEqual(compile_filters(filters).order[-1], 'name_length')
+
+    def test_compiled_checks_selective_filters_first(self):
+        filters = create_filters(date=datetime.date(2020, 3, 2), velocity_min=10, hazardous=True)
+        self.assertEqual(compile_filters(filters).order[0], 'date')
+
+    def test_compiled_order_follows_selectivity_estimates(self):
+        filters = create_filters(distance_max=0.001, velocity_min=10)
+        order = compile_filters(filters, selectivity={'distance_max': 0.01, 'velocity_min': 0.9}).order
+        self.assertEqual(order, ('distance_max', 'velocity_min'))
+        order = compile_filters(filters, selectivity={'distance_max': 0.9, 'velocity_min': 0.01}).order
+        self.assertEqual(order, ('velocity_min', 'distance_max'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+"""Check that NASA's calendar dates are converted exactly as `strptime` would.
+
+The fast `cd_to_datetime` parser, the `cd_to_minutes` converter and the
+column-wise `cd_column_to_minutes` converter must all agree with `strptime`, for
+every month, and must reject the same malformed input.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_helpers
+"""
+import datetime
+import json
+import pathlib
+import unittest
+import unittest.mock
+
+import helpers
+from helpers import cd_to_datetime, cd_to_minutes, cd_column_to_minutes, datetime_to_str
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def strptime(calendar_date):
+    return datetime.datetime.strptime(calendar_date, "%Y-%b-%d %H:%M")
+
+
+def strptime_minutes(calendar_date):
+    return (strptime(calendar_date) - EPOCH) // datetime.timedelta(minutes=1)
+
+
+class TestCalendarDates(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.calendar_dates = []
+        for year in (1900, 1969, 1970, 2000, 2020, 2100, 2199):
+            for month in MONTHS:
+                for day, time in (('01', '00:00'), ('15', '12:34'), ('28', '23:59')):
+                    cls.calendar_dates.append(f'{year}-{month}-{day} {time}')
+        cls.calendar_dates += ['2020-Feb-29 06:07', '2000-Feb-29 00:00', '2020-Dec-31 23:59']
+
+        with open(TEST_CAD_FILE) as f:
+            document = json.load(f)
+        cls.cad_dates = [row[document['fields'].index('cd')] for row in document['data']]
+
+        cls.malformed = ['2020-Feb-30 00:00', '2019-Feb-29 00:00', '2020-Foo-01 00:00',
+                         '2020-Jan-01 24:00', '2020-Jan-01 00:60', '2020-Jan-01T00:00',
+                         '2020-Jan-01 00:001', '', 'not a date']
+
+    def test_cd_to_datetime_matches_strptime_in_every_month(self):
+        for calendar_date in self.calendar_dates + self.cad_dates:
+            self.assertEqual(cd_to_datetime(calendar_date), strptime(calendar_date), msg=calendar_date)
+
+    def test_cd_to_datetime_accepts_what_strptime_accepts(self):
+        for calendar_date in ('2020-jan-01 00:00', '2020-Jan-1 0:05', '0999-Jan-01 00:00'):
+            self.assertEqual(cd_to_datetime(calendar_date), strptime(calendar_date), msg=calendar_date)
+
+    def test_cd_to_datetime_rejects_malformed_dates(self):
+        for calendar_date in self.malformed:
+            with self.assertRaises(ValueError, msg=calendar_date):
+                cd_to_datetime(calendar_date)
+
+    def test_cd_to_minutes_matches_strptime(self):
+        self.assertEqual(cd_to_minutes('1970-Jan-02 00:01'), 1441)
+        for calendar_date in self.calendar_dates:
+            self.assertEqual(cd_to_minutes(calendar_date), strptime_minutes(calendar_date), msg=calendar_date)
+
+    def test_cd_column_to_minutes_matches_strptime(self):
+        dates = self.calendar_dates + self.cad_dates + ['2020-Jan-1 0:05']
+        expected = [strptime_minutes(calendar_date) for calendar_date in dates]
+        self.assertEqual(list(cd_column_to_minutes(dates)), expected)
+
+    def test_cd_column_to_minutes_without_numpy(self):
+        with unittest.mock.patch('helpers.np', None):
+            minutes = cd_column_to_minutes(self.calendar_dates)
+        self.assertEqual(minutes.typecode, 'q')
+        self.assertEqual(list(minutes), [strptime_minutes(d) for d in self.calendar_dates])
+
+    def test_cd_column_to_minutes_of_nothing(self):
+        self.assertEqual(len(cd_column_to_minutes([])), 0)
+
+    def test_cd_column_to_minutes_rejects_malformed_dates(self):
+        for calendar_date in self.malformed:
+            with self.assertRaises(ValueError, msg=calendar_date):
+                cd_column_to_minutes(['2020-Jan-01 00:00', calendar_date])
+
+    @unittest.skipIf(helpers.np is None, "NumPy is not installed.")
+    def test_cd_column_to_minutes_is_int64(self):
+        self.assertEqual(cd_column_to_minutes(self.calendar_dates).dtype, helpers.np.int64)
+
+    def test_datetime_to_str_round_trip(self):
+        self.assertEqual(datetime_to_str(cd_to_datetime('2020-Dec-31 12:00')), '2020-12-31 12:00')
+
+
+if __name__ == '__main__':
+    unittest.main()
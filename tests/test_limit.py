@@ -27,6 +27,9 @@ class TestLimit(unittest.TestCase):
         self.assertEqual(tuple(limit(self.iterable, 0)), (0, 1, 2, 3, 4))
         self.assertEqual(tuple(limit(self.iterable, None)), (0, 1, 2, 3, 4))
 
+    def test_limit_iterable_with_negative_limit(self):
+        self.assertEqual(tuple(limit(self.iterable, -1)), ())
+
     def test_limit_iterator_with_smaller_limit(self):
         self.assertEqual(tuple(limit(iter(self.iterable), 3)), (0, 1, 2))
 
@@ -41,6 +44,17 @@ class TestLimit(unittest.TestCase):
         self.assertEqual(tuple(limit(iter(self.iterable), 0)), (0, 1, 2, 3, 4))
         self.assertEqual(tuple(limit(iter(self.iterable), None)), (0, 1, 2, 3, 4))
 
+    def test_limit_does_not_read_past_the_limit(self):
+        pulled = []
+
+        def source():
+            for value in self.iterable:
+                pulled.append(value)
+                yield value
+
+        self.assertEqual(tuple(limit(source(), 2)), (0, 1))
+        self.assertEqual(pulled, [0, 1])
+
     def test_limit_produces_an_iterable(self):
         self.assertIsInstance(limit(self.iterable, 3), collections.abc.Iterable)
         self.assertIsInstance(limit(self.iterable, 5), collections.abc.Iterable)
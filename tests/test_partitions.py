@@ -0,0 +1,143 @@
+"""Check that the close approaches of an `NEODatabase` are partitioned by period, and scans prune partitions.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_partitions
+"""
+import datetime
+import pathlib
+import unittest
+
+from columnar import ColumnarNEODatabase, np
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from partitions import Partition, build_partitions, partition_key
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+def shifted_approaches(years, velocity=0):
+    """Load the test close approaches of 2020, moved forward by some years and optionally sped up.
+
+    Those that the move pushes past the end of the year are left out.
+    """
+    minutes = (datetime.datetime(2020 + years, 1, 1) - datetime.datetime(2020, 1, 1)) // datetime.timedelta(minutes=1)
+    approaches = load_approaches(TEST_CAD_FILE)
+    for approach in approaches:
+        approach.epoch_minutes += minutes
+        approach.velocity += velocity
+    return [approach for approach in approaches if approach.time.year == 2020 + years]
+
+
+class TestPartition(unittest.TestCase):
+    def test_partition_key(self):
+        day = datetime.date(2023, 6, 1).toordinal()
+        self.assertEqual(partition_key(day), 2023)
+        self.assertEqual(partition_key(day, 10), 2020)
+
+    def test_stats_skip_unknown_values(self):
+        partition = Partition(2020, 0, 4)
+        partition.add_values('diameter', [float('nan'), 0.5, None, 2.0])
+        partition.add_values('diameter', [1.0, 3.0])
+        self.assertEqual(partition.stats, {'diameter': (0.5, 3.0)})
+
+    def test_may_match(self):
+        partition = Partition(2020, 0, 2)
+        partition.add_values('velocity', [10.0, 20.0])
+        attributes = {'velocity_min': 'velocity', 'velocity_max': 'velocity', 'diameter_min': 'diameter'}
+        self.assertTrue(partition.may_match(create_filters(velocity_min=20), attributes))
+        self.assertFalse(partition.may_match(create_filters(velocity_min=20.5), attributes))
+        self.assertTrue(partition.may_match(create_filters(velocity_max=10), attributes))
+        self.assertFalse(partition.may_match(create_filters(velocity_max=9), attributes))
+        # No diameter is known, so no diameter filter can pass.
+        self.assertFalse(partition.may_match(create_filters(diameter_min=0.1), attributes))
+        # Filters on attributes without statistics never prune.
+        self.assertTrue(partition.may_match(create_filters(hazardous=True), attributes))
+
+    def test_build_partitions(self):
+        days = [datetime.date(year, 7, 1).toordinal() for year in (2019, 2019, 2021, 2022)]
+        partitions = build_partitions(days, {'distance': [0.1, 0.2, 0.3, float('nan')]})
+        self.assertEqual([(p.key, p.start, p.stop) for p in partitions],
+                         [(2019, 0, 2), (2021, 2, 3), (2022, 3, 4)])
+        self.assertEqual([p.stats for p in partitions],
+                         [{'distance': (0.1, 0.2)}, {'distance': (0.3, 0.3)}, {}])
+
+
+class TestPartitionedDatabase(unittest.TestCase):
+    database_class = NEODatabase
+
+    def setUp(self):
+        # The same year of approaches, three times over, with the middle one much faster.
+        self.approaches = shifted_approaches(0) + shifted_approaches(1, velocity=100) + shifted_approaches(2)
+        self.db = self.database_class(load_neos(TEST_NEO_FILE), list(self.approaches))
+
+    def check_partitions(self, db):
+        partitions = db._partitions
+        self.assertEqual(partitions[0].start, 0)
+        self.assertEqual(partitions[-1].stop, len(db._approaches))
+        for before, after in zip(partitions, partitions[1:]):
+            self.assertEqual(before.stop, after.start)
+            self.assertLess(before.key, after.key)
+        for partition in partitions:
+            approaches = db._approaches[partition.start:partition.stop]
+            self.assertTrue(all(approach.time.year - approach.time.year % db.partition_years == partition.key
+                                for approach in approaches))
+            velocities = [approach.velocity for approach in approaches]
+            self.assertEqual(partition.stats['velocity'], (min(velocities), max(velocities)))
+            diameters = [approach.neo.diameter for approach in approaches
+                         if approach.neo is not None and approach.neo.diameter == approach.neo.diameter]
+            if diameters:
+                self.assertEqual(partition.stats['diameter'], (min(diameters), max(diameters)))
+
+    def test_partitions_cover_the_approaches(self):
+        self.assertEqual([partition.key for partition in self.db._partitions], [2020, 2021, 2022])
+        self.check_partitions(self.db)
+
+    def test_scan_prunes_partitions(self):
+        filters = create_filters(velocity_max=50)
+        report = self.db.explain(filters)
+        self.assertEqual(report['access'], 'time range scan')
+        self.assertEqual(report['partitions'], (2, 3))
+        self.assertEqual(report['examined'], sum(approach.time.year != 2021 for approach in self.approaches))
+
+        expected = sorted((approach for approach in self.approaches if approach.velocity <= 50),
+                          key=lambda approach: approach.epoch_minutes)
+        self.assertEqual([approach.epoch_minutes for approach in self.db.query(filters)],
+                         [approach.epoch_minutes for approach in expected])
+
+    def test_scan_within_a_date_range(self):
+        filters = create_filters(start_date=datetime.date(2021, 6, 1), end_date=datetime.date(2022, 6, 1),
+                                 velocity_max=50)
+        report = self.db.explain(filters)
+        self.assertEqual(report['access'], 'time range scan')
+        self.assertEqual(report['partitions'], (1, 3))
+        results = list(self.db.query(filters))
+        self.assertTrue(results)
+        self.assertTrue(all(approach.time.year == 2022 for approach in results))
+
+    def test_add_approaches_updates_partitions(self):
+        self.db.add_approaches(shifted_approaches(5, velocity=200))
+        self.assertEqual([partition.key for partition in self.db._partitions], [2020, 2021, 2022, 2025])
+        self.check_partitions(self.db)
+        self.assertEqual(self.db.explain(create_filters(velocity_max=150))['partitions'], (3, 4))
+
+    def test_longer_periods(self):
+        class BiennialDatabase(self.database_class):
+            partition_years = 2
+
+        db = BiennialDatabase(load_neos(TEST_NEO_FILE), list(self.approaches))
+        self.assertEqual([partition.key for partition in db._partitions], [2020, 2022])
+        self.check_partitions(db)
+
+
+@unittest.skipIf(np is None, "NumPy is not installed.")
+class TestPartitionedColumnarDatabase(TestPartitionedDatabase):
+    database_class = ColumnarNEODatabase
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+"""Check that the query server answers requests like the database it serves.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_server
+"""
+import asyncio
+import datetime
+import json
+import pathlib
+import tempfile
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters, limit
+from server import start_server
+from write import iter_jsonl
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+async def fetch(target, port=None, path=None):
+    """Send a GET request to the server and read its whole response.
+
+    :return: A tuple of the response's status code and body.
+    """
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(str(path))
+    else:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), body.decode()
+
+
+class TestServer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    def fetch_all(self, *targets):
+        """Start a server on a free port, and fetch each target from it concurrently."""
+        async def run():
+            server = await start_server(self.db, port=0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                return await asyncio.gather(*(fetch(target, port) for target in targets))
+        return asyncio.run(run())
+
+    def test_query_streams_ndjson(self):
+        filters = create_filters(start_date=datetime.date(2020, 3, 1), velocity_max=20)
+        expected = ''.join(iter_jsonl(limit(self.db.query(filters), 50)))
+        [(status, body)] = self.fetch_all('/query?start_date=2020-03-01&velocity_max=20&limit=50')
+        self.assertEqual(status, 200)
+        self.assertEqual(body, expected)
+
+    def test_query_without_limit_returns_every_match(self):
+        filters = create_filters(hazardous=True)
+        expected = ''.join(iter_jsonl(self.db.query(filters)))
+        [(status, body)] = self.fetch_all('/query?hazardous=true')
+        self.assertEqual(status, 200)
+        self.assertEqual(body, expected)
+
+    def test_concurrent_queries(self):
+        targets = ['/query?distance_max=0.1', '/query?hazardous=false&limit=5', '/inspect?pdes=1865']
+        responses = self.fetch_all(*targets)
+        self.assertEqual([status for status, _ in responses], [200, 200, 200])
+        self.assertEqual(responses[0][1], ''.join(iter_jsonl(self.db.query(create_filters(distance_max=0.1)))))
+        self.assertEqual(len(responses[1][1].splitlines()), 5)
+
+    def test_inspect(self):
+        [(status, body)] = self.fetch_all('/inspect?name=Cerberus&verbose=true')
+        self.assertEqual(status, 200)
+        neo = self.db.get_neo_by_name('Cerberus')
+        described = json.loads(body)
+        self.assertEqual(described['designation'], neo.designation)
+        self.assertEqual(described['potentially_hazardous'], neo.hazardous)
+        self.assertEqual(len(described['approaches']), len(neo.approaches))
+
+    def test_errors(self):
+        responses = self.fetch_all('/inspect?pdes=not-an-neo', '/query?start_date=yesterday',
+                                   '/query?colour=red', '/query?limit=-1', '/nowhere')
+        self.assertEqual([status for status, _ in responses], [404, 400, 400, 400, 404])
+        for _, body in responses:
+            self.assertIn('error', json.loads(body))
+
+    def test_unix_socket(self):
+        async def run(path):
+            server = await start_server(self.db, path=path)
+            async with server:
+                return await fetch('/query?limit=3', path=path)
+
+        with tempfile.TemporaryDirectory() as directory:
+            status, body = asyncio.run(run(pathlib.Path(directory) / 'neo.sock'))
+        self.assertEqual(status, 200)
+        self.assertEqual(body, ''.join(iter_jsonl(limit(self.db.query({}), 3))))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,229 @@
+"""Check that a database can be saved to and reopened from a snapshot.
+
+The snapshot must reproduce the linked database exactly, and must be ignored
+once the data files it was built from change.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_snapshot
+"""
+import datetime
+import json
+import os
+import pathlib
+import shutil
+import struct
+import tempfile
+import unittest
+import unittest.mock
+
+from columnar import ColumnarNEODatabase, np
+from database import NEODatabase
+from extract import load_neos
+from filters import create_filters
+from snapshot import CODE_MODULES, load_database, read_snapshot, snapshot_dir, write_snapshot
+from tests.test_partitions import shifted_approaches
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmp = pathlib.Path(tempfile.mkdtemp())
+        self.neo_file = self.tmp / TEST_NEO_FILE.name
+        self.cad_file = self.tmp / TEST_CAD_FILE.name
+        shutil.copy(TEST_NEO_FILE, self.neo_file)
+        shutil.copy(TEST_CAD_FILE, self.cad_file)
+        self.sources = [self.neo_file, self.cad_file]
+        self.directory = snapshot_dir(self.neo_file, self.cad_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def assertSameDatabase(self, expected, received):
+        filters = create_filters(start_date=datetime.date(2020, 3, 1), distance_max=0.2)
+        self.assertEqual([(a.time, a.distance, a.neo.designation) for a in expected.query(filters)],
+                         [(a.time, a.distance, a.neo.designation) for a in received.query(filters)])
+        adonis = received.get_neo_by_name('Adonis')
+        self.assertIsNotNone(adonis)
+        for approach in adonis.approaches:
+            self.assertIs(approach.neo, adonis)
+
+    def test_load_writes_a_snapshot(self):
+        self.assertIsNone(read_snapshot(self.directory, self.sources))
+        load_database(self.neo_file, self.cad_file)
+        self.assertIsNotNone(read_snapshot(self.directory, self.sources))
+
+    def test_snapshot_reproduces_the_database(self):
+        built = load_database(self.neo_file, self.cad_file)
+        reopened = load_database(self.neo_file, self.cad_file)
+        self.assertIsNot(built, reopened)
+        self.assertIsInstance(reopened, NEODatabase)
+        self.assertSameDatabase(built, reopened)
+
+    def test_snapshot_survives_touch_without_change(self):
+        load_database(self.neo_file, self.cad_file)
+        stat = os.stat(self.cad_file)
+        os.utime(self.cad_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertIsNotNone(read_snapshot(self.directory, self.sources))
+
+        # The new modification time is recorded, so the file isn't hashed again.
+        with open(self.directory / 'manifest.json') as f:
+            manifest = json.load(f)
+        self.assertEqual(manifest['sources'][1]['mtime_ns'], stat.st_mtime_ns + 10 ** 9)
+        with unittest.mock.patch('snapshot.file_digest') as file_digest:
+            self.assertIsNotNone(read_snapshot(self.directory, self.sources))
+        file_digest.assert_not_called()
+
+    def test_snapshot_is_stale_after_change(self):
+        load_database(self.neo_file, self.cad_file)
+        with open(self.neo_file, 'a') as f:
+            f.write('\n')
+        self.assertIsNone(read_snapshot(self.directory, self.sources))
+
+    def test_corrupt_snapshot_is_rebuilt(self):
+        built = load_database(self.neo_file, self.cad_file)
+        path = self.directory / 'database.bin'
+        content = path.read_bytes()
+        for corrupt in (content[:len(content) // 2], content[:20], b'NOTASNAP' + content[8:],
+                        content[:200] + bytes(1000) + content[1200:]):
+            path.write_bytes(corrupt)
+            self.assertIsNone(read_snapshot(self.directory, self.sources))
+            self.assertSameDatabase(built, load_database(self.neo_file, self.cad_file))
+            # The rebuilt database was written as a fresh snapshot.
+            self.assertIsNotNone(read_snapshot(self.directory, self.sources))
+
+    def test_code_digest_covers_parsing(self):
+        names = {module.__name__ for module in CODE_MODULES}
+        self.assertLessEqual({'extract', 'helpers', 'bitmaps', 'models', 'database'}, names)
+
+    def test_snapshot_is_keyed_by_engine(self):
+        load_database(self.neo_file, self.cad_file)
+        self.assertIsNone(read_snapshot(self.directory, self.sources, ColumnarNEODatabase))
+
+    def test_snapshot_is_keyed_by_compactness(self):
+        load_database(self.neo_file, self.cad_file)
+        self.assertIsNone(read_snapshot(self.directory, self.sources, compact=True))
+        built = load_database(self.neo_file, self.cad_file, compact=True)
+        reopened = read_snapshot(self.directory, self.sources, compact=True)
+        self.assertIsNotNone(reopened)
+        self.assertSameDatabase(built, reopened)
+
+    def test_no_snapshot_writes_nothing(self):
+        load_database(self.neo_file, self.cad_file, use_snapshot=False)
+        self.assertFalse(self.directory.exists())
+
+    @unittest.skipIf(np is None, "NumPy is not installed.")
+    def test_columnar_snapshot_maps_columns(self):
+        built = load_database(self.neo_file, self.cad_file, ColumnarNEODatabase)
+        reopened = load_database(self.neo_file, self.cad_file, ColumnarNEODatabase)
+        self.assertIsInstance(reopened, ColumnarNEODatabase)
+        self.assertFalse(reopened._columns['distance'].flags.writeable)
+        self.assertSameDatabase(built, reopened)
+
+
+    def test_several_cad_files_share_a_snapshot(self):
+        with open(self.cad_file) as f:
+            document = json.load(f)
+        rows = document['data']
+        paths = []
+        for number, part in enumerate((rows[:len(rows) // 2], rows[len(rows) // 3:])):
+            paths.append(self.tmp / f'cad-{number}.json')
+            with open(paths[-1], 'w') as f:
+                json.dump(dict(document, data=part, count=str(len(part))), f)
+
+        built = load_database(self.neo_file, paths)
+        directory = snapshot_dir(self.neo_file, paths)
+        self.assertNotEqual(directory, snapshot_dir(self.neo_file, paths[0]))
+        self.assertTrue((directory / 'manifest.json').exists())
+        self.assertEqual(len(built._approaches), len(rows))
+        self.assertSameDatabase(load_database(self.neo_file, self.cad_file, use_snapshot=False), built)
+        self.assertSameDatabase(built, load_database(self.neo_file, paths))
+
+
+class TestLazyPartitions(unittest.TestCase):
+    """Check that a database reopened from a snapshot only loads the partitions that queries read."""
+    database_class = NEODatabase
+
+    def setUp(self):
+        self.directory = pathlib.Path(tempfile.mkdtemp())
+        self.sources = [TEST_NEO_FILE, TEST_CAD_FILE]
+        # The same year of approaches, three times over, with the middle one much faster.
+        approaches = shifted_approaches(0) + shifted_approaches(1, velocity=100) + shifted_approaches(2)
+        self.built = self.database_class(load_neos(TEST_NEO_FILE), approaches)
+        write_snapshot(self.directory, self.built, self.sources)
+        self.db = read_snapshot(self.directory, self.sources, self.database_class)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def loaded(self):
+        return [partition.key for partition in self.db._partitions if partition.loader is None]
+
+    def assertSameResults(self, filters):
+        expected = [(a.time, a.distance, a.neo.designation) for a in self.built.query(filters)]
+        self.assertTrue(expected)
+        self.assertEqual([(a.time, a.distance, a.neo.designation) for a in self.db.query(filters)], expected)
+
+    def test_nothing_is_loaded_up_front(self):
+        self.assertEqual(self.loaded(), [])
+        self.assertTrue(all(approach is None for approach in self.db._approaches))
+        with open(self.directory / 'manifest.json') as f:
+            manifest = json.load(f)
+        self.assertEqual([entry['key'] for entry in manifest['partitions']], [2020, 2021, 2022])
+        self.assertEqual([entry['stats']['velocity'] for entry in manifest['partitions']],
+                         [list(partition.stats['velocity']) for partition in self.built._partitions])
+
+    def test_date_range_loads_its_partition(self):
+        self.assertSameResults(create_filters(start_date=datetime.date(2021, 3, 1),
+                                              end_date=datetime.date(2021, 3, 31)))
+        self.assertEqual(self.loaded(), [2021])
+
+    def test_pruned_partition_stays_on_disk(self):
+        self.assertSameResults(create_filters(velocity_max=50))
+        self.assertEqual(self.loaded(), [2020, 2022])
+
+    def test_index_range_loads_the_partitions_of_its_rows(self):
+        filters = create_filters(distance_max=0.0005, start_date=datetime.date(2021, 1, 1))
+        self.assertEqual(self.db.plan(filters)[0], 'distance')
+        self.assertSameResults(filters)
+        self.assertEqual(self.loaded(), [2021, 2022])
+
+    def test_neo_lookup_loads_every_partition(self):
+        self.assertSameResults(create_filters(date=datetime.date(2022, 3, 2)))
+        adonis = self.db.get_neo_by_name('Adonis')
+        self.assertEqual(self.loaded(), [2020, 2021, 2022])
+        self.assertEqual([approach.time for approach in adonis.approaches],
+                         [approach.time for approach in self.built.get_neo_by_name('Adonis').approaches])
+        for approach in adonis.approaches:
+            self.assertIs(approach.neo, adonis)
+
+    def test_add_approaches_loads_every_partition(self):
+        self.assertEqual(self.db.add_approaches(shifted_approaches(5)), self.built.add_approaches(shifted_approaches(5)))
+        self.assertEqual(self.loaded(), [2020, 2021, 2022, 2025])
+        self.assertSameResults(create_filters(velocity_max=50))
+
+    def test_corrupt_partition_is_detected_when_loaded(self):
+        path = self.directory / 'database.bin'
+        content = bytearray(path.read_bytes())
+        # The header holds the offset and length of each segment; the partitions follow the first one.
+        offset, length = struct.unpack_from('<QQ', content, len(b'NEOSNAP1') + 4 + 16 * 2)
+        content[offset + length // 2] ^= 0xFF
+        path.write_bytes(content)
+        db = read_snapshot(self.directory, self.sources, self.database_class)
+        self.assertEqual(len(list(db.query(create_filters(date=datetime.date(2020, 3, 2))))),
+                         len(list(self.built.query(create_filters(date=datetime.date(2020, 3, 2))))))
+        with self.assertRaises(ValueError):
+            list(db.query(create_filters(date=datetime.date(2021, 3, 2))))
+
+
+@unittest.skipIf(np is None, "NumPy is not installed.")
+class TestLazyColumnarPartitions(TestLazyPartitions):
+    database_class = ColumnarNEODatabase
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+"""Check that a `VersionedDatabase` publishes new versions without disturbing readers of old ones.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_versions
+"""
+import pathlib
+import threading
+import unittest
+
+from cache import QueryCache
+from database import NEODatabase
+from executor import QueryExecutor
+from extract import load_neos, load_approaches
+from filters import create_filters
+from models import CompactNearEarthObject, CompactCloseApproach
+from versions import VersionedDatabase
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+def split_approaches(approaches):
+    """Split close approaches into those before the middle of the year and those after."""
+    middle = sorted(approach.epoch_minutes for approach in approaches)[len(approaches) // 2]
+    return ([approach for approach in approaches if approach.epoch_minutes < middle],
+            [approach for approach in approaches if approach.epoch_minutes >= middle])
+
+
+class TestVersionedDatabase(unittest.TestCase):
+    def setUp(self):
+        self.early, self.late = split_approaches(load_approaches(TEST_CAD_FILE))
+        self.versions = VersionedDatabase(NEODatabase(load_neos(TEST_NEO_FILE), self.early))
+        self.full = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    def test_ingest_publishes_the_combined_data(self):
+        self.versions.ingest(approaches=self.late)
+        self.assertEqual(self.versions.version, 2)
+        filters = create_filters(velocity_max=20)
+        self.assertEqual([repr(approach) for approach in self.versions.query(filters)],
+                         [repr(approach) for approach in self.full.query(filters)])
+        neo = self.versions.get_neo_by_designation('1865')
+        self.assertEqual(len(neo.approaches), len(self.full.get_neo_by_designation('1865').approaches))
+        for approach in neo.approaches:
+            self.assertIs(approach.neo, neo)
+
+    def test_ingest_leaves_the_old_version_untouched(self):
+        old = self.versions.current
+        neo = old.get_neo_by_designation('1865')
+        linked = list(neo.approaches)
+        old_approaches = list(old.query({}))
+
+        self.versions.ingest(approaches=self.late)
+        self.assertIsNot(self.versions.current, old)
+        self.assertEqual(neo.approaches, linked)
+        self.assertEqual(list(old.query({})), old_approaches)
+        for approach in old_approaches:
+            self.assertIs(approach.neo, old.get_neo_by_designation(approach.get_designation()))
+
+    def test_existing_neo_is_kept(self):
+        designation = self.early[0].get_designation()
+        old = self.versions.get_neo_by_designation(designation)
+        duplicate = CompactNearEarthObject({'pdes': designation, 'name': 'Renamed', 'diameter': '2.0', 'pha': 'Y'})
+        added = CompactNearEarthObject({'pdes': 'not-yet-known', 'name': 'Newcomer', 'diameter': '', 'pha': 'N'})
+        self.versions.ingest(neos=[duplicate, added])
+        neo = self.versions.get_neo_by_designation(designation)
+        self.assertIsNot(neo, duplicate)
+        self.assertEqual((neo.name, neo.diameter, neo.hazardous), (old.name, old.diameter, old.hazardous))
+        self.assertIsNone(self.versions.get_neo_by_name('Renamed'))
+        self.assertTrue(neo.approaches)
+        self.assertTrue(all(approach.neo is neo for approach in neo.approaches))
+        self.assertIs(self.versions.get_neo_by_name('Newcomer'), added)
+
+    def test_ingest_agrees_with_add_neos(self):
+        designation = self.early[0].get_designation()
+
+        def duplicates():
+            return [CompactNearEarthObject({'pdes': designation, 'name': 'Renamed', 'diameter': '2.0', 'pha': 'Y'}),
+                    CompactNearEarthObject({'pdes': 'not-yet-known', 'name': 'First', 'diameter': '', 'pha': 'N'}),
+                    CompactNearEarthObject({'pdes': 'not-yet-known', 'name': 'Second', 'diameter': '', 'pha': 'N'})]
+
+        database = NEODatabase(load_neos(TEST_NEO_FILE), list(self.early))
+        database.add_neos(duplicates())
+        self.versions.ingest(neos=duplicates())
+        for name in ('Renamed', 'First', 'Second'):
+            self.assertEqual(self.versions.get_neo_by_name(name) is None, database.get_neo_by_name(name) is None)
+        self.assertEqual(repr(self.versions.get_neo_by_designation(designation)),
+                         repr(database.get_neo_by_designation(designation)))
+
+    def test_compact_models_are_copied(self):
+        versions = VersionedDatabase(NEODatabase(load_neos(TEST_NEO_FILE, neo_class=CompactNearEarthObject),
+                                                 load_approaches(TEST_CAD_FILE, approach_class=CompactCloseApproach)))
+        old = versions.current
+        versions.ingest()
+        self.assertEqual(list(map(repr, versions.query({}))), list(map(repr, old.query({}))))
+        self.assertTrue(all(approach.neo is not None for approach in old.query({})))
+
+    def test_readers_see_whole_versions_during_ingest(self):
+        sizes = {len(self.early), len(self.early) + len(self.late)}
+        seen = []
+        stop = threading.Event()
+
+        def read():
+            while not stop.is_set():
+                seen.append(sum(1 for _ in self.versions.query({})))
+
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        for reader in readers:
+            reader.start()
+        try:
+            self.versions.ingest(approaches=self.late)
+        finally:
+            stop.set()
+            for reader in readers:
+                reader.join()
+        self.assertTrue(seen)
+        self.assertLessEqual(set(seen), sizes)
+        self.assertEqual(sum(1 for _ in self.versions.query({})), max(sizes))
+
+    def test_cache_and_executor_follow_the_current_version(self):
+        cache = QueryCache(self.versions)
+        executor = QueryExecutor(self.versions)
+        filters = create_filters(velocity_max=20)
+        self.assertEqual(list(cache.query(filters)), list(self.versions.query(filters)))
+        self.assertEqual(list(executor.query(filters)), list(self.versions.query(filters)))
+
+        self.versions.ingest(approaches=self.late)
+        expected = [repr(approach) for approach in self.full.query(filters)]
+        self.assertEqual([repr(approach) for approach in cache.query(filters)], expected)
+        self.assertEqual([repr(approach) for approach in executor.query(filters)], expected)
+        executor.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
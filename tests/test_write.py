@@ -27,7 +27,7 @@ import unittest.mock
 
 from extract import load_neos, load_approaches
 from database import NEODatabase
-from write import write_to_csv, write_to_json
+from write import write_to_csv, write_to_json, write_to_jsonl, TimeStrCache
 
 
 TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
@@ -226,5 +226,98 @@ class TestWriteToJSON(unittest.TestCase):
         self.assertIsInstance(approach['neo']['potentially_hazardous'], bool)
 
 
+class TestStreamingWrite(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.results = build_results(50)
+
+    def write_with(self, writer, results):
+        """Write results through a mocked `open`, and return the separate chunks written."""
+        with unittest.mock.patch('write.open') as mock_file, UncloseableStringIO() as buf:
+            mock_file.return_value = buf
+            chunks = []
+            write = buf.write
+
+            def record(text):
+                chunks.append(text)
+                return write(text)
+
+            buf.write = record
+            writer(results, None)
+            del buf.write
+        return chunks
+
+    def expected_json(self, results):
+        return json.dumps([{'datetime_utc': approach.time_str,
+                            'distance_au': approach.distance,
+                            'velocity_km_s': approach.velocity,
+                            'neo': {'designation': approach.neo.designation,
+                                    'name': approach.neo.name,
+                                    'diameter_km': approach.neo.diameter,
+                                    'potentially_hazardous': approach.neo.hazardous}}
+                           for approach in results], indent=2)
+
+    def test_json_matches_dumping_the_whole_list(self):
+        for n in (0, 1, 50):
+            chunks = self.write_with(write_to_json, iter(self.results[:n]))
+            self.assertEqual(''.join(chunks), self.expected_json(self.results[:n]))
+
+    @unittest.mock.patch('write.BATCH_SIZE', 4)
+    def test_json_is_written_in_batches(self):
+        chunks = self.write_with(write_to_json, iter(self.results))
+        self.assertGreaterEqual(len(chunks), len(self.results) // 4)
+        self.assertEqual(''.join(chunks), self.expected_json(self.results))
+
+    @unittest.mock.patch('write.BATCH_SIZE', 4)
+    def test_csv_is_written_in_batches(self):
+        chunks = self.write_with(write_to_csv, iter(self.results))
+        rows = list(csv.DictReader(io.StringIO(''.join(chunks))))
+        self.assertEqual(len(rows), len(self.results))
+        self.assertEqual([row['datetime_utc'] for row in rows], [approach.time_str for approach in self.results])
+
+    def test_jsonl_has_one_compact_object_per_line(self):
+        for n in (0, 1, 50):
+            chunks = self.write_with(write_to_jsonl, iter(self.results[:n]))
+            lines = ''.join(chunks).splitlines()
+            self.assertEqual(len(lines), n)
+            expected = json.loads(self.expected_json(self.results[:n]))
+            for line, element in zip(lines, expected):
+                self.assertEqual(line, json.dumps(element, separators=(',', ':')))
+
+    @unittest.mock.patch('write.BATCH_SIZE', 4)
+    def test_jsonl_is_written_in_batches(self):
+        chunks = self.write_with(write_to_jsonl, iter(self.results))
+        self.assertGreaterEqual(len(chunks), len(self.results) // 4)
+        self.assertEqual(len(''.join(chunks).splitlines()), len(self.results))
+
+    def test_time_str_cache_matches_time_str(self):
+        format_time = TimeStrCache()
+        for approach in self.results:
+            self.assertEqual(format_time(approach.epoch_minutes), approach.time_str)
+        self.assertEqual(format_time(0), '1970-01-01 00:00')
+        self.assertEqual(format_time(-1), '1969-12-31 23:59')
+        self.assertEqual(TimeStrCache(quote='"')(1439), '"1970-01-01 23:59"')
+
+    def test_repeated_neos_are_written_identically(self):
+        repeated = [self.results[0], self.results[1], self.results[0], self.results[0]]
+        chunks = self.write_with(write_to_json, iter(repeated))
+        self.assertEqual(''.join(chunks), self.expected_json(repeated))
+        rows = list(csv.reader(io.StringIO(''.join(self.write_with(write_to_csv, iter(repeated))))))
+        self.assertEqual(rows[1], rows[3])
+        self.assertEqual(rows[1], rows[4])
+
+    def test_writers_accept_a_generator(self):
+        for writer in (write_to_csv, write_to_json, write_to_jsonl):
+            consumed = []
+
+            def results():
+                for approach in self.results:
+                    consumed.append(approach)
+                    yield approach
+
+            self.write_with(writer, results())
+            self.assertEqual(consumed, list(self.results))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,127 @@
+"""Share an `NEODatabase` between concurrent readers while new data is ingested.
+
+Queries never modify an `NEODatabase`, so any number of threads can read one at
+once - but building one links its NEOs and close approaches together in place,
+as do its `add_neos` and `add_approaches` methods, so the next version of a
+database can't be built from the objects the current one is still serving.
+
+A `VersionedDatabase` holds the current version of a database. Readers take the
+`current` version - a single attribute read, without a lock - and use it for the
+whole of a query, so they see one consistent version however long the query
+runs. Ingestion builds the next version from unlinked copies of the current
+version's NEOs and close approaches, plus the new ones, and then publishes it by
+replacing the current version, atomically. Versions that no reader holds any
+more are reclaimed as usual.
+
+    versions = VersionedDatabase(load_database(neo_path, cad_path))
+    database = versions.current
+    results = list(database.query(filters))
+
+    versions.ingest(approaches=load_approaches(delta_path))
+"""
+import logging
+import threading
+
+logging.basicConfig()
+
+# Create logger and set the log level
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.ERROR)
+
+
+def current_version(database):
+    """Return the version of a database to read: its current version, if it's a `VersionedDatabase`, or itself."""
+    if isinstance(database, VersionedDatabase):
+        return database.current
+    return database
+
+
+class VersionedDatabase:
+    """A handle on the current version of an `NEODatabase`, which ingestion replaces atomically.
+
+    The lookup and query methods of `NEODatabase` are forwarded to the version
+    that's current when they're called.
+    """
+    def __init__(self, database):
+        """Create a new `VersionedDatabase`.
+
+        :param database: The first version, an `NEODatabase` (or a subclass).
+        """
+        self.current = database
+        self.version = 1
+        self._ingest_lock = threading.Lock()
+
+    def publish(self, database):
+        """Make a database the current version.
+
+        The database must have been built from objects that no other version
+        uses, such as by `build_next` or from freshly loaded data files.
+
+        :param database: The next version.
+        """
+        with self._ingest_lock:
+            self.current = database
+            self.version += 1
+        logger.info(f'Published version {self.version}.')
+
+    def build_next(self, neos=(), approaches=()):
+        """Build the next version of the database from the current one, without publishing it.
+
+        The next version is of the same class as the current one, and holds
+        unlinked copies of all of its NEOs and close approaches - so building it
+        never touches the objects that readers of the current version see. As by
+        `NEODatabase.add_neos` and `add_approaches`, a new NEO with the same
+        designation as a current one (or an earlier new one) is skipped, and so
+        is a new close approach with the same designation and time. To revise
+        NEOs that are already present, `publish` a database built afresh.
+
+        :param neos: A collection of new, unlinked `NearEarthObject`s.
+        :param approaches: A collection of new, unlinked `CloseApproach`es.
+        :return: The next version, a new database.
+        """
+        current = self.current
+        current.load_partitions(current._partitions)
+        by_designation = {neo.designation: neo.unlinked_copy() for neo in current._neos}
+        for neo in neos:
+            by_designation.setdefault(neo.designation, neo)
+        database = type(current)(list(by_designation.values()),
+                                 [approach.unlinked_copy() for approach in current._approaches])
+        database.add_approaches(approaches)
+        return database
+
+    def ingest(self, neos=(), approaches=()):
+        """Build and publish the next version of the database, with new NEOs and close approaches.
+
+        Concurrent ingestions are applied one at a time, each to the version the
+        last one published. Readers aren't blocked while the next version builds.
+
+        :param neos: A collection of new, unlinked `NearEarthObject`s.
+        :param approaches: A collection of new, unlinked `CloseApproach`es.
+        :return: The new current version.
+        """
+        with self._ingest_lock:
+            database = self.build_next(neos, approaches)
+            self.current = database
+            self.version += 1
+        logger.info(f'Published version {self.version}.')
+        return database
+
+    def get_neo_by_designation(self, designation):
+        """Find an NEO by its primary designation in the current version, as by `NEODatabase`."""
+        return self.current.get_neo_by_designation(designation)
+
+    def get_neo_by_name(self, name):
+        """Find an NEO by its name in the current version, as by `NEODatabase`."""
+        return self.current.get_neo_by_name(name)
+
+    def query(self, filters):
+        """Generate the close approaches of the current version that match a collection of filters.
+
+        The version is fixed when the query starts, so the whole stream comes
+        from one version, even if another is published while it's consumed.
+        """
+        return self.current.query(filters)
+
+    def explain(self, filters, n=None, write=list):
+        """Run a query against the current version, recording how it was evaluated, as by `NEODatabase`."""
+        return self.current.explain(filters, n, write)
@@ -1,17 +1,118 @@
 """Write a stream of close approaches to CSV or to JSON.
 
-This module exports two functions: `write_to_csv` and `write_to_json`, each of
-which accept an `results` stream of close approaches and a path to which to
-write the data.
+This module exports three functions: `write_to_csv`, `write_to_json` and
+`write_to_jsonl`, each of which accept an `results` stream of close approaches
+and a path to which to write the data. `write_to_jsonl` writes JSON Lines - one
+compact JSON object per close approach, per line - which downstream tools can
+consume one line at a time, as generated by `iter_jsonl`.
 
 These functions are invoked by the main module with the output of the `limit`
 function and the filename supplied by the user at the command line. The file's
-extension determines which of these functions is used.
+extension determines which of these functions is used. If the filename ends in
+`.gz` or `.zst`, the output is compressed as it's written.
+
+All of these functions consume the `results` stream one close approach at a
+time and write the output in batches of `BATCH_SIZE` rows, so their memory use
+doesn't grow with the number of results. Within a write, the serialized fields
+of each NEO are cached, as is the formatted date of each day, since a popular
+NEO (or a busy day) recurs throughout a large export.
 
 You'll edit this file in Part 4.
 """
 import csv
 import json
+from json.encoder import encode_basestring_ascii
+
+from compressed import compression_of, open_text
+from helpers import datetime_to_str, minutes_to_datetime
+
+
+# The number of rows that are formatted before being written out together.
+BATCH_SIZE = 1024
+
+# The layout of each element of a JSON file of results, and of the NEO nested
+# within it, as `json.dump(..., indent=2)` lays out an element of the top-level list.
+JSON_ELEMENT = (
+    '{{\n'
+    '    "datetime_utc": {},\n'
+    '    "distance_au": {},\n'
+    '    "velocity_km_s": {},\n'
+    '    "neo": {}\n'
+    '  }}'
+)
+JSON_NEO = (
+    '{{\n'
+    '      "designation": {},\n'
+    '      "name": {},\n'
+    '      "diameter_km": {},\n'
+    '      "potentially_hazardous": {}\n'
+    '    }}'
+)
+
+# The layout of each line of a JSON Lines file of results, and of the NEO nested
+# within it, as `json.dumps` lays out an element with `separators=(',', ':')`.
+JSONL_LINE = '{{"datetime_utc":{},"distance_au":{},"velocity_km_s":{},"neo":{}}}\n'
+JSONL_NEO = '{{"designation":{},"name":{},"diameter_km":{},"potentially_hazardous":{}}}'
+
+# The header row of a CSV file of results.
+CSV_FIELDNAMES = ('datetime_utc', 'distance_au', 'velocity_km_s', 'designation',
+                  'name', 'diameter_km', 'potentially_hazardous')
+
+# Infinite floats, which JSON can't represent but `json.dumps` writes as `Infinity`.
+INFINITY = float('inf')
+
+# The `HH:MM` text of each minute of a day.
+CLOCK_TIMES = tuple(f'{minute // 60:02d}:{minute % 60:02d}' for minute in range(1440))
+
+
+class TimeStrCache:
+    """Format approach times as `CloseApproach.time_str` does, formatting each day only once.
+
+    Calling an instance with a number of epoch minutes returns the same text as
+    `time_str`, assembled from the cached `YYYY-MM-DD ` text of its day and the
+    `HH:MM` text of its minute within the day.
+    """
+    def __init__(self, quote=''):
+        """Create a new, empty `TimeStrCache`.
+
+        :param quote: A string to wrap around each formatted time, such as `"` for JSON.
+        """
+        self.quote = quote
+        self.days = {}
+
+    def __call__(self, minutes):
+        day, minute = divmod(minutes, 1440)
+        prefix = self.days.get(day)
+        if prefix is None:
+            # Slice off the `HH:MM` of midnight to keep exactly what `datetime_to_str` gives the date.
+            prefix = self.days[day] = self.quote + datetime_to_str(minutes_to_datetime(day * 1440))[:-5]
+        return prefix + CLOCK_TIMES[minute] + self.quote
+
+
+def open_output(filename, newline=None):
+    """Open a file to write results to, compressing them if its name ends in `.gz` or `.zst`."""
+    if compression_of(filename):
+        return open_text(filename, 'w', newline=newline)
+    return open(filename, 'w', newline=newline)
+
+
+def encode_json(value):
+    """Encode a single scalar value exactly as `json.dumps` would, but without its overhead."""
+    if isinstance(value, str):
+        return encode_basestring_ascii(value)
+    if isinstance(value, float):
+        if value != value:
+            return 'NaN'
+        if value in (INFINITY, -INFINITY):
+            return 'Infinity' if value > 0 else '-Infinity'
+        return float.__repr__(value)
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    if value is None:
+        return 'null'
+    return json.dumps(value)
 
 
 def write_to_csv(results, filename):
@@ -24,35 +125,32 @@ def write_to_csv(results, filename):
     :param results: An iterable of `CloseApproach` objects.
     :param filename: A Path-like object pointing to where the data should be saved.
     """
-    # Set up field name list and empty data list.
-    fieldnames = ['datetime_utc', 'distance_au', 'velocity_km_s', 'designation',
-                  'name', 'diameter_km', 'potentially_hazardous']
-    data = []
-    # Write the results to a CSV file, following the specification in the instructions.
-    for obj in results:
-        # Check for name if no name then name is empty string
-        if obj.neo.name:
-            name = obj.neo.name
-        else:
-            name = r''
-
-        # Append data list with dictionary of data per obj
-        data.append({'datetime_utc': obj.time_str, 'distance_au': obj.distance,
-                     'velocity_km_s': obj.velocity, 'designation': obj.neo.designation,
-                     'name': name, 'diameter_km': obj.neo.diameter,
-                     'potentially_hazardous': str(obj.neo.hazardous)})
-
-    # Write out a csv file with the given filename
-    with open(filename, 'w', newline="") as csvfile:
-        # creating a csv writer object
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-
-        # writing the header
-        writer.writeheader()
-
-        # writing the data rows
-        for d in data:
-            writer.writerow(d)
+    format_time = TimeStrCache()
+    fragments = {}
+    with open_output(filename, newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(CSV_FIELDNAMES)
+
+        # Write the results in batches as they stream in, following the
+        # specification in the instructions.
+        batch = []
+        for obj in results:
+            neo = obj.neo
+            fragment = fragments.get(neo)
+            if fragment is None:
+                # A missing name is written as the empty string.
+                fragment = fragments[neo] = (neo.designation, neo.name or '', neo.diameter, str(neo.hazardous))
+            batch.append((format_time(obj.epoch_minutes), obj.distance, obj.velocity) + fragment)
+            if len(batch) >= BATCH_SIZE:
+                writer.writerows(batch)
+                batch.clear()
+        writer.writerows(batch)
+
+
+def encode_json_neo(neo, template):
+    """Serialize the fields of an NEO into a JSON object, laid out by a template."""
+    return template.format(encode_json(neo.designation), encode_json(neo.name),
+                           encode_json(neo.diameter), encode_json(neo.hazardous))
 
 
 def write_to_json(results, filename):
@@ -63,26 +161,66 @@ def write_to_json(results, filename):
     their values and the 'neo' key mapping to a dictionary of the associated
     NEO's attributes.
 
+    The list is written one element at a time, filling in a template with the
+    same layout that `json.dump(..., indent=2)` would give the whole list.
+
     :param results: An iterable of `CloseApproach` objects.
     :param filename: A Path-like object pointing to where the data should be saved.
     """
-    # Create an empty data list to populate with results
-    data = []
-    # Write the results to a JSON file, following the specification in the instructions.
+    format_time = TimeStrCache(quote='"')
+    fragments = {}
+    with open_output(filename) as f:
+        separator = '[\n  '
+        batch = []
+        for obj in results:
+            neo = obj.neo
+            fragment = fragments.get(neo)
+            if fragment is None:
+                fragment = fragments[neo] = encode_json_neo(neo, JSON_NEO)
+            batch.append(separator)
+            batch.append(JSON_ELEMENT.format(format_time(obj.epoch_minutes), encode_json(obj.distance),
+                                             encode_json(obj.velocity), fragment))
+            separator = ',\n  '
+            if len(batch) >= 2 * BATCH_SIZE:
+                f.write(''.join(batch))
+                batch.clear()
+
+        # Close the list, or write an empty one if there were no results.
+        batch.append('\n]' if separator != '[\n  ' else '[]')
+        f.write(''.join(batch))
+
+
+def iter_jsonl(results):
+    """Serialize a stream of `CloseApproach` objects as lines of JSON Lines, one at a time.
+
+    :param results: An iterable of `CloseApproach` objects.
+    :yield: One compact JSON object per close approach, each ending in a newline.
+    """
+    format_time = TimeStrCache(quote='"')
+    fragments = {}
     for obj in results:
-        # Build out the neo data dict
-        neo = {"designation": obj.neo.designation,
-               "name": obj.neo.name,
-               "diameter_km": obj.neo.diameter,
-               "potentially_hazardous": obj.neo.hazardous}
-
-        # Build out the close approach object dict that includes the neo dict from above
-        close_obj = {'datetime_utc': obj.time_str,
-                     'distance_au': obj.distance,
-                     'velocity_km_s': obj.velocity,
-                     'neo': neo}
-        data.append(close_obj)
-
-    # Write out json file with data
-    with open(filename, 'w') as f:
-        json.dump(data, f, indent=2)
+        neo = obj.neo
+        fragment = fragments.get(neo)
+        if fragment is None:
+            fragment = fragments[neo] = encode_json_neo(neo, JSONL_NEO)
+        yield JSONL_LINE.format(format_time(obj.epoch_minutes), encode_json(obj.distance),
+                                encode_json(obj.velocity), fragment)
+
+
+def write_to_jsonl(results, filename):
+    """Write an iterable of `CloseApproach` objects to a JSON Lines file.
+
+    Each line holds one compact JSON object, with the same keys and nesting as
+    an element of the list that `write_to_json` writes, and no indentation.
+
+    :param results: An iterable of `CloseApproach` objects.
+    :param filename: A Path-like object pointing to where the data should be saved.
+    """
+    with open_output(filename) as f:
+        batch = []
+        for line in iter_jsonl(results):
+            batch.append(line)
+            if len(batch) >= BATCH_SIZE:
+                f.write(''.join(batch))
+                batch.clear()
+        f.write(''.join(batch))